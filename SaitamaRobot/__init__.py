@@ -68,6 +68,14 @@ if ENV:
     WEBHOOK = bool(os.environ.get('WEBHOOK', False))
     URL = os.environ.get('URL', "")  # Does not contain token
     PORT = int(os.environ.get('PORT', 5000))
+    METRICS_PORT = int(os.environ.get('METRICS_PORT') or 0)
+    BOT_API_URL = os.environ.get('BOT_API_URL', None)
+    SQL_AUDIT = bool(os.environ.get('SQL_AUDIT', False))
+    SQL_QUERY_BUDGET = int(os.environ.get('SQL_QUERY_BUDGET') or 20)
+    TRACEMALLOC_INTERVAL = int(os.environ.get('TRACEMALLOC_INTERVAL') or 0)
+    CACHE_SNAPSHOT = os.environ.get('CACHE_SNAPSHOT', None)
+    CACHE_SNAPSHOT_INTERVAL = int(
+        os.environ.get('CACHE_SNAPSHOT_INTERVAL') or 10)
     CERT_PATH = os.environ.get("CERT_PATH")
     API_ID = os.environ.get('API_ID', None)
     API_HASH = os.environ.get('API_HASH', None)
@@ -136,6 +144,13 @@ else:
     WEBHOOK = Config.WEBHOOK
     URL = Config.URL
     PORT = Config.PORT
+    METRICS_PORT = Config.METRICS_PORT
+    BOT_API_URL = Config.BOT_API_URL
+    SQL_AUDIT = Config.SQL_AUDIT
+    SQL_QUERY_BUDGET = Config.SQL_QUERY_BUDGET
+    TRACEMALLOC_INTERVAL = Config.TRACEMALLOC_INTERVAL
+    CACHE_SNAPSHOT = Config.CACHE_SNAPSHOT
+    CACHE_SNAPSHOT_INTERVAL = Config.CACHE_SNAPSHOT_INTERVAL
     CERT_PATH = Config.CERT_PATH
     API_ID = Config.API_ID
     API_HASH = Config.API_HASH
@@ -173,7 +188,17 @@ if not SPAMWATCH_API:
 else:
     sw = spamwatch.Client(SPAMWATCH_API)
 
-updater = tg.Updater(TOKEN, workers=WORKERS, use_context=True)
+if BOT_API_URL:
+    # eg. the fake server in fake_bot_api.py, it ends in /bot like the real one
+    LOGGER.warning("Using the bot api at %s", BOT_API_URL)
+    updater = tg.Updater(
+        TOKEN,
+        workers=WORKERS,
+        use_context=True,
+        base_url=BOT_API_URL,
+        base_file_url=BOT_API_URL[:-len("bot")] + "file/bot")
+else:
+    updater = tg.Updater(TOKEN, workers=WORKERS, use_context=True)
 telethn = TelegramClient("saitama", API_ID, API_HASH)
 dispatcher = updater.dispatcher
 
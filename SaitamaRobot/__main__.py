@@ -1,15 +1,21 @@
+import atexit
 import importlib
 import time
 import re
 from sys import argv
 from typing import Optional
 
-from SaitamaRobot import (ALLOW_EXCL, CERT_PATH, DONATION_LINK, LOGGER,
-                          OWNER_ID, PORT, SUPPORT_CHAT, TOKEN, URL, WEBHOOK,
+from SaitamaRobot import (ALLOW_EXCL, CACHE_SNAPSHOT, CACHE_SNAPSHOT_INTERVAL,
+                          CERT_PATH, DONATION_LINK, LOGGER,
+                          METRICS_PORT, OWNER_ID, PORT, SQL_AUDIT,
+                          SQL_QUERY_BUDGET, SUPPORT_CHAT, TOKEN,
+                          TRACEMALLOC_INTERVAL, URL, WEBHOOK,
                           SUPPORT_CHAT, dispatcher, StartTime, telethn, updater)
 # needed to dynamically load modules
 # NOTE: Module order is not guaranteed, specify that in the config file!
 from SaitamaRobot.modules import ALL_MODULES
+from SaitamaRobot.modules.helper_funcs import (memory, metrics, snapshot,
+                                               sql_audit, startup, warmup)
 from SaitamaRobot.modules.helper_funcs.chat_status import is_user_admin
 from SaitamaRobot.modules.helper_funcs.misc import paginate_modules
 from telegram import (InlineKeyboardButton, InlineKeyboardMarkup, ParseMode,
@@ -98,8 +104,9 @@ CHAT_SETTINGS = {}
 USER_SETTINGS = {}
 
 for module_name in ALL_MODULES:
-    imported_module = importlib.import_module("SaitamaRobot.modules." +
-                                              module_name)
+    with startup.timed(module_name, "import"):
+        imported_module = importlib.import_module("SaitamaRobot.modules." +
+                                                  module_name)
     if not hasattr(imported_module, "__mod_name__"):
         imported_module.__mod_name__ = imported_module.__name__
 
@@ -134,6 +141,9 @@ for module_name in ALL_MODULES:
     if hasattr(imported_module, "__user_settings__"):
         USER_SETTINGS[imported_module.__mod_name__.lower()] = imported_module
 
+# the sql caches load in the background, getters query the db meanwhile
+warmup.start()
+
 
 # do not async
 def send_help(chat_id, text, keyboard=None):
@@ -578,6 +588,25 @@ def main():
 
     dispatcher.add_error_handler(error_callback)
 
+    # after every handler is in, they get wrapped in place
+    if SQL_AUDIT:
+        sql_audit.start(dispatcher, SQL_QUERY_BUDGET)
+        updater.job_queue.run_repeating(
+            sql_audit.report, interval=sql_audit.REPORT_INTERVAL)
+    if METRICS_PORT:
+        metrics.start(dispatcher, METRICS_PORT)
+    if TRACEMALLOC_INTERVAL:
+        memory.start_tracing()
+        updater.job_queue.run_repeating(
+            memory.trace_job, interval=TRACEMALLOC_INTERVAL * 60, first=0)
+
+    if CACHE_SNAPSHOT:
+        updater.job_queue.run_repeating(
+            snapshot.write_job,
+            interval=CACHE_SNAPSHOT_INTERVAL * 60,
+            first=CACHE_SNAPSHOT_INTERVAL * 60)
+        atexit.register(snapshot.write)
+
     if WEBHOOK:
         LOGGER.info("Using webhooks.")
         updater.start_webhook(listen="0.0.0.0", port=PORT, url_path=TOKEN)
@@ -0,0 +1,539 @@
+"""
+A stand-in for the Telegram Bot API, to load test the bot on a laptop.
+
+    python3 SaitamaRobot/fake_bot_api.py --groups 20 --rate 50 --retry-after 0.01
+
+Then set BOT_API_URL to http://localhost:8081/bot and start the bot as usual.
+The server keeps groups with members and admins, answers the methods the
+modules use and makes up group traffic at --rate messages a second: chatter,
+commands, flood bursts and admins warning, banning, fbanning and gbanning
+people. Latency, RetryAfter and BadRequest answers are injected at the given
+rates.
+
+POST /fake/inject with {"chat_id", "user_id", "text"} sends a scripted
+message, eg. /newfed and /joinfed before load testing fbans; GET /fake/stats
+shows the calls received so far. Only stdlib, it runs without the bot's
+config. Telethon still talks to telegram, only the bot api is faked.
+"""
+import argparse
+import cgi
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+CHATTER = [
+    "hello", "lol", "anyone here?", "good morning", "check this out", "brb",
+    "nice", "what's up", "ok", "same"
+]
+COMMANDS = [
+    "/rules", "/notes", "/id", "/info", "/flood", "/blacklist", "/adminlist",
+    "/warns", "/fedinfo", "/markdownhelp"
+]
+# sent by an admin as a reply to a member
+ADMIN_COMMANDS = ["/warn", "/ban", "/mute", "/kick"]
+# sent by --sudo-user with the member's id, these fan out
+SUDO_COMMANDS = ["/fban", "/gban"]
+FLOOD_BURST = 12
+# share of generated events by kind, the rest is chatter
+EVENT_SHARES = (("flood", 0.02), ("command", 0.10), ("admin", 0.03),
+                ("sudo", 0.005))
+
+# descriptions telegram gives for the usual failures, for injected BadRequests
+BAD_REQUESTS = {
+    "deleteMessage": "Message to delete not found",
+    "kickChatMember": "User is an administrator of the chat",
+    "restrictChatMember": "User is an administrator of the chat",
+    "unbanChatMember": "User_id_invalid",
+    "sendMessage": "Reply message not found",
+    "getChatMember": "User not found",
+}
+# failures are only injected into calls that send or change something
+WRITE_PREFIXES = ("send", "delete", "kick", "restrict", "unban", "promote",
+                  "pin", "edit", "forward")
+ADMIN_RIGHTS = {
+    "can_be_edited": False,
+    "can_change_info": True,
+    "can_delete_messages": True,
+    "can_invite_users": True,
+    "can_restrict_members": True,
+    "can_pin_messages": True,
+    "can_promote_members": True,
+}
+FIRST_USER_ID = 100000
+
+
+class FakeChat:
+
+    def __init__(self, chat_id: int, members: int, admins: int, bot_id: int):
+        self.id = chat_id
+        self.title = "Load test {}".format(-chat_id % 10000)
+        user_ids = range(FIRST_USER_ID, FIRST_USER_ID + members)
+        # {user_id: status}, the first member owns the group
+        self.members = {user_id: "member" for user_id in user_ids}
+        for user_id in list(user_ids)[:admins]:
+            self.members[user_id] = "administrator"
+        self.members[FIRST_USER_ID] = "creator"
+        self.members[bot_id] = "administrator"
+        self.message_ids = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "type": "supergroup",
+            "title": self.title,
+            "permissions": {
+                "can_send_messages": True,
+                "can_send_media_messages": True,
+                "can_send_polls": True,
+                "can_send_other_messages": True,
+                "can_add_web_page_previews": True,
+                "can_change_info": False,
+                "can_invite_users": True,
+                "can_pin_messages": False,
+            },
+        }
+
+    def next_message_id(self) -> int:
+        self.message_ids += 1
+        return self.message_ids
+
+    def active_members(self, status=("member",)):
+        return [
+            user_id for user_id, user_status in self.members.items()
+            if user_status in status
+        ]
+
+
+class ApiError(Exception):
+
+    def __init__(self, code: int, description: str, parameters=None):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+        self.parameters = parameters
+
+
+class FakeBotApi:
+
+    def __init__(self, bot_id: int, groups: int, members: int, admins: int,
+                 sudo_user: int, latency: float, retry_after: float,
+                 bad_request: float):
+        self.bot_id = bot_id
+        self.sudo_user = sudo_user
+        self.latency = latency
+        self.retry_after = retry_after
+        self.bad_request = bad_request
+        self.lock = threading.Lock()
+        self.updates_ready = threading.Condition(self.lock)
+        self.updates = deque()
+        self.next_update_id = 1
+        self.chats = {}
+        for index in range(groups):
+            chat_id = -1001000000000 - index
+            self.chats[chat_id] = FakeChat(chat_id, members, admins, bot_id)
+        self.calls = Counter()
+        self.injected = Counter()
+        self.generated = 0
+
+    # users and chats
+
+    def user(self, user_id: int) -> dict:
+        if user_id == self.bot_id:
+            return {
+                "id": self.bot_id,
+                "is_bot": True,
+                "first_name": "Fake",
+                "username": "fake_saitama_bot",
+            }
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": "User {}".format(user_id),
+            "username": "user{}".format(user_id),
+        }
+
+    def member(self, chat, user_id: int) -> dict:
+        status = chat.members.get(user_id, "left")
+        member = {"user": self.user(user_id), "status": status}
+        if status == "administrator":
+            member.update(ADMIN_RIGHTS)
+        elif status == "restricted":
+            member.update(until_date=0, can_send_messages=False, is_member=True)
+        return member
+
+    def chat(self, chat_id):
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            raise ApiError(400, "Bad Request: chat not found")
+        chat = self.chats.get(chat_id)
+        if chat is None and chat_id < 0:
+            raise ApiError(400, "Bad Request: chat not found")
+        return chat_id, chat
+
+    def chat_dict(self, chat_id) -> dict:
+        chat_id, chat = self.chat(chat_id)
+        if chat:
+            return chat.as_dict()
+        return dict(self.user(chat_id), type="private")
+
+    # updates
+
+    def message(self, chat_id: int, user_id: int, text: str,
+                reply_to: dict = None) -> dict:
+        chat = self.chats.get(chat_id)
+        message = {
+            "message_id": chat.next_message_id() if chat else 1,
+            "date": int(time.time()),
+            "chat": self.chat_dict(chat_id),
+            "from": self.user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{
+                "type": "bot_command",
+                "offset": 0,
+                "length": len(text.split()[0])
+            }]
+        if reply_to:
+            message["reply_to_message"] = reply_to
+        return message
+
+    def push(self, chat_id: int, user_id: int, text: str,
+             reply_to: dict = None) -> dict:
+        with self.lock:
+            message = self.message(chat_id, user_id, text, reply_to)
+            self.updates.append({
+                "update_id": self.next_update_id,
+                "message": message
+            })
+            self.next_update_id += 1
+            self.generated += 1
+            self.updates_ready.notify_all()
+        return message
+
+    def get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        with self.updates_ready:
+            while self.updates and self.updates[0]["update_id"] < offset:
+                self.updates.popleft()
+            while not self.updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.updates_ready.wait(remaining)
+            return list(self.updates)[:limit]
+
+    def generate(self, rate: float):
+        # a steady stream of made up group traffic
+        chat_ids = list(self.chats)
+        while True:
+            chat = self.chats[random.choice(chat_ids)]
+            members = chat.active_members() or [FIRST_USER_ID]
+            user_id = random.choice(members)
+            kind = "chatter"
+            roll = random.random()
+            for event_kind, share in EVENT_SHARES:
+                if roll < share:
+                    kind = event_kind
+                    break
+                roll -= share
+
+            if kind == "flood":
+                for _ in range(FLOOD_BURST):
+                    self.push(chat.id, user_id, random.choice(CHATTER))
+            elif kind == "command":
+                self.push(chat.id, user_id, random.choice(COMMANDS))
+            elif kind == "admin":
+                target = self.push(chat.id, user_id, random.choice(CHATTER))
+                admin = random.choice(
+                    chat.active_members(("creator", "administrator")))
+                self.push(chat.id, admin, random.choice(ADMIN_COMMANDS),
+                          target)
+            elif kind == "sudo" and self.sudo_user:
+                self.push(
+                    chat.id, self.sudo_user, "{} {} load test".format(
+                        random.choice(SUDO_COMMANDS), user_id))
+            else:
+                self.push(chat.id, user_id, random.choice(CHATTER))
+            time.sleep(1 / rate)
+
+    # methods
+
+    def call(self, method: str, params: dict):
+        self.calls[method] += 1
+        if method == "getUpdates":
+            return self.get_updates(params)
+
+        if self.latency:
+            time.sleep(random.uniform(0, 2 * self.latency))
+        if method.startswith(WRITE_PREFIXES):
+            if random.random() < self.retry_after:
+                self.injected["RetryAfter"] += 1
+                seconds = random.randint(1, 5)
+                raise ApiError(
+                    429, "Too Many Requests: retry after {}".format(seconds),
+                    {"retry_after": seconds})
+            if random.random() < self.bad_request:
+                self.injected["BadRequest"] += 1
+                raise ApiError(
+                    400, "Bad Request: " +
+                    BAD_REQUESTS.get(method, "message not found"))
+
+        handler = getattr(self, "api_" + method, None)
+        if handler:
+            return handler(params)
+        if method.startswith(("send", "forward", "copy", "edit")):
+            return self.sent_message(params)
+        return True
+
+    def sent_message(self, params: dict):
+        if "inline_message_id" in params:
+            return True
+        chat_id, _ = self.chat(params.get("chat_id"))
+        with self.lock:
+            return self.message(chat_id, self.bot_id,
+                                params.get("text") or params.get("caption") or
+                                "")
+
+    def api_getMe(self, params):
+        return self.user(self.bot_id)
+
+    def api_getMyCommands(self, params):
+        return []
+
+    def api_getWebhookInfo(self, params):
+        return {"url": "", "has_custom_certificate": False,
+                "pending_update_count": len(self.updates)}
+
+    def api_getChat(self, params):
+        return self.chat_dict(params.get("chat_id"))
+
+    def api_getChatMember(self, params):
+        chat_id, chat = self.chat(params.get("chat_id"))
+        user_id = int(params["user_id"])
+        if chat is None:
+            return {"user": self.user(user_id), "status": "member"}
+        return self.member(chat, user_id)
+
+    def api_getChatAdministrators(self, params):
+        chat_id, chat = self.chat(params.get("chat_id"))
+        if chat is None:
+            raise ApiError(400, "Bad Request: there are no administrators "
+                           "in the private chat")
+        return [
+            self.member(chat, user_id) for user_id in chat.active_members((
+                "creator", "administrator"))
+        ]
+
+    def api_getChatMembersCount(self, params):
+        chat_id, chat = self.chat(params.get("chat_id"))
+        return len(chat.active_members(
+            ("creator", "administrator", "member",
+             "restricted"))) if chat else 2
+
+    def _set_status(self, params, status):
+        chat_id, chat = self.chat(params.get("chat_id"))
+        user_id = int(params["user_id"])
+        if chat is None:
+            raise ApiError(400, "Bad Request: method is available for "
+                           "supergroup and channel chats only")
+        if chat.members.get(user_id) in ("creator", "administrator"):
+            raise ApiError(400, "Bad Request: user is an administrator of "
+                           "the chat")
+        with self.lock:
+            chat.members[user_id] = status
+        return True
+
+    def api_kickChatMember(self, params):
+        return self._set_status(params, "kicked")
+
+    def api_unbanChatMember(self, params):
+        return self._set_status(params, "member")
+
+    def api_restrictChatMember(self, params):
+        permissions = params.get("permissions") or {}
+        if isinstance(permissions, str):
+            permissions = json.loads(permissions)
+        restricted = not permissions.get("can_send_messages", False)
+        return self._set_status(params,
+                                "restricted" if restricted else "member")
+
+    def api_sendChatAction(self, params):
+        return True
+
+    def api_sendMediaGroup(self, params):
+        return [self.sent_message(params)]
+
+    def api_exportChatInviteLink(self, params):
+        return "https://t.me/joinchat/fake"
+
+    def api_getUserProfilePhotos(self, params):
+        return {"total_count": 0, "photos": []}
+
+    def api_getFile(self, params):
+        return {
+            "file_id": params["file_id"],
+            "file_unique_id": "fake",
+            "file_size": 0,
+            "file_path": "fake/file",
+        }
+
+    def api_getStickerSet(self, params):
+        raise ApiError(400, "Bad Request: STICKERSET_INVALID")
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "generated": self.generated,
+                "pending": len(self.updates),
+                "calls": dict(self.calls),
+                "injected": dict(self.injected),
+            }
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    # set by main()
+    api = None
+
+    def _params(self) -> dict:
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = cgi.FieldStorage(
+                fp=self.rfile,
+                headers=self.headers,
+                environ={
+                    "REQUEST_METHOD": "POST",
+                    "CONTENT_TYPE": content_type
+                })
+            for key in form.keys():
+                if not form[key].filename:
+                    params[key] = form.getfirst(key)
+        elif length:
+            body = self.rfile.read(length)
+            if content_type.startswith("application/json"):
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body.decode()))
+        return params
+
+    def _reply(self, code: int, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        params = self._params()
+
+        if path == "/fake/stats":
+            self._reply(200, self.api.stats())
+            return
+        if path == "/fake/inject":
+            message = self.api.push(
+                int(params["chat_id"]), int(params["user_id"]),
+                params["text"])
+            self._reply(200, message)
+            return
+        if path.startswith("/file/"):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        method = path.rsplit("/", 1)[-1]
+        try:
+            result = self.api.call(method, params)
+        except ApiError as excp:
+            payload = {
+                "ok": False,
+                "error_code": excp.code,
+                "description": excp.description
+            }
+            if excp.parameters:
+                payload["parameters"] = excp.parameters
+            self._reply(excp.code, payload)
+            return
+        self._reply(200, {"ok": True, "result": result})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def report_stats(api, interval: float):
+    while True:
+        time.sleep(interval)
+        stats = api.stats()
+        busiest = Counter(stats["calls"]).most_common(8)
+        print("generated {} updates, {} pending | injected {} | {}".format(
+            stats["generated"], stats["pending"], stats["injected"],
+            ", ".join("{} {}".format(method, count)
+                      for method, count in busiest)),
+              flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--bot-id",
+        type=int,
+        default=123456,
+        help="the id before the colon of the bot's TOKEN")
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--admins", type=int, default=3)
+    parser.add_argument(
+        "--sudo-user",
+        type=int,
+        default=0,
+        help="a sudo user of the bot, sends the /fban and /gban traffic")
+    parser.add_argument(
+        "--rate", type=float, default=20, help="generated messages a second")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="mean seconds per call")
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=0.0,
+        help="share of write calls answered with a RetryAfter")
+    parser.add_argument(
+        "--bad-request",
+        type=float,
+        default=0.0,
+        help="share of write calls answered with a BadRequest")
+    args = parser.parse_args()
+
+    api = FakeBotApi(args.bot_id, args.groups, args.members, args.admins,
+                     args.sudo_user, args.latency, args.retry_after,
+                     args.bad_request)
+    FakeApiHandler.api = api
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FakeApiHandler)
+    server.daemon_threads = True
+
+    if args.rate > 0:
+        threading.Thread(
+            target=api.generate, args=(args.rate,), daemon=True).start()
+    threading.Thread(target=report_stats, args=(api, 10), daemon=True).start()
+    print("Fake bot api on http://127.0.0.1:{}/bot".format(args.port),
+          flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
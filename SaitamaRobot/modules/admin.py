@@ -7,11 +7,9 @@ from telegram.utils.helpers import mention_html
 
 from SaitamaRobot import DRAGONS, dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
-from SaitamaRobot.modules.helper_funcs.chat_status import (bot_admin, can_pin,
-                                                           can_promote,
-                                                           connection_status,
-                                                           user_admin,
-                                                           ADMIN_CACHE)
+from SaitamaRobot.modules.helper_funcs.chat_status import (
+    bot_admin, can_pin, can_promote, connection_status, user_admin,
+    get_admin_roster, invalidate_admin_cache)
 
 from SaitamaRobot.modules.helper_funcs.extraction import (extract_user,
                                                           extract_user_and_text)
@@ -86,6 +84,7 @@ def promote(update: Update, context: CallbackContext) -> str:
             message.reply_text("Terfi etme sırasında bir hata oluştu. Tekrar DEner misin ?")
         return
 
+    invalidate_admin_cache(chat.id)
     bot.sendMessage(
         chat.id,
         f"Sucessfully promoted <b>{user_member.user.first_name or user_id}</b>!",
@@ -153,6 +152,7 @@ def demote(update: Update, context: CallbackContext) -> str:
             can_restrict_members=False,
             can_pin_messages=False,
             can_promote_members=False)
+        invalidate_admin_cache(chat.id)
 
         bot.sendMessage(
             chat.id,
@@ -177,10 +177,7 @@ def demote(update: Update, context: CallbackContext) -> str:
 @run_async
 @user_admin
 def refresh_admin(update, _):
-    try:
-        ADMIN_CACHE.pop(update.effective_chat.id)
-    except KeyError:
-        pass
+    invalidate_admin_cache(update.effective_chat.id)
 
     update.effective_message.reply_text("Admin listesi güncellendi.")
 
@@ -242,6 +239,8 @@ def set_title(update: Update, context: CallbackContext):
             "Terfi etmediğim yöneticiler için özel başlık ayarlayamıyorum!")
         return
 
+    invalidate_admin_cache(chat.id)
+
     bot.sendMessage(
         chat.id,
         f"Sucessfully set title for <code>{user_member.user.first_name or user_id}</code> "
@@ -364,7 +363,8 @@ def adminlist(update, context):
         msg = update.effective_message.reply_text(
             'Grup yöneticileri yükleniyor...', quote=False, parse_mode=ParseMode.HTML)
 
-    administrators = bot.getChatAdministrators(chat_id)
+    # copy, the loop below removes bots from it
+    administrators = list(get_admin_roster(chat_id))
     text = "Admins in <b>{}</b>:".format(
         html.escape(update.effective_chat.title))
 
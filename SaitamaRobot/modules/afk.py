@@ -4,7 +4,6 @@ from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.disable import (DisableAbleCommandHandler,
                                           DisableAbleMessageHandler)
 from SaitamaRobot.modules.sql import afk_sql as sql
-from SaitamaRobot.modules.users import get_user_id
 from telegram import MessageEntity, Update
 from telegram.error import BadRequest
 from telegram.ext import CallbackContext, Filters, MessageHandler, run_async
@@ -33,7 +32,7 @@ def afk(update: Update, context: CallbackContext):
     else:
         reason = ""
 
-    sql.set_afk(update.effective_user.id, reason)
+    sql.set_afk(user.id, reason, user.username, user.first_name)
     fname = update.effective_user.first_name
     try:
         update.effective_message.reply_text("{} şimdi uzakta!{}".format(
@@ -89,23 +88,27 @@ def reply_afk(update: Update, context: CallbackContext):
                 chk_users.append(user_id)
 
             if ent.type == MessageEntity.MENTION:
-                user_id = get_user_id(message.text[ent.offset:ent.offset +
-                                                   ent.length])
-                if not user_id:
-                    # Should never happen, since for a user to become AFK they must have spoken. Maybe changed username?
-                    return
+                # only afk users can get a reply, and all of them are in memory
+                user_id = sql.get_afk_user_id(entities[ent][1:])
+                afk_user = sql.get_afk_user(user_id)
+                if not afk_user:
+                    continue
 
                 if user_id in chk_users:
                     return
                 chk_users.append(user_id)
 
-                try:
-                    chat = bot.get_chat(user_id)
-                except BadRequest:
-                    print("Hata: AFK modülü {} kullanıcısının  kimliğini tanıyamadı."
-                          .format(user_id))
-                    return
-                fst_name = chat.first_name
+                fst_name = afk_user["first_name"]
+                if not fst_name:
+                    try:
+                        chat = bot.get_chat(user_id)
+                    except BadRequest:
+                        print(
+                            "Hata: AFK modülü {} kullanıcısının  kimliğini tanıyamadı."
+                            .format(user_id))
+                        return
+                    fst_name = chat.first_name
+                    sql.update_afk_user(user_id, chat.username, fst_name)
 
             else:
                 return
@@ -119,9 +122,9 @@ def reply_afk(update: Update, context: CallbackContext):
 
 
 def check_afk(update, context, user_id, fst_name, userc_id):
-    if sql.is_afk(user_id):
-        user = sql.check_afk_status(user_id)
-        if not user.reason:
+    user = sql.get_afk_user(user_id)
+    if user:
+        if not user["reason"]:
             if int(userc_id) == int(user_id):
                 return
             res = "{} Çevrimdışı".format(fst_name)
@@ -130,7 +133,7 @@ def check_afk(update, context, user_id, fst_name, userc_id):
             if int(userc_id) == int(user_id):
                 return
             res = "{} Çevrimdışı.\nSebep: <code>{}</code>".format(
-                html.escape(fst_name), html.escape(user.reason))
+                html.escape(fst_name), html.escape(user["reason"]))
             update.effective_message.reply_text(res, parse_mode="html")
 
 
@@ -1,16 +1,20 @@
 import datetime
 import html
+import json as jsonlib
 import textwrap
 
-import bs4
-import jikanpy
-import requests
 from SaitamaRobot import DEV_USERS, OWNER_ID, DRAGONS, dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
+from SaitamaRobot.modules.sql import anime_sql as sql
 from telegram import (InlineKeyboardButton, InlineKeyboardMarkup, ParseMode,
                       Update)
 from telegram.ext import CallbackContext, CallbackQueryHandler, run_async
 
+bs4 = lazy_import("bs4")
+jikanpy = lazy_import("jikanpy")
+
 info_btn = "More Information"
 kaizoku_btn = "Kaizoku ☠️"
 kayo_btn = "Kayo 🏴‍☠️"
@@ -157,6 +161,54 @@ query ($id: Int,$search: String) {
 
 url = 'https://graphql.anilist.co'
 
+ANILIST_QUERIES = {
+    'airing': airing_query,
+    'anime': anime_query,
+    'character': character_query,
+    'manga': manga_query,
+}
+# countdowns go stale fast, media and character data barely ever change
+ANILIST_TTL = {
+    'airing': 60 * 5,
+    'anime': 60 * 60 * 12,
+    'character': 60 * 60 * 24,
+    'manga': 60 * 60 * 12,
+}
+
+
+def _fetch_anilist(kind: str, query_key: str, variables: dict) -> dict:
+    # the db tier survives restarts, memory is checked before we get here
+    result = sql.get_cached_query(query_key)
+    if result is not None:
+        return result
+
+    result = http_client.post(
+        url, json={
+            'query': ANILIST_QUERIES[kind],
+            'variables': variables
+        }).json()
+    if 'errors' not in result:
+        sql.set_cached_query(query_key, result, ANILIST_TTL[kind])
+    return result
+
+
+def anilist_query(kind: str, variables: dict) -> dict:
+    """Run an AniList query, cached per normalized query and coalesced."""
+    # searches differing only in case or spacing share one entry
+    variables = {
+        key: " ".join(value.split()).casefold()
+        if isinstance(value, str) else value
+        for key, value in variables.items()
+    }
+    query_key = f"{kind}:{jsonlib.dumps(variables, sort_keys=True)}"
+    return http_client.cached_call(("anilist", query_key),
+                                   ANILIST_TTL[kind],
+                                   _fetch_anilist,
+                                   kind,
+                                   query_key,
+                                   variables,
+                                   cache_if=lambda r: 'errors' not in r)
+
 
 @run_async
 def airing(update: Update, context: CallbackContext):
@@ -167,14 +219,13 @@ def airing(update: Update, context: CallbackContext):
             'Tell Anime Name :) ( /airing <anime name>)')
         return
     variables = {'search': search_str[1]}
-    response = requests.post(
-        url, json={
-            'query': airing_query,
-            'variables': variables
-        }).json()['data']['Media']
+    response = anilist_query('airing', variables)['data']['Media']
     msg = f"*Name*: *{response['title']['romaji']}*(`{response['title']['native']}`)\n*ID*: `{response['id']}`"
     if response['nextAiringEpisode']:
-        time = response['nextAiringEpisode']['timeUntilAiring'] * 1000
+        # count down from airingAt, the cached timeUntilAiring may be stale
+        time = max(
+            response['nextAiringEpisode']['airingAt'] -
+            int(datetime.datetime.now().timestamp()), 0) * 1000
         time = t(time)
         msg += f"\n*Episode*: `{response['nextAiringEpisode']['episode']}`\n*Airing In*: `{time}`"
     else:
@@ -192,11 +243,7 @@ def anime(update: Update, context: CallbackContext):
     else:
         search = search[1]
     variables = {'search': search}
-    json = requests.post(
-        url, json={
-            'query': anime_query,
-            'variables': variables
-        }).json()
+    json = anilist_query('anime', variables)
     if 'errors' in json.keys():
         update.effective_message.reply_text('Anime not found')
         return
@@ -259,11 +306,7 @@ def character(update: Update, context: CallbackContext):
         return
     search = search[1]
     variables = {'query': search}
-    json = requests.post(
-        url, json={
-            'query': character_query,
-            'variables': variables
-        }).json()
+    json = anilist_query('character', variables)
     if 'errors' in json.keys():
         update.effective_message.reply_text('Character not found')
         return
@@ -294,11 +337,7 @@ def manga(update: Update, context: CallbackContext):
         return
     search = search[1]
     variables = {'search': search}
-    json = requests.post(
-        url, json={
-            'query': manga_query,
-            'variables': variables
-        }).json()
+    json = anilist_query('manga', variables)
     msg = ''
     if 'errors' in json.keys():
         update.effective_message.reply_text('Manga not found')
@@ -499,7 +538,7 @@ def site_search(update: Update, context: CallbackContext, site: str):
 
     if site == "kaizoku":
         search_url = f"https://animekaizoku.com/?s={search_query}"
-        html_text = requests.get(search_url).text
+        html_text = http_client.get(search_url, ttl=60 * 10).text
         soup = bs4.BeautifulSoup(html_text, "html.parser")
         search_result = soup.find_all("h2", {'class': "post-title"})
 
@@ -515,7 +554,7 @@ def site_search(update: Update, context: CallbackContext, site: str):
 
     elif site == "kayo":
         search_url = f"https://animekayo.com/?s={search_query}"
-        html_text = requests.get(search_url).text
+        html_text = http_client.get(search_url, ttl=60 * 10).text
         soup = bs4.BeautifulSoup(html_text, "html.parser")
         search_result = soup.find_all("h2", {'class': "title"})
 
@@ -10,6 +10,7 @@ from SaitamaRobot import dispatcher, LOGGER, OWNER_ID, JOIN_LOGGER
 from SaitamaRobot.__main__ import DATA_IMPORT
 from SaitamaRobot.modules.helper_funcs.chat_status import user_admin
 from SaitamaRobot.modules.helper_funcs.alternate import typing_action
+from SaitamaRobot.modules.helper_funcs.chat_meta import get_chat_meta
 
 # from SaitamaRobot.modules.rules import get_rules
 import SaitamaRobot.modules.sql.rules_sql as rulessql
@@ -36,8 +37,8 @@ def import_data(update, context):
 
     conn = connected(context.bot, update, chat, user.id, need_admin=True)
     if conn:
-        chat = dispatcher.bot.getChat(conn)
-        chat_name = dispatcher.bot.getChat(conn).title
+        chat = get_chat_meta(dispatcher.bot, conn)
+        chat_name = chat.title
     else:
         if update.effective_message.chat.type == "private":
             update.effective_message.reply_text("This is a group only command!")
@@ -130,7 +131,7 @@ def export_data(update, context):
     current_chat_id = update.effective_chat.id
     conn = connected(context.bot, update, chat, user.id, need_admin=True)
     if conn:
-        chat = dispatcher.bot.getChat(conn)
+        chat = get_chat_meta(dispatcher.bot, conn)
         chat_id = conn
         # chat_name = dispatcher.bot.getChat(conn).title
     else:
@@ -15,6 +15,7 @@ from SaitamaRobot.modules.helper_funcs.misc import split_message
 from SaitamaRobot.modules.log_channel import loggable
 from SaitamaRobot.modules.warns import warn
 from SaitamaRobot.modules.helper_funcs.string_handling import extract_time
+from SaitamaRobot.modules.helper_funcs.telethn.deletion import delete_later
 from SaitamaRobot.modules.connection import connected
 
 from SaitamaRobot.modules.helper_funcs.alternate import send_message, typing_action
@@ -353,15 +354,9 @@ def del_blacklist(update, context):
                 if getmode == 0:
                     return
                 elif getmode == 1:
-                    try:
-                        message.delete()
-                    except BadRequest:
-                        pass
+                    delete_later(message)
                 elif getmode == 2:
-                    try:
-                        message.delete()
-                    except BadRequest:
-                        pass
+                    delete_later(message)
                     warn(
                         update.effective_user,
                         chat,
@@ -371,7 +366,7 @@ def del_blacklist(update, context):
                     )
                     return
                 elif getmode == 3:
-                    message.delete()
+                    delete_later(message)
                     bot.restrict_chat_member(
                         chat.id,
                         update.effective_user.id,
@@ -383,7 +378,7 @@ def del_blacklist(update, context):
                     )
                     return
                 elif getmode == 4:
-                    message.delete()
+                    delete_later(message)
                     res = chat.unban_member(update.effective_user.id)
                     if res:
                         bot.sendMessage(
@@ -392,7 +387,7 @@ def del_blacklist(update, context):
                         )
                     return
                 elif getmode == 5:
-                    message.delete()
+                    delete_later(message)
                     chat.kick_member(user.id)
                     bot.sendMessage(
                         chat.id,
@@ -400,7 +395,7 @@ def del_blacklist(update, context):
                     )
                     return
                 elif getmode == 6:
-                    message.delete()
+                    delete_later(message)
                     bantime = extract_time(message, value)
                     chat.kick_member(user.id, until_date=bantime)
                     bot.sendMessage(
@@ -409,7 +404,7 @@ def del_blacklist(update, context):
                     )
                     return
                 elif getmode == 7:
-                    message.delete()
+                    delete_later(message)
                     mutetime = extract_time(message, value)
                     bot.restrict_chat_member(
                         chat.id,
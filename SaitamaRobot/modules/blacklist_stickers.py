@@ -10,6 +10,7 @@ from SaitamaRobot.modules.helper_funcs.chat_status import (user_admin,
                                                            user_not_admin)
 from SaitamaRobot.modules.helper_funcs.misc import split_message
 from SaitamaRobot.modules.helper_funcs.string_handling import extract_time
+from SaitamaRobot.modules.helper_funcs.telethn.deletion import delete_later
 
 from SaitamaRobot.modules.log_channel import loggable
 from SaitamaRobot.modules.warns import warn
@@ -358,9 +359,9 @@ def del_blackliststicker(update: Update, context: CallbackContext):
                 if getmode == 0:
                     return
                 elif getmode == 1:
-                    message.delete()
+                    delete_later(message)
                 elif getmode == 2:
-                    message.delete()
+                    delete_later(message)
                     warn(
                         update.effective_user,
                         chat,
@@ -371,7 +372,7 @@ def del_blackliststicker(update: Update, context: CallbackContext):
                         conn=False)
                     return
                 elif getmode == 3:
-                    message.delete()
+                    delete_later(message)
                     bot.restrict_chat_member(
                         chat.id,
                         update.effective_user.id,
@@ -385,7 +386,7 @@ def del_blackliststicker(update: Update, context: CallbackContext):
                         parse_mode="markdown")
                     return
                 elif getmode == 4:
-                    message.delete()
+                    delete_later(message)
                     res = chat.unban_member(update.effective_user.id)
                     if res:
                         bot.sendMessage(
@@ -397,7 +398,7 @@ def del_blackliststicker(update: Update, context: CallbackContext):
                             parse_mode="markdown")
                     return
                 elif getmode == 5:
-                    message.delete()
+                    delete_later(message)
                     chat.kick_member(user.id)
                     bot.sendMessage(
                         chat.id,
@@ -408,7 +409,7 @@ def del_blackliststicker(update: Update, context: CallbackContext):
                         parse_mode="markdown")
                     return
                 elif getmode == 6:
-                    message.delete()
+                    delete_later(message)
                     bantime = extract_time(message, value)
                     chat.kick_member(user.id, until_date=bantime)
                     bot.sendMessage(
@@ -420,7 +421,7 @@ def del_blackliststicker(update: Update, context: CallbackContext):
                         parse_mode="markdown")
                     return
                 elif getmode == 7:
-                    message.delete()
+                    delete_later(message)
                     mutetime = extract_time(message, value)
                     bot.restrict_chat_member(
                         chat.id,
@@ -1,14 +1,14 @@
 import html
 # AI module using Intellivoid's Coffeehouse API by @TheRealPhoenix
+import threading
 from time import sleep, time
 
 import SaitamaRobot.modules.sql.chatbot_sql as sql
-from coffeehouse.api import API
-from coffeehouse.exception import CoffeeHouseError as CFError
-from coffeehouse.lydia import LydiaAI
 from SaitamaRobot import AI_API_KEY, OWNER_ID, SUPPORT_CHAT, dispatcher
+from SaitamaRobot.modules.helper_funcs.chat_meta import bot_left, get_chat_meta
 from SaitamaRobot.modules.helper_funcs.chat_status import user_admin
 from SaitamaRobot.modules.helper_funcs.filters import CustomFilters
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
 from SaitamaRobot.modules.log_channel import gloggable
 from telegram import Update
 from telegram.error import BadRequest, RetryAfter, Unauthorized
@@ -16,15 +16,28 @@ from telegram.ext import (CallbackContext, CommandHandler, Filters,
                           MessageHandler, run_async)
 from telegram.utils.helpers import mention_html
 
-CoffeeHouseAPI = API(AI_API_KEY)
-api_client = LydiaAI(CoffeeHouseAPI)
+coffeehouse_api = lazy_import("coffeehouse.api")
+coffeehouse_exception = lazy_import("coffeehouse.exception")
+coffeehouse_lydia = lazy_import("coffeehouse.lydia")
+
+API_CLIENT_LOCK = threading.Lock()
+api_client = None
+
+
+def get_api_client():
+    global api_client
+    # built on first use, importing coffeehouse is slow
+    with API_CLIENT_LOCK:
+        if api_client is None:
+            api_client = coffeehouse_lydia.LydiaAI(
+                coffeehouse_api.API(AI_API_KEY))
+    return api_client
 
 
 @run_async
 @user_admin
 @gloggable
 def add_chat(update: Update, context: CallbackContext):
-    global api_client
     chat = update.effective_chat
     msg = update.effective_message
     user = update.effective_user
@@ -34,7 +47,7 @@ def add_chat(update: Update, context: CallbackContext):
         return
 
     if not is_chat:
-        ses = api_client.create_session()
+        ses = get_api_client().create_session()
         ses_id = str(ses.id)
         expires = str(ses.expires)
         sql.set_ses(chat.id, ses_id, expires)
@@ -85,7 +98,6 @@ def check_message(context: CallbackContext, message):
 
 @run_async
 def chatbot(update: Update, context: CallbackContext):
-    global api_client
     msg = update.effective_message
     chat_id = update.effective_chat.id
     is_chat = sql.is_chat(chat_id)
@@ -99,7 +111,7 @@ def chatbot(update: Update, context: CallbackContext):
         query = msg.text
         try:
             if int(exp) < time():
-                ses = api_client.create_session()
+                ses = get_api_client().create_session()
                 ses_id = str(ses.id)
                 expires = str(ses.expires)
                 sql.set_ses(chat_id, ses_id, expires)
@@ -108,10 +120,10 @@ def chatbot(update: Update, context: CallbackContext):
             pass
         try:
             bot.send_chat_action(chat_id, action='typing')
-            rep = api_client.think_thought(sesh, query)
+            rep = get_api_client().think_thought(sesh, query)
             sleep(0.3)
             msg.reply_text(rep, timeout=60)
-        except CFError as e:
+        except coffeehouse_exception.CoffeeHouseError as e:
             pass
             #bot.send_message(OWNER_ID,
             #                 f"Chatbot error: {e} occurred in {chat_id}!")
@@ -123,9 +135,11 @@ def list_chatbot_chats(update: Update, context: CallbackContext):
     text = "<b>AI-Enabled Chats</b>\n"
     for chat in chats:
         try:
-            x = context.bot.get_chat(int(*chat))
-            name = x.title if x.title else x.first_name
-            text += f"• <code>{name}</code>\n"
+            x = get_chat_meta(context.bot, int(*chat))
+            if bot_left(x):
+                sql.rem_chat(*chat)
+                continue
+            text += f"• <code>{x.title}</code>\n"
         except BadRequest:
             sql.rem_chat(*chat)
         except Unauthorized:
@@ -9,6 +9,7 @@ import SaitamaRobot.modules.sql.connection_sql as sql
 from SaitamaRobot import dispatcher, DRAGONS, DEV_USERS
 from SaitamaRobot.modules.helper_funcs import chat_status
 from SaitamaRobot.modules.helper_funcs.alternate import send_message, typing_action
+from SaitamaRobot.modules.helper_funcs.chat_meta import get_chat_meta
 
 user_admin = chat_status.user_admin
 
@@ -71,8 +72,8 @@ def connection_chat(update, context):
     conn = connected(context.bot, update, chat, user.id, need_admin=True)
 
     if conn:
-        chat = dispatcher.bot.getChat(conn)
-        chat_name = dispatcher.bot.getChat(conn).title
+        chat = get_chat_meta(dispatcher.bot, conn)
+        chat_name = chat.title
     else:
         if update.effective_message.chat.type != "private":
             return
@@ -122,7 +123,8 @@ def connect_chat(update, context):
                 connection_status = sql.connect(
                     update.effective_message.from_user.id, connect_chat)
                 if connection_status:
-                    conn_chat = dispatcher.bot.getChat(
+                    conn_chat = get_chat_meta(
+                        dispatcher.bot,
                         connected(
                             context.bot,
                             update,
@@ -156,7 +158,7 @@ def connect_chat(update, context):
             conn = connected(
                 context.bot, update, chat, user.id, need_admin=False)
             if conn:
-                connectedchat = dispatcher.bot.getChat(conn)
+                connectedchat = get_chat_meta(dispatcher.bot, conn)
                 text = "You are currently connected to *{}* (`{}`)".format(
                     connectedchat.title, conn)
                 buttons.append(
@@ -209,7 +211,7 @@ def connect_chat(update, context):
             connection_status = sql.connect(
                 update.effective_message.from_user.id, chat.id)
             if connection_status:
-                chat_name = dispatcher.bot.getChat(chat.id).title
+                chat_name = chat.title
                 send_message(
                     update.effective_message,
                     "Successfully connected to *{}*.".format(chat_name),
@@ -334,7 +336,8 @@ def connect_button(update, context):
             connection_status = sql.connect(query.from_user.id, target_chat)
 
             if connection_status:
-                conn_chat = dispatcher.bot.getChat(
+                conn_chat = get_chat_meta(
+                    dispatcher.bot,
                     connected(
                         context.bot, update, chat, user.id, need_admin=False))
                 chat_name = conn_chat.title
@@ -1,5 +1,5 @@
-import requests
 from SaitamaRobot import CASH_API_KEY, dispatcher
+from SaitamaRobot.modules.helper_funcs import http_client
 from telegram import Update, ParseMode
 from telegram.ext import CallbackContext, CommandHandler, run_async
 
@@ -25,7 +25,7 @@ def convert(update: Update, context: CallbackContext):
                        f"&from_currency={orig_cur}"
                        f"&to_currency={new_cur}"
                        f"&apikey={CASH_API_KEY}")
-        response = requests.get(request_url).json()
+        response = http_client.get(request_url, ttl=60).json()
         try:
             current_rate = float(
                 response['Realtime Currency Exchange Rate']['5. Exchange Rate'])
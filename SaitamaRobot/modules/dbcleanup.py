@@ -1,89 +1,140 @@
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from time import perf_counter
 
+import SaitamaRobot.modules.sql.dbcleanup_sql as sql
 import SaitamaRobot.modules.sql.global_bans_sql as gban_sql
 import SaitamaRobot.modules.sql.users_sql as user_sql
 from SaitamaRobot import DEV_USERS, OWNER_ID, dispatcher
+from SaitamaRobot.modules.helper_funcs.broadcast import RateLimiter
 from SaitamaRobot.modules.helper_funcs.chat_status import dev_plus
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.error import BadRequest, Unauthorized
+from telegram.error import BadRequest, RetryAfter, TelegramError, Unauthorized
 from telegram.ext import (CallbackContext, CallbackQueryHandler, CommandHandler,
                           run_async)
 
-
-def get_invalid_chats(update: Update,
-                      context: CallbackContext,
-                      remove: bool = False):
-    bot = context.bot
-    chat_id = update.effective_chat.id
-    chats = user_sql.get_all_chats()
-    kicked_chats, progress = 0, 0
-    chat_list = []
-    progress_message = None
-
-    for chat in chats:
-
-        if ((100 * chats.index(chat)) / len(chats)) > progress:
-            progress_bar = f"{progress}% completed in getting invalid chats."
-            if progress_message:
-                try:
-                    bot.editMessageText(progress_bar, chat_id,
-                                        progress_message.message_id)
-                except:
-                    pass
-            else:
-                progress_message = bot.sendMessage(chat_id, progress_bar)
-            progress += 5
-
-        cid = chat.chat_id
-        sleep(0.1)
+CHECK_RATE = 20
+CHECK_WORKERS = 8
+CHECK_ATTEMPTS = 3
+PAGE_SIZE = 200
+DELETE_BATCH = 500
+# seconds between progress edits
+PROGRESS_INTERVAL = 5
+
+LIMITER = RateLimiter(CHECK_RATE)
+CHECK_POOL = ThreadPoolExecutor(
+    max_workers=CHECK_WORKERS, thread_name_prefix="dbcleanup")
+# chats and gbans are scanned side by side, each feeding CHECK_POOL
+SCAN_POOL = ThreadPoolExecutor(max_workers=2)
+CLEANUP_LOCK = threading.Lock()
+
+# {kind: (name, page function, errors meaning invalid, bulk remove, count)}
+CLEANUP_KINDS = {
+    "chats": ("chats", user_sql.get_chat_ids_page, (BadRequest, Unauthorized),
+              user_sql.rem_chats, user_sql.num_chats),
+    "gbans": ("gbanned users", gban_sql.get_gbanned_ids_page, (BadRequest,),
+              gban_sql.ungban_users, gban_sql.num_gbanned_users),
+}
+
+
+def is_invalid(bot, item_id, invalid_errors) -> bool:
+    for _ in range(CHECK_ATTEMPTS):
+        LIMITER.wait()
         try:
-            bot.get_chat(cid, timeout=60)
-        except (BadRequest, Unauthorized):
-            kicked_chats += 1
-            chat_list.append(cid)
-        except:
-            pass
-
-    try:
-        progress_message.delete()
-    except:
-        pass
-
-    if not remove:
-        return kicked_chats
-    else:
-        for muted_chat in chat_list:
-            sleep(0.1)
-            user_sql.rem_chat(muted_chat)
-        return kicked_chats
-
-
-def get_invalid_gban(update: Update,
-                     context: CallbackContext,
-                     remove: bool = False):
-    bot = context.bot
-    banned = gban_sql.get_gban_list()
-    ungbanned_users = 0
-    ungban_list = []
-
-    for user in banned:
-        user_id = user["user_id"]
-        sleep(0.1)
+            bot.get_chat(item_id, timeout=60)
+            return False
+        except RetryAfter as excp:
+            LIMITER.pause(excp.retry_after)
+        except invalid_errors:
+            return True
+        except TelegramError:
+            return False
+    return False
+
+
+class CleanupProgress:
+    """Keeps one progress message up to date for every scan."""
+
+    def __init__(self, bot, chat_id: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.message = None
+        self.last_edit = 0.0
+
+    def update(self, kind: str, checked: int, invalid: int, force=False):
+        with self.lock:
+            self.counts[kind] = (checked, invalid)
+            if not force and perf_counter() - self.last_edit < PROGRESS_INTERVAL:
+                return
+            self.last_edit = perf_counter()
+            text = self.render()
+            try:
+                if self.message:
+                    self.bot.edit_message_text(text, self.chat_id,
+                                               self.message.message_id)
+                else:
+                    self.message = self.bot.send_message(self.chat_id, text)
+            except TelegramError:
+                pass
+
+    def render(self) -> str:
+        lines = []
+        for kind, (checked, invalid) in self.counts.items():
+            name, _, _, _, count = CLEANUP_KINDS[kind]
+            total = max(count(), checked, 1)
+            lines.append(
+                "Checked {}/{} {} ({}%), {} invalid.".format(
+                    checked, total, name, 100 * checked // total, invalid))
+        return "\n".join(lines)
+
+    def delete(self):
         try:
-            bot.get_chat(user_id)
-        except BadRequest:
-            ungbanned_users += 1
-            ungban_list.append(user_id)
-        except:
+            if self.message:
+                self.message.delete()
+        except TelegramError:
             pass
 
-    if not remove:
-        return ungbanned_users
-    else:
-        for user_id in ungban_list:
-            sleep(0.1)
-            gban_sql.ungban_user(user_id)
-        return ungbanned_users
+
+def scan_invalid(bot, kind: str, progress: CleanupProgress) -> int:
+    """
+    Check every row of a kind, resuming from the last saved page.
+
+    :return: how many invalid rows were found
+    """
+    _, get_page, invalid_errors, _, _ = CLEANUP_KINDS[kind]
+    checkpoint = sql.get_checkpoint(kind)
+    cursor, checked = checkpoint[:2] if checkpoint else (None, 0)
+    invalid_count = len(sql.get_candidates(kind))
+    progress.update(kind, checked, invalid_count, force=True)
+
+    while True:
+        page = get_page(cursor, PAGE_SIZE)
+        if not page:
+            break
+        results = CHECK_POOL.map(is_invalid, repeat(bot), page,
+                                 repeat(invalid_errors))
+        invalid = [item_id for item_id, bad in zip(page, results) if bad]
+        cursor = page[-1]
+        checked += len(page)
+        invalid_count += len(invalid)
+        sql.save_checkpoint(kind, cursor, checked, invalid)
+        progress.update(kind, checked, invalid_count)
+
+    sql.save_checkpoint(kind, cursor, checked, finished=True)
+    return invalid_count
+
+
+def remove_invalid(kind: str) -> int:
+    _, _, _, remove, _ = CLEANUP_KINDS[kind]
+    item_ids = sql.get_candidates(kind)
+    removed = 0
+    for start in range(0, len(item_ids), DELETE_BATCH):
+        removed += remove(item_ids[start:start + DELETE_BATCH])
+    sql.reset(kind)
+    return removed
 
 
 @run_async
@@ -91,11 +142,26 @@ def get_invalid_gban(update: Update,
 def dbcleanup(update: Update, context: CallbackContext):
     msg = update.effective_message
 
-    msg.reply_text("Getting invalid chat count ...")
-    invalid_chat_count = get_invalid_chats(update, context)
-
-    msg.reply_text("Getting invalid gbanned count ...")
-    invalid_gban_count = get_invalid_gban(update, context)
+    if not CLEANUP_LOCK.acquire(blocking=False):
+        msg.reply_text("A DB cleanup is already running.")
+        return
+    try:
+        for kind in CLEANUP_KINDS:
+            checkpoint = sql.get_checkpoint(kind)
+            if checkpoint and checkpoint[2]:
+                # the last scan finished, start over
+                sql.reset(kind)
+            elif checkpoint:
+                msg.reply_text("Resuming the last {} check ...".format(
+                    CLEANUP_KINDS[kind][0]))
+
+        progress = CleanupProgress(context.bot, update.effective_chat.id)
+        invalid_chat_count, invalid_gban_count = SCAN_POOL.map(
+            scan_invalid, repeat(context.bot), ("chats", "gbans"),
+            repeat(progress))
+        progress.delete()
+    finally:
+        CLEANUP_LOCK.release()
 
     reply = f"Total invalid chats - {invalid_chat_count}\n"
     reply += f"Total invalid gbanned users - {invalid_gban_count}"
@@ -128,10 +194,16 @@ def callback_button(update: Update, context: CallbackContext):
             query.answer("You are not allowed to use this.")
     elif query_type == "db_cleanup":
         if query.from_user.id in admin_list:
-            bot.editMessageText("Cleaning up DB ...", chat_id,
-                                message.message_id)
-            invalid_chat_count = get_invalid_chats(update, context, True)
-            invalid_gban_count = get_invalid_gban(update, context, True)
+            if not CLEANUP_LOCK.acquire(blocking=False):
+                query.answer("A DB cleanup is already running.")
+                return
+            try:
+                bot.editMessageText("Cleaning up DB ...", chat_id,
+                                    message.message_id)
+                invalid_chat_count = remove_invalid("chats")
+                invalid_gban_count = remove_invalid("gbans")
+            finally:
+                CLEANUP_LOCK.release()
             reply = "Cleaned up {} chats and {} gbanned users from db.".format(
                 invalid_chat_count, invalid_gban_count)
             bot.sendMessage(chat_id, reply)
@@ -1,14 +1,20 @@
 import os
 import datetime
+import tracemalloc
+from io import BytesIO
 
 from telethon import events
 from telegram import Update
-from telegram.ext import CallbackContext, CommandHandler, run_async
+from telegram.ext import CallbackContext, CommandHandler, TypeHandler, run_async
 
-from SaitamaRobot import telethn, dispatcher
+from SaitamaRobot import telethn, dispatcher, updater
+from SaitamaRobot.modules.helper_funcs import http_client, memory, profiler
+from SaitamaRobot.modules.helper_funcs.recorder import RECORDER
 from SaitamaRobot.modules.helper_funcs.chat_status import dev_plus
 
 DEBUG_MODE = False
+# ahead of every other group, so the update is recorded as it came in
+RECORD_GROUP = -100
 
 
 @run_async
@@ -37,17 +43,142 @@ async def i_do_nothing_yes(event):
     global DEBUG_MODE
     if DEBUG_MODE:
         print(f"-{event.from_id} ({event.chat_id}) : {event.text}")
-        if os.path.exists('updates.txt'):
-            with open('updates.txt', 'r') as f:
-                text = f.read()
-            with open('updates.txt', 'w+') as f:
-                f.write(text +
-                        f"\n-{event.from_id} ({event.chat_id}) : {event.text}")
-        else:
-            with open('updates.txt', 'w+') as f:
-                f.write(
-                    f"- {event.from_id} ({event.chat_id}) : {event.text} | {datetime.datetime.now()}"
-                )
+        # append, rereading the whole file per command got slower every time
+        with open('updates.txt', 'a') as f:
+            f.write(
+                f"- {event.from_id} ({event.chat_id}) : {event.text} | {datetime.datetime.now()}\n"
+            )
+
+
+@run_async
+@dev_plus
+def http_cache(update: Update, context: CallbackContext):
+    stats = http_client.cache_stats()
+    update.effective_message.reply_text(
+        f"Http cache: {stats['size']} entries, {stats['in_flight']} in flight\n"
+        f"Hits: {stats['hits']}, coalesced: {stats['coalesced']}, "
+        f"misses: {stats['misses']}, errors: {stats['errors']}\n"
+        f"Hit rate: {stats['hit_rate']:.1%}")
+
+
+@run_async
+@dev_plus
+def profile(update: Update, context: CallbackContext):
+    message = update.effective_message
+    try:
+        seconds = min(float(context.args[0]), profiler.MAX_SECONDS
+                     ) if context.args else 10
+        top = int(context.args[1]) if len(context.args) > 1 else 15
+    except ValueError:
+        message.reply_text("Usage: /profile <seconds> <top n>")
+        return
+    if seconds <= 0 or top <= 0:
+        message.reply_text("Usage: /profile <seconds> <top n>")
+        return
+
+    if not profiler.PROFILE_LOCK.acquire(blocking=False):
+        message.reply_text("A profile is already running.")
+        return
+    try:
+        message.reply_text(f"Profiling for {seconds:g}s...")
+        stacks, rounds, idle = profiler.sample(seconds)
+    finally:
+        profiler.PROFILE_LOCK.release()
+
+    if not stacks:
+        message.reply_text(f"Nothing but idle threads in {rounds} samples.")
+        return
+    busy = sum(stacks.values())
+    lines = [
+        f"{rounds} samples, {busy} busy thread samples, {idle} idle skipped.",
+        "self / total  function",
+    ]
+    for name, own, total in profiler.hot_functions(stacks, top):
+        lines.append(f"{own / busy:6.1%} / {total / busy:6.1%}  {name}")
+
+    collapsed = BytesIO(profiler.collapsed(stacks).encode())
+    collapsed.name = "profile.collapsed"
+    message.reply_document(
+        document=collapsed, caption="Collapsed stacks, for flamegraph.pl")
+    text = "\n".join(lines)
+    if len(text) > 4096:
+        text = text[:4093] + "..."
+    message.reply_text(text)
+
+
+@run_async
+@dev_plus
+def record(update: Update, context: CallbackContext):
+    message = update.effective_message
+    args = context.args
+    if args and args[0] in ('on', 'yes'):
+        try:
+            sample = float(args[1]) if len(args) > 1 else 1.0
+        except ValueError:
+            sample = 0.0
+        if not 0 < sample <= 1:
+            message.reply_text("The sample rate goes from 0 to 1.")
+            return
+        RECORDER.sample = sample
+        message.reply_text(
+            f"Recording {sample:.0%} of updates to {RECORDER.path}.")
+    elif args and args[0] in ('off', 'no'):
+        RECORDER.sample = 0.0
+        RECORDER.flush()
+        message.reply_text(
+            f"Recording stopped, {RECORDER.recorded} updates recorded.")
+    elif RECORDER.sample:
+        message.reply_text(f"Recording {RECORDER.sample:.0%} of updates, "
+                           f"{RECORDER.recorded} so far.")
+    else:
+        message.reply_text("Not recording. Use /record on <sample rate>.")
+
+
+def record_update(update: Update, context: CallbackContext):
+    RECORDER.record(update)
+
+
+def flush_recording(context: CallbackContext):
+    RECORDER.flush()
+
+
+def _mib(size) -> str:
+    return "?" if size is None else f"{size / 1024 / 1024:.2f}MiB"
+
+
+@run_async
+@dev_plus
+def cache_memory(update: Update, context: CallbackContext):
+    message = update.effective_message
+    message.reply_text("Measuring caches, this walks every entry...")
+    rows = memory.cache_report()
+    lines = [f"RSS: {_mib(memory.current_rss())}", ""]
+    for name, entries, size in rows:
+        entries = "-" if entries is None else entries
+        lines.append(f"{name}: {entries} entries, {_mib(size)}")
+    lines.append(f"\nTotal: {_mib(sum(size or 0 for _, _, size in rows))}")
+    text = "\n".join(lines)
+    if len(text) > 4096:
+        text = text[:4093] + "..."
+    message.reply_text(text)
+
+
+@run_async
+@dev_plus
+def memory_diff(update: Update, context: CallbackContext):
+    message = update.effective_message
+    if not tracemalloc.is_tracing():
+        message.reply_text("Set TRACEMALLOC_INTERVAL to trace allocations.")
+        return
+    diff = memory.snapshot_diff()
+    if diff is None:
+        message.reply_text("Took the first snapshot, diffs start next time.")
+        return
+    text = "Growth since the last snapshot:\n" + "\n".join(
+        str(stat) for stat in diff)
+    if len(text) > 4096:
+        text = text[:4093] + "..."
+    message.reply_text(text)
 
 
 support_chat = os.getenv('SUPPORT_CHAT')
@@ -73,6 +204,32 @@ dispatcher.add_handler(LOG_HANDLER)
 DEBUG_HANDLER = CommandHandler("debug", debug)
 dispatcher.add_handler(DEBUG_HANDLER)
 
+HTTP_CACHE_HANDLER = CommandHandler("httpcache", http_cache)
+dispatcher.add_handler(HTTP_CACHE_HANDLER)
+
+PROFILE_HANDLER = CommandHandler("profile", profile)
+dispatcher.add_handler(PROFILE_HANDLER)
+
+RECORD_HANDLER = CommandHandler("record", record)
+dispatcher.add_handler(RECORD_HANDLER)
+
+CACHE_MEMORY_HANDLER = CommandHandler("cachemem", cache_memory)
+dispatcher.add_handler(CACHE_MEMORY_HANDLER)
+
+MEMORY_DIFF_HANDLER = CommandHandler("memdiff", memory_diff)
+dispatcher.add_handler(MEMORY_DIFF_HANDLER)
+
+RECORD_UPDATE_HANDLER = TypeHandler(Update, record_update)
+dispatcher.add_handler(RECORD_UPDATE_HANDLER, RECORD_GROUP)
+
+updater.job_queue.run_repeating(flush_recording, interval=5, first=5)
+
 __mod_name__ = "Debug"
-__command_list__ = ["debug"]
-__handlers__ = [DEBUG_HANDLER]
+__command_list__ = [
+    "debug", "httpcache", "profile", "record", "cachemem", "memdiff"
+]
+__handlers__ = [
+    DEBUG_HANDLER, HTTP_CACHE_HANDLER, PROFILE_HANDLER, RECORD_HANDLER,
+    CACHE_MEMORY_HANDLER, MEMORY_DIFF_HANDLER,
+    (RECORD_UPDATE_HANDLER, RECORD_GROUP)
+]
@@ -599,6 +599,7 @@ Group admins/group owners do not need these commands.
  ╔ *Debugging and Shell:* 
  ╠ `/debug <on/off>`*:* Logs commands to updates.txt
  ╠ `/logs`*:* Run this in support group to get logs in pm
+ ╠ `/httpcache`*:* Hit rates of the shared http cache
  ╠ `/eval`*:* Self explanatory
  ╠ `/sh`*:* Runs shell command
  ╠ `/shell`*:* Runs shell command
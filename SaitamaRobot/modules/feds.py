@@ -11,6 +11,7 @@ from SaitamaRobot import (EVENT_LOGS, LOGGER, OWNER_ID, DRAGONS, TIGERS, WOLVES,
                           dispatcher)
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
 from SaitamaRobot.modules.helper_funcs.alternate import send_message
+from SaitamaRobot.modules.helper_funcs.broadcast import start_broadcast
 from SaitamaRobot.modules.helper_funcs.chat_status import is_user_admin
 from SaitamaRobot.modules.helper_funcs.extraction import (extract_unt_fedban,
                                                           extract_user,
@@ -1123,31 +1124,15 @@ def fed_broadcast(update: Update, context: CallbackContext):
         except:
             broadcaster = user.first_name + " " + user.last_name
         text += "\n\n- {}".format(mention_markdown(user.id, broadcaster))
-        chat_list = sql.all_fed_chats(fed_id)
-        failed = 0
-        for chat in chat_list:
-            title = "*New broadcast from Fed {}*\n".format(fedinfo['fname'])
-            try:
-                bot.sendMessage(chat, title + text, parse_mode="markdown")
-            except TelegramError:
-                try:
-                    dispatcher.bot.getChat(chat)
-                except Unauthorized:
-                    failed += 1
-                    sql.chat_leave_fed(chat)
-                    LOGGER.info(
-                        "Chat {} has left fed {} because I was punched".format(
-                            chat, fedinfo['fname']))
-                    continue
-                failed += 1
-                LOGGER.warning("Couldn't send broadcast to {}".format(
-                    str(chat)))
-
-        send_text = "The federation broadcast is complete"
-        if failed >= 1:
-            send_text += "{} the group failed to receive the message, probably because it left the Federation.".format(
-                failed)
-        update.effective_message.reply_text(send_text)
+        title = "*New broadcast from Fed {}*\n".format(fedinfo['fname'])
+        start_broadcast(
+            bot,
+            "Federation broadcast",
+            ("fed",),
+            title + text,
+            update.effective_chat.id,
+            parse_mode="markdown",
+            fed_id=fed_id)
 
 
 @run_async
@@ -1,11 +1,11 @@
 import os
-from time import sleep
 
+import SaitamaRobot.modules.sql.chat_meta_sql as chat_meta_sql
 from SaitamaRobot import OWNER_ID, dispatcher
+from SaitamaRobot.modules.helper_funcs.chat_meta import bot_left
 from SaitamaRobot.modules.helper_funcs.extraction import extract_user
-from SaitamaRobot.modules.sql.users_sql import get_user_com_chats
+from SaitamaRobot.modules.sql.users_sql import get_user_com_chat_names
 from telegram import Update
-from telegram.error import BadRequest, RetryAfter, Unauthorized
 from telegram.ext import CallbackContext, CommandHandler, Filters
 from telegram.ext.dispatcher import run_async
 
@@ -18,23 +18,19 @@ def get_user_common_chats(update: Update, context: CallbackContext):
     if not user:
         msg.reply_text("I share no common chats with the void.")
         return
-    common_list = get_user_com_chats(user)
+    common_list = get_user_com_chat_names(user)
     if not common_list:
         msg.reply_text("No common chats with this user!")
         return
     name = bot.get_chat(user).first_name
     text = f"<b>Common chats with {name}</b>\n"
-    for chat in common_list:
-        try:
-            chat_name = bot.get_chat(chat).title
-            sleep(0.3)
-            text += f"• <code>{chat_name}</code>\n"
-        except BadRequest:
-            pass
-        except Unauthorized:
-            pass
-        except RetryAfter as e:
-            sleep(e.retry_after)
+    for chat_id, chat_name in common_list:
+        meta = chat_meta_sql.get_meta(chat_id)
+        if bot_left(meta):
+            continue
+        if meta and meta.title:
+            chat_name = meta.title
+        text += f"• <code>{chat_name}</code>\n"
 
     if len(text) < 4096:
         msg.reply_text(text, parse_mode="HTML")
@@ -1,20 +1,21 @@
 import datetime
 from typing import List
 
-import requests
 from SaitamaRobot import TIME_API_KEY, dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext, run_async
 
 
 def generate_time(to_find: str, findtype: List[str]) -> str:
-    data = requests.get(
+    # the zone list barely changes, the current time is computed locally
+    data = http_client.get(
         f"https://api.timezonedb.com/v2.1/list-time-zone"
         f"?key={TIME_API_KEY}"
         f"&format=json"
-        f"&fields=countryCode,countryName,zoneName,gmtOffset,timestamp,dst"
-    ).json()
+        f"&fields=countryCode,countryName,zoneName,gmtOffset,timestamp,dst",
+        ttl=60 * 60).json()
 
     for zone in data["zones"]:
         for eachtype in findtype:
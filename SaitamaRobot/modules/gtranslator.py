@@ -1,17 +1,19 @@
 from emoji import UNICODE_EMOJI
-from google_trans_new import LANGUAGES, google_translator
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext, run_async
 
 from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
+
+google_trans_new = lazy_import("google_trans_new")
 
 
 @run_async
 def totranslate(update: Update, context: CallbackContext):
     message = update.effective_message
     problem_lang_code = []
-    for key in LANGUAGES:
+    for key in google_trans_new.LANGUAGES:
         if "-" in key:
             problem_lang_code.append(key)
 
@@ -60,7 +62,7 @@ def totranslate(update: Update, context: CallbackContext):
             if emoji in text:
                 text = text.replace(emoji, '')
 
-        trl = google_translator()
+        trl = google_trans_new.google_translator()
         if source_lang is None:
             detection = trl.detect(text)
             trans_str = trl.translate(text, lang_tgt=dest_lang)
@@ -0,0 +1,254 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from time import perf_counter, sleep
+
+import SaitamaRobot.modules.sql.broadcast_sql as sql
+import SaitamaRobot.modules.sql.feds_sql as feds_sql
+import SaitamaRobot.modules.sql.users_sql as users_sql
+from SaitamaRobot import LOGGER
+from telegram.error import (BadRequest, ChatMigrated, NetworkError, RetryAfter,
+                            TelegramError, Unauthorized)
+
+# telegram allows about 30 messages a second for bulk sends
+SEND_RATE = 25
+BROADCAST_WORKERS = 4
+PAGE_SIZE = 200
+SEND_ATTEMPTS = 3
+# seconds between progress edits of the status message
+STATUS_INTERVAL = 30
+
+# recipients answering with these are gone for good
+DEAD_CHAT_ERRORS = ("Chat not found", "Peer_id_invalid")
+
+SENT, FAILED, PRUNED = "sent", "failed", "pruned"
+
+SEND_POOL = ThreadPoolExecutor(
+    max_workers=BROADCAST_WORKERS, thread_name_prefix="broadcast")
+RUNNING_LOCK = threading.Lock()
+# {job_id: stats dict} for broadcasts running in this process
+RUNNING = {}
+
+
+class RateLimiter:
+    """Spaces out calls from any number of threads to a fixed rate."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = perf_counter()
+            send_at = max(now, self.next_at)
+            self.next_at = send_at + self.interval
+        if send_at > now:
+            sleep(send_at - now)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.next_at = max(self.next_at, perf_counter() + seconds)
+
+
+# one limiter for every broadcast, the limit is per bot
+LIMITER = RateLimiter(SEND_RATE)
+
+
+def send_to(bot, chat_id, text: str, parse_mode: str = None) -> str:
+    for _ in range(SEND_ATTEMPTS):
+        LIMITER.wait()
+        try:
+            bot.send_message(
+                chat_id,
+                text,
+                parse_mode=parse_mode,
+                disable_web_page_preview=True)
+            return SENT
+        except RetryAfter as excp:
+            LIMITER.pause(excp.retry_after)
+        except ChatMigrated as excp:
+            chat_id = excp.new_chat_id
+        except Unauthorized as excp:
+            # never started the bot, that doesn't make them a dead user
+            if "can't initiate conversation" in excp.message:
+                return FAILED
+            return PRUNED
+        except BadRequest as excp:
+            return PRUNED if excp.message in DEAD_CHAT_ERRORS else FAILED
+        except NetworkError:
+            continue
+        except TelegramError:
+            return FAILED
+    return FAILED
+
+
+def _chats_page(job, after):
+    return users_sql.get_chat_ids_page(after, PAGE_SIZE)
+
+
+def _prune_chat(job, chat_id):
+    users_sql.rem_chat(chat_id)
+
+
+def _users_page(job, after):
+    return users_sql.get_user_ids_page(after, PAGE_SIZE)
+
+
+def _prune_user(job, user_id):
+    users_sql.del_user(int(user_id))
+
+
+def _fed_chats_page(job, after):
+    # copy, chat_leave_fed edits the cached list in place
+    chats = sorted(feds_sql.all_fed_chats(job.fed_id))
+    if after is not None:
+        chats = [chat_id for chat_id in chats if chat_id > after]
+    return chats[:PAGE_SIZE]
+
+
+def _prune_fed_chat(job, chat_id):
+    feds_sql.chat_leave_fed(chat_id)
+    LOGGER.info("Chat {} has left fed {} because I was punched".format(
+        chat_id, job.fed_id))
+
+
+# {target: (page function, prune function)}
+SOURCES = {
+    "chats": (_chats_page, _prune_chat),
+    "users": (_users_page, _prune_user),
+    "fed": (_fed_chats_page, _prune_fed_chat),
+}
+
+
+def status_text(job, stats, done=False) -> str:
+    return ("{} {}.\nSent: {}.\nFailed: {}.\nPruned: {}.\n"
+            "Rate: {:.1f} messages/s.".format(
+                job.name, "complete" if done else "in progress",
+                stats["sent"], stats["failed"], stats["pruned"],
+                stats["rate"]))
+
+
+def report(bot, job, stats, done=False):
+    text = status_text(job, stats, done)
+    try:
+        if done or not job.status_message:
+            # a new message on completion, so the sender gets notified
+            bot.send_message(int(job.origin_chat), text)
+        else:
+            bot.edit_message_text(
+                text,
+                chat_id=int(job.origin_chat),
+                message_id=job.status_message)
+    except TelegramError as excp:
+        LOGGER.warning("Couldn't report broadcast %s progress: %s",
+                       job.job_id, excp.message)
+
+
+def run_broadcast(bot, job_id: int):
+    """
+    Send a broadcast job to its recipients, page by page.
+
+    Progress is saved after every page, so a restarted bot resumes where the
+    last one stopped; at most the page in flight is sent twice.
+    """
+    job = sql.get_job(job_id)
+    if not job or job.finished:
+        return
+
+    stats = {
+        "sent": job.sent,
+        "failed": job.failed,
+        "pruned": job.pruned,
+        "rate": 0.0,
+    }
+    with RUNNING_LOCK:
+        if job_id in RUNNING:
+            return
+        RUNNING[job_id] = stats
+
+    targets = job.targets.split(",")
+    phase, cursor = job.phase, job.cursor
+    started = last_report = perf_counter()
+    sent_here = 0
+    try:
+        while phase < len(targets):
+            get_page, prune = SOURCES[targets[phase]]
+            page = get_page(job, cursor)
+            if not page:
+                phase += 1
+                cursor = None
+                continue
+
+            results = SEND_POOL.map(send_to, repeat(bot), page,
+                                    repeat(job.text), repeat(job.parse_mode))
+            for recipient, result in zip(page, results):
+                stats[result] += 1
+                if result == SENT:
+                    sent_here += 1
+                elif result == PRUNED:
+                    prune(job, recipient)
+
+            cursor = page[-1]
+            stats["rate"] = sent_here / max(perf_counter() - started, 1e-6)
+            sql.save_progress(job_id, phase, cursor, stats["sent"],
+                              stats["failed"], stats["pruned"])
+
+            if perf_counter() - last_report >= STATUS_INTERVAL:
+                last_report = perf_counter()
+                report(bot, job, stats)
+
+        sql.save_progress(
+            job_id,
+            phase,
+            None,
+            stats["sent"],
+            stats["failed"],
+            stats["pruned"],
+            finished=True)
+        report(bot, job, stats, done=True)
+    except Exception:
+        LOGGER.exception("Broadcast %s stopped, it resumes on restart",
+                         job_id)
+    finally:
+        with RUNNING_LOCK:
+            RUNNING.pop(job_id, None)
+
+
+def start_thread(bot, job_id: int):
+    threading.Thread(
+        target=run_broadcast,
+        args=(bot, job_id),
+        name="broadcast-{}".format(job_id),
+        daemon=True).start()
+
+
+def start_broadcast(bot,
+                    name: str,
+                    targets,
+                    text: str,
+                    origin_chat: int,
+                    parse_mode: str = None,
+                    fed_id: str = None) -> int:
+    """
+    Queue a broadcast and start sending it in the background.
+
+    :param targets: recipient sources in sending order, keys of SOURCES
+    :return: the job id
+    """
+    job_id = sql.add_job(name, targets, text, origin_chat, parse_mode, fed_id)
+    try:
+        message = bot.send_message(
+            origin_chat, "{} #{} started.".format(name, job_id))
+        sql.set_status_message(job_id, message.message_id)
+    except TelegramError:
+        pass
+    start_thread(bot, job_id)
+    return job_id
+
+
+def resume_broadcasts(context):
+    for job_id in sql.get_unfinished_jobs():
+        LOGGER.info("Resuming broadcast %s", job_id)
+        start_thread(context.bot, job_id)
+
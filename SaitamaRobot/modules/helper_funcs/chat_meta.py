@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import SaitamaRobot.modules.sql.chat_meta_sql as sql
+from SaitamaRobot import LOGGER
+from SaitamaRobot.modules.helper_funcs.broadcast import RateLimiter
+from telegram import Chat
+from telegram.error import BadRequest, RetryAfter, TelegramError, Unauthorized
+
+# member counts and the bot's status are refetched after this many seconds
+REFRESH_TTL = 60 * 60 * 6
+REFRESH_BATCH = 100
+REFRESH_RATE = 10
+# bot statuses meaning the chat is gone for us
+BOT_GONE = ("left", "kicked")
+
+LIMITER = RateLimiter(REFRESH_RATE)
+REFRESH_POOL = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="chat_meta")
+PENDING_LOCK = threading.Lock()
+# chat ids of the refresh batch in flight
+PENDING = set()
+
+
+def record_chat(chat: Chat):
+    """Store what an update tells about a chat, writes only on change."""
+    return sql.set_meta(
+        chat.id,
+        title=chat.title or chat.first_name,
+        chat_type=chat.type,
+        username=chat.username)
+
+
+def get_chat_meta(bot, chat_id):
+    """
+    Chat metadata from the store, falling back to one getChat.
+
+    :return: a ChatMeta, which has id and title like telegram.Chat
+    :raises BadRequest, Unauthorized: as getChat does, for unknown chats
+    """
+    meta = sql.get_meta(chat_id)
+    if meta and meta.title:
+        return meta
+    return record_chat(bot.get_chat(chat_id))
+
+
+def bot_left(meta) -> bool:
+    return bool(meta) and meta.bot_status in BOT_GONE
+
+
+def refresh_chat(bot, chat_id):
+    try:
+        LIMITER.wait()
+        chat = bot.get_chat(chat_id)
+        LIMITER.wait()
+        member_count = bot.get_chat_members_count(chat_id)
+        LIMITER.wait()
+        bot_status = bot.get_chat_member(chat_id, bot.id).status
+        sql.set_meta(
+            chat_id,
+            refreshed=True,
+            title=chat.title or chat.first_name,
+            chat_type=chat.type,
+            username=chat.username,
+            member_count=member_count,
+            bot_status=bot_status)
+    except Unauthorized:
+        sql.set_meta(chat_id, refreshed=True, bot_status="kicked")
+    except BadRequest as excp:
+        if excp.message == "Chat not found":
+            sql.set_meta(chat_id, refreshed=True, bot_status="left")
+        else:
+            LOGGER.warning("Couldn't refresh chat %s: %s", chat_id,
+                           excp.message)
+    except RetryAfter as excp:
+        LIMITER.pause(excp.retry_after)
+    except TelegramError:
+        pass
+    finally:
+        with PENDING_LOCK:
+            PENDING.discard(chat_id)
+
+
+def refresh_stale_chats(context):
+    # hand the batch to the pool, the job queue thread is shared
+    with PENDING_LOCK:
+        if PENDING:
+            return
+        chat_ids = sql.get_stale_chat_ids(REFRESH_TTL, REFRESH_BATCH)
+        PENDING.update(chat_ids)
+    for chat_id in chat_ids:
+        REFRESH_POOL.submit(refresh_chat, context.bot, chat_id)
@@ -1,18 +1,63 @@
 from time import perf_counter
 from functools import wraps
+from typing import List, Optional
 from cachetools import TTLCache
 from threading import RLock
 from SaitamaRobot import (DEL_CMDS, DEV_USERS, DRAGONS, SUPPORT_CHAT, DEMONS,
                           TIGERS, WOLVES, dispatcher)
+from SaitamaRobot.modules.helper_funcs import metrics
+from SaitamaRobot.modules.helper_funcs.telethn.chatstatus import invalidate_admin_ids
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
 
 from telegram import Chat, ChatMember, ParseMode, Update
 from telegram.ext import CallbackContext
 
 # stores admemes in memory for 10 min.
+# {chat_id: [ChatMember, ...]} - the full records, so status, custom title,
+# is_bot and rights can all be answered without another api call.
 ADMIN_CACHE = TTLCache(maxsize=512, ttl=60 * 10, timer=perf_counter)
+register_cache(__name__, "ADMIN_CACHE")
 THREAD_LOCK = RLock()
 
 
+def get_admin_roster(chat_id: int) -> List[ChatMember]:
+    with THREAD_LOCK:
+        # try to fetch from cache first.
+        try:
+            chat_admins = ADMIN_CACHE[chat_id]
+            metrics.cache_hit("admin")
+            return chat_admins
+        except KeyError:
+            # keyerror happend means cache is deleted,
+            # so query bot api again while saving it in cache for future useage...
+            metrics.cache_miss("admin")
+            chat_admins = dispatcher.bot.getChatAdministrators(chat_id)
+            ADMIN_CACHE[chat_id] = chat_admins
+            return chat_admins
+
+
+def get_admin_member(chat_id: int, user_id: int) -> Optional[ChatMember]:
+    for admin in get_admin_roster(chat_id):
+        if admin.user.id == user_id:
+            return admin
+    return None
+
+
+def get_admins_with_right(chat_id: int, right: str) -> List[ChatMember]:
+    # right is a ChatMember flag like 'can_restrict_members', creator has all
+    return [
+        admin for admin in get_admin_roster(chat_id)
+        if admin.status == 'creator' or getattr(admin, right, False)
+    ]
+
+
+def invalidate_admin_cache(chat_id: int):
+    with THREAD_LOCK:
+        ADMIN_CACHE.pop(chat_id, None)
+    # the telethon helpers keep their own admin sets
+    invalidate_admin_ids(chat_id)
+
+
 def is_whitelist_plus(chat: Chat,
                       user_id: int,
                       member: ChatMember = None) -> bool:
@@ -38,21 +83,7 @@ def is_user_admin(chat: Chat, user_id: int, member: ChatMember = None) -> bool:
         return True
 
     if not member:
-        with THREAD_LOCK:
-            # try to fetch from cache first.
-            try:
-                return user_id in ADMIN_CACHE[chat.id]
-            except KeyError:
-                # keyerror happend means cache is deleted,
-                # so query bot api again and return user status
-                # while saving it in cache for future useage...
-                chat_admins = dispatcher.bot.getChatAdministrators(chat.id)
-                admin_list = [x.user.id for x in chat_admins]
-                ADMIN_CACHE[chat.id] = admin_list
-
-                if user_id in admin_list:
-                    return True
-                return False
+        return get_admin_member(chat.id, user_id) is not None
 
 
 def is_bot_admin(chat: Chat,
@@ -1,6 +1,7 @@
 import SaitamaRobot.modules.sql.blacklistusers_sql as sql
 from SaitamaRobot import ALLOW_EXCL
 from SaitamaRobot import (DEV_USERS, DRAGONS, DEMONS, TIGERS, WOLVES)
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
 
 from telegram import Update
 from telegram.ext import CommandHandler, MessageHandler, RegexHandler, Filters
@@ -44,9 +45,14 @@ class AntiSpam:
         except BucketFullException:
             return True
 
+    def __len__(self):
+        # users with a bucket, the limiter keeps one per user for good
+        return len(getattr(self.limiter, "bucket_group", ()))
+
 
 SpamChecker = AntiSpam()
 MessageHandlerChecker = AntiSpam()
+register_cache(__name__, "SpamChecker", "MessageHandlerChecker")
 
 
 class CustomCommandHandler(CommandHandler):
@@ -0,0 +1,147 @@
+import json
+import threading
+from concurrent.futures import Future
+from time import perf_counter
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+
+# (connect, read) seconds, used unless a caller passes its own timeout.
+DEFAULT_TIMEOUT = (5, 20)
+# default lifetime of a cached response, callers pick their own ttl
+DEFAULT_TTL = 60 * 5
+
+# one keep-alive session for every lookup module, requests keeps a
+# connection pool per host inside the adapter.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=16)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
+# {cache key: (value, expires at)}, entries carry their own expiry so every
+# caller can pick a ttl; the cache ttl is only an upper bound.
+RESPONSE_CACHE = TTLCache(maxsize=1024, ttl=60 * 60 * 24, timer=perf_counter)
+CACHE_LOCK = threading.RLock()
+# {cache key: Future} for requests currently on the wire
+IN_FLIGHT = {}
+register_cache(__name__, "RESPONSE_CACHE")
+
+STATS = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+
+def normalize_url(url: str, params: dict = None) -> str:
+    scheme, netloc, path, query, _ = urlsplit(url)
+    query_items = parse_qsl(query, keep_blank_values=True)
+    if params:
+        query_items += [(str(k), str(v)) for k, v in params.items()]
+    return urlunsplit((scheme.lower(), netloc.lower(), path or "/",
+                       urlencode(sorted(query_items)), ""))
+
+
+def make_key(method: str, url: str, params: dict = None, body=None) -> tuple:
+    if body is not None and not isinstance(body, (str, bytes)):
+        body = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return method.upper(), normalize_url(url, params), body
+
+
+def cached_call(key, ttl: float, func, *args, cache_if=None, **kwargs):
+    """
+    Run func once per key and ttl, sharing the result with identical calls.
+
+    Callers that arrive while the first call is still running wait for it
+    instead of starting their own. Exceptions are passed on but not cached.
+
+    :param key: hashable cache key, see make_key
+    :param ttl: seconds to keep the result, 0 or None to only coalesce
+    :param func: callable producing the result
+    :param cache_if: optional predicate, results failing it are not cached
+    :return: the result of func
+    """
+    with CACHE_LOCK:
+        try:
+            value, expires = RESPONSE_CACHE[key]
+        except KeyError:
+            pass
+        else:
+            if expires > perf_counter():
+                STATS["hits"] += 1
+                return value
+            del RESPONSE_CACHE[key]
+
+        future = IN_FLIGHT.get(key)
+        if future is not None:
+            STATS["coalesced"] += 1
+            owner = False
+        else:
+            STATS["misses"] += 1
+            future = IN_FLIGHT[key] = Future()
+            owner = True
+
+    if not owner:
+        return future.result()
+
+    try:
+        value = func(*args, **kwargs)
+    except BaseException as excp:
+        with CACHE_LOCK:
+            STATS["errors"] += 1
+            del IN_FLIGHT[key]
+        future.set_exception(excp)
+        raise
+
+    with CACHE_LOCK:
+        if ttl and (cache_if is None or cache_if(value)):
+            RESPONSE_CACHE[key] = (value, perf_counter() + ttl)
+        del IN_FLIGHT[key]
+    future.set_result(value)
+    return value
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return SESSION.request(method, url, **kwargs)
+
+
+def request(method: str,
+            url: str,
+            ttl: float = None,
+            **kwargs) -> requests.Response:
+    """
+    Send a request through the shared session.
+
+    :param method: http method
+    :param url: url to request
+    :param ttl: seconds to cache a successful response for, None to skip the
+        cache. Only pass this for idempotent requests.
+    :return: the response
+    """
+    if ttl is None:
+        return _send(method, url, **kwargs)
+
+    key = make_key(method, url, kwargs.get("params"),
+                   kwargs.get("json", kwargs.get("data")))
+    # only successful answers are worth sharing
+    return cached_call(
+        key, ttl, _send, method, url, cache_if=lambda r: r.ok, **kwargs)
+
+
+def get(url: str, ttl: float = None, **kwargs) -> requests.Response:
+    return request("GET", url, ttl=ttl, **kwargs)
+
+
+def post(url: str, ttl: float = None, **kwargs) -> requests.Response:
+    return request("POST", url, ttl=ttl, **kwargs)
+
+
+def cache_stats() -> dict:
+    with CACHE_LOCK:
+        stats = dict(STATS)
+        stats["size"] = len(RESPONSE_CACHE)
+        stats["in_flight"] = len(IN_FLIGHT)
+    lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+    stats["hit_rate"] = ((stats["hits"] + stats["coalesced"]) / lookups
+                         if lookups else 0.0)
+    return stats
@@ -0,0 +1,149 @@
+import mmap
+import sys
+import threading
+import tracemalloc
+import types
+
+from SaitamaRobot import LOGGER
+
+# {module name: [attribute names]}, looked up on use so rebinding loaders
+# like __load_chat_meta are followed
+CACHES = {}
+TRACE_FRAMES = 10
+TRACE_TOP = 15
+
+# walking into these would count the whole bot, not the cache
+_SKIP = (type, types.ModuleType, types.FunctionType, types.MethodType,
+         types.BuiltinFunctionType, threading.Thread)
+_SKIP_NAMES = {"Bot", "Dispatcher", "Updater", "TelegramClient",
+               "scoped_session", "Session"}
+
+TRACE_LOCK = threading.Lock()
+LAST_SNAPSHOT = None
+
+
+def register_cache(module_name: str, *names: str):
+    """Declare module level caches for /cachemem and the metrics gauges."""
+    CACHES.setdefault(module_name, []).extend(names)
+
+
+def registered_caches():
+    """:return: (name, cache object) pairs, skipping unloaded modules"""
+    for module_name, names in list(CACHES.items()):
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        short = module_name.rsplit(".", 1)[-1]
+        for name in names:
+            yield "{}.{}".format(short, name), getattr(module, name, None)
+
+
+def entries(cache):
+    try:
+        return len(cache)
+    except TypeError:
+        return None
+
+
+def _deep_size(obj) -> int:
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIP) or type(
+                obj).__name__ in _SKIP_NAMES:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            for key, value in list(obj.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(list(obj))
+        attrs = getattr(obj, "__dict__", None)
+        if isinstance(attrs, dict) and id(attrs) not in seen:
+            seen.add(id(attrs))
+            size += sys.getsizeof(attrs)
+            # sqlalchemy state points at the session, not cache data
+            stack.extend(value for key, value in list(attrs.items())
+                         if not key.startswith("_sa_"))
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                stack.append(getattr(obj, slot))
+    return size
+
+
+def deep_size(obj, attempts: int = 3):
+    """
+    Bytes held by obj and everything it references, shared objects once.
+
+    Caches are walked without their locks, a walk racing a write is retried.
+    :return: the size, None if every attempt raced
+    """
+    for _ in range(attempts):
+        try:
+            return _deep_size(obj)
+        except RuntimeError:
+            continue
+    return None
+
+
+def cache_report(with_size: bool = True):
+    """:return: [(name, entries, deep size)], largest first"""
+    rows = []
+    for name, cache in registered_caches():
+        rows.append((name, entries(cache),
+                     deep_size(cache) if with_size else None))
+    rows.sort(key=lambda row: (row[2] or 0, row[1] or 0), reverse=True)
+    return rows
+
+
+def current_rss():
+    # linux only, None elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * mmap.PAGESIZE
+
+
+def start_tracing(frames: int = TRACE_FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def snapshot_diff(keep: bool = False, top: int = TRACE_TOP):
+    """
+    Compare a new snapshot with the last kept one.
+
+    :param keep: make the new snapshot the base for the next diff
+    :return: the top StatisticDiffs by growth, None for the first snapshot
+    """
+    global LAST_SNAPSHOT
+    with TRACE_LOCK:
+        snapshot = _snapshot()
+        last = LAST_SNAPSHOT
+        if keep or last is None:
+            LAST_SNAPSHOT = snapshot
+    if last is None:
+        return None
+    return snapshot.compare_to(last, "lineno")[:top]
+
+
+def trace_job(context):
+    diff = snapshot_diff(keep=True)
+    if not diff:
+        return
+    LOGGER.info("Memory growth by allocation site:\n%s",
+                "\n".join(str(stat) for stat in diff))
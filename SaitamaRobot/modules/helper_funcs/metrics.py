@@ -0,0 +1,352 @@
+import inspect
+import sys
+import threading
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from SaitamaRobot import LOGGER
+from SaitamaRobot.modules.helper_funcs import memory
+from SaitamaRobot.modules.helper_funcs.http_client import cache_stats
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ConversationHandler
+from telegram.ext.dispatcher import DispatcherHandlerStop, run_async
+from telegram.utils.promise import Promise
+
+# upper bounds in seconds, shared by every histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_PACKAGE = "SaitamaRobot.modules.sql"
+# http_client stats keys, coalesced requests waited on another's fetch
+HTTP_RESULTS = {"hits": "hit", "misses": "miss", "coalesced": "coalesced"}
+
+HELP = {
+    "saitama_handler_seconds": ("histogram", "Handler callback run time"),
+    "saitama_handler_errors_total": ("counter", "Handler callbacks that raised"),
+    "saitama_sql_seconds": ("histogram", "Run time of *_sql functions"),
+    "saitama_bot_api_seconds": ("histogram", "Bot API call latency"),
+    "saitama_bot_api_calls_total": ("counter",
+                                    "Bot API calls by method and outcome"),
+    "saitama_cache_requests_total": ("counter", "Cache lookups by result"),
+    "saitama_cache_hit_ratio": ("gauge", "Cache hits over lookups"),
+    "saitama_cache_entries": ("gauge", "Entries held by in-memory caches"),
+    "saitama_sql_statements_total": ("counter",
+                                     "SQL statements run by each handler"),
+    "saitama_sql_over_budget_total": ("counter",
+                                      "Handler calls over the query budget"),
+    "saitama_sql_repeated_total": ("counter",
+                                   "Handler calls repeating one statement"),
+}
+
+# off until start(), so the cache hooks cost a global lookup and nothing more
+ENABLED = False
+LOCK = threading.Lock()
+# {(name, labels): value}, labels being a tuple of (key, value) pairs
+COUNTERS = {}
+# {(name, labels): [count per bucket..., +Inf count, sum]}
+HISTOGRAMS = {}
+# {(name, labels): [seconds, ...]} when set to a dict, the replay harness
+# keeps every observation for exact percentiles
+SAMPLES = None
+
+# the code object of every run_async wrapper, to spot async callbacks
+_ASYNC_CODE = run_async(len).__code__
+INSTRUMENTED = False
+# called with (labels, update) around every instrumented handler call, on
+# the thread running it; sql_audit scopes its query counts with these
+BEFORE_HANDLER = []
+AFTER_HANDLER = []
+
+
+def inc(name: str, labels: tuple, value: float = 1):
+    key = (name, labels)
+    with LOCK:
+        COUNTERS[key] = COUNTERS.get(key, 0) + value
+
+
+def observe(name: str, labels: tuple, seconds: float):
+    key = (name, labels)
+    with LOCK:
+        histogram = HISTOGRAMS.get(key)
+        if histogram is None:
+            histogram = HISTOGRAMS[key] = [0] * (len(BUCKETS) + 2)
+        histogram[bisect_left(BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+        if SAMPLES is not None:
+            SAMPLES.setdefault(key, []).append(seconds)
+
+
+def cache_hit(cache: str):
+    if ENABLED:
+        inc("saitama_cache_requests_total", (("cache", cache),
+                                             ("result", "hit")))
+
+
+def cache_miss(cache: str):
+    if ENABLED:
+        inc("saitama_cache_requests_total", (("cache", cache),
+                                             ("result", "miss")))
+
+
+def _handler_labels(func) -> tuple:
+    # the module label matches the names in ALL_MODULES
+    return (("module", func.__module__.rsplit(".", 1)[-1]),
+            ("callback", func.__name__))
+
+
+def _is_async(func) -> bool:
+    while func is not None:
+        if getattr(func, "__code__", None) is _ASYNC_CODE:
+            return True
+        func = getattr(func, "__wrapped__", None)
+    return False
+
+
+def _update_of(args):
+    return args[0] if args and isinstance(args[0], Update) else None
+
+
+def _timed_handler(func):
+    labels = _handler_labels(func)
+
+    @wraps(func)
+    def timed_handler(*args, **kwargs):
+        update = _update_of(args)
+        for hook in BEFORE_HANDLER:
+            hook(labels, update)
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except DispatcherHandlerStop:
+            raise
+        except Exception:
+            inc("saitama_handler_errors_total", labels)
+            raise
+        finally:
+            observe("saitama_handler_seconds", labels,
+                    perf_counter() - started)
+            for hook in AFTER_HANDLER:
+                hook(labels, update)
+
+    return timed_handler
+
+
+def _timed_promise_run(run):
+
+    @wraps(run)
+    def timed_run(promise):
+        labels = _handler_labels(promise.pooled_function)
+        update = _update_of(promise.args)
+        for hook in BEFORE_HANDLER:
+            hook(labels, update)
+        started = perf_counter()
+        run(promise)
+        observe("saitama_handler_seconds", labels, perf_counter() - started)
+        for hook in AFTER_HANDLER:
+            hook(labels, update)
+        if promise._exception is not None and not isinstance(
+                promise._exception, DispatcherHandlerStop):
+            inc("saitama_handler_errors_total", labels)
+
+    return timed_run
+
+
+def _all_handlers(handlers):
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            yield from _all_handlers(handler.entry_points)
+            for state_handlers in handler.states.values():
+                yield from _all_handlers(state_handlers)
+            yield from _all_handlers(handler.fallbacks)
+        elif hasattr(handler, "callback"):
+            yield handler
+
+
+def instrument_handlers(dispatcher):
+    # run_async callbacks only queue a Promise, they are timed where the
+    # worker thread runs it instead
+    Promise.run = _timed_promise_run(Promise.run)
+    for group in dispatcher.handlers.values():
+        for handler in _all_handlers(group):
+            if not _is_async(handler.callback):
+                handler.callback = _timed_handler(handler.callback)
+
+
+def _timed_query(func, labels):
+
+    @wraps(func)
+    def timed_query(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe("saitama_sql_seconds", labels, perf_counter() - started)
+
+    return timed_query
+
+
+def instrument_sql():
+    """
+    Time every public function of the loaded *_sql modules.
+
+    Calls between functions of one module count for both, the durations
+    nest the same way.
+    """
+    timed = {}
+    for name, module in list(sys.modules.items()):
+        if not (name.startswith(SQL_PACKAGE + ".") and name.endswith("_sql")):
+            continue
+        labels_module = ("module", name.rsplit(".", 1)[-1])
+        for attr, func in list(vars(module).items()):
+            if (attr.startswith("_") or not inspect.isfunction(func) or
+                    func.__module__ != name):
+                continue
+            timed[func] = _timed_query(func,
+                                       (labels_module, ("function", attr)))
+            setattr(module, attr, timed[func])
+
+    # `from ..._sql import func` copies live in the importing modules
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("SaitamaRobot") or module is None:
+            continue
+        for attr, value in list(vars(module).items()):
+            if inspect.isfunction(value) and value in timed:
+                setattr(module, attr, timed[value])
+
+
+def instrument_bot(bot):
+    request = bot.request
+    post = request.post
+
+    def timed_post(url, data, timeout=None):
+        method = url.rsplit("/", 1)[-1]
+        outcome = "ok"
+        started = perf_counter()
+        try:
+            return post(url, data, timeout=timeout)
+        except TelegramError as excp:
+            # RetryAfter, BadRequest, Unauthorized, TimedOut...
+            outcome = type(excp).__name__
+            raise
+        finally:
+            observe("saitama_bot_api_seconds", (("method", method),),
+                    perf_counter() - started)
+            inc("saitama_bot_api_calls_total", (("method", method),
+                                                ("outcome", outcome)))
+
+    request.post = timed_post
+
+
+def _cache_sizes():
+    # entry counts only, deep sizes are too slow for every scrape
+    for name, cache in memory.registered_caches():
+        count = memory.entries(cache)
+        if count is not None:
+            module, attr = name.split(".", 1)
+            yield (("module", module), ("cache", attr)), count
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(
+        key,
+        str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                          for key, value in pairs) + "}"
+
+
+def render() -> str:
+    with LOCK:
+        counters = dict(COUNTERS)
+        histograms = {key: list(value) for key, value in HISTOGRAMS.items()}
+
+    # the http client counts for itself
+    http_stats = cache_stats()
+    for stat, result in HTTP_RESULTS.items():
+        counters[("saitama_cache_requests_total",
+                  (("cache", "http"), ("result", result)))] = http_stats[stat]
+
+    gauges = {}
+    lookups = {}
+    for (name, labels), value in counters.items():
+        if name == "saitama_cache_requests_total":
+            cache, result = labels[0], labels[1][1]
+            hits, total = lookups.get(cache, (0, 0))
+            lookups[cache] = (hits + (value if result != "miss" else 0),
+                              total + value)
+    for cache, (hits, total) in lookups.items():
+        if total:
+            gauges[("saitama_cache_hit_ratio", (cache,))] = hits / total
+    for labels, size in _cache_sizes():
+        gauges[("saitama_cache_entries", labels)] = size
+
+    lines = []
+    for name, (kind, text) in HELP.items():
+        lines.append("# HELP {} {}".format(name, text))
+        lines.append("# TYPE {} {}".format(name, kind))
+        if kind == "histogram":
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), histogram):
+                    cumulative += count
+                    lines.append("{}_bucket{} {}".format(
+                        name, _format_labels(labels, (("le", bound),)),
+                        cumulative))
+                lines.append("{}_sum{} {}".format(name, _format_labels(labels),
+                                                  histogram[-1]))
+                lines.append("{}_count{} {}".format(
+                    name, _format_labels(labels), cumulative))
+        else:
+            values = counters if kind == "counter" else gauges
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append("{}{} {}".format(name, _format_labels(labels),
+                                                  value))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scrapes every few seconds would flood the log
+        pass
+
+
+def instrument(dispatcher):
+    """
+    Wrap handlers, sql functions and bot api calls, once. Call after every
+    handler is registered.
+    """
+    global ENABLED, INSTRUMENTED
+    if INSTRUMENTED:
+        return
+    INSTRUMENTED = True
+    instrument_handlers(dispatcher)
+    instrument_sql()
+    instrument_bot(dispatcher.bot)
+    ENABLED = True
+
+
+def start(dispatcher, port: int):
+    """Instrument everything and serve /metrics on port."""
+    instrument(dispatcher)
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics", daemon=True).start()
+    LOGGER.info("Serving metrics on port %s", port)
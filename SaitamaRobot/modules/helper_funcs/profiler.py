@@ -0,0 +1,88 @@
+import os
+import sys
+import threading
+from collections import Counter
+from time import perf_counter, sleep
+
+# 100 samples a second, cheap enough to run on a live bot
+SAMPLE_INTERVAL = 0.01
+MAX_SECONDS = 120
+# leaf frames of threads sitting idle, they'd drown out the real work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+}
+
+PROFILE_LOCK = threading.Lock()
+
+
+def thread_group(thread) -> str:
+    # ptb names workers Bot:<id>:worker:<uuid>_<n>, merge them into one
+    if ":worker:" in thread.name:
+        return "dispatcher_worker"
+    if thread.name.endswith(":dispatcher"):
+        return "dispatcher"
+    if thread is threading.main_thread():
+        # run_until_disconnected keeps the telethon loop on the main thread
+        return "telethon_loop"
+    return thread.name.rstrip("0123456789-_") or "thread"
+
+
+def frame_name(code) -> str:
+    path = code.co_filename.split(os.sep)
+    return "{}@{}:{}".format(code.co_name, "/".join(path[-2:]),
+                             code.co_firstlineno)
+
+
+def sample(seconds: float, interval: float = SAMPLE_INTERVAL):
+    """
+    Sample the stack of every other thread for a while.
+
+    :return: (Counter of collapsed stacks, number of sampling rounds, idle
+        samples skipped)
+    """
+    stacks = Counter()
+    own_id = threading.get_ident()
+    rounds = idle = 0
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        groups = {thread.ident: thread_group(thread)
+                  for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename),
+                    code.co_name) in IDLE_FRAMES:
+                idle += 1
+                continue
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            names.append(groups.get(thread_id, "thread"))
+            stacks[";".join(reversed(names))] += 1
+        rounds += 1
+        sleep(interval)
+    return stacks, rounds, idle
+
+
+def collapsed(stacks: Counter) -> str:
+    # the format flamegraph.pl and speedscope read
+    return "\n".join("{} {}".format(stack, count)
+                     for stack, count in stacks.most_common()) + "\n"
+
+
+def hot_functions(stacks: Counter, top: int = 15):
+    """:return: [(function, self samples, total samples)] by self samples"""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        own[frames[-1]] += count
+        # recursion counts a function once per sample
+        for name in set(frames):
+            total[name] += count
+    return [(name, count, total[name]) for name, count in own.most_common(top)]
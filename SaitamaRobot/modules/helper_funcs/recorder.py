@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import threading
+import time
+
+from SaitamaRobot import LOGGER
+from telegram import Update
+
+RECORD_PATH = "updates.jsonl"
+# rotated to updates.jsonl.1 .. .BACKUPS past this size
+MAX_BYTES = 50 * 1024 * 1024
+BACKUPS = 3
+# lines buffered before a write, the flush job empties it in between
+FLUSH_LINES = 200
+
+
+class UpdateRecorder:
+    """
+    Appends sampled raw updates to a JSONL file, one {"ts", "update"} object
+    per line, for SaitamaRobot.replay to feed back in.
+    """
+
+    def __init__(self,
+                 path: str = RECORD_PATH,
+                 max_bytes: int = MAX_BYTES,
+                 backups: int = BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        # share of updates kept, 0 is off
+        self.sample = 0.0
+        self.recorded = 0
+        self.buffer = []
+        self.buffer_lock = threading.Lock()
+        # writes and rotation, kept apart so recording never waits on disk
+        self.write_lock = threading.Lock()
+
+    def record(self, update: Update):
+        if not self.sample or random.random() >= self.sample:
+            return
+        line = json.dumps({
+            "ts": time.time(),
+            "update": update.to_dict()
+        },
+                          separators=(",", ":"),
+                          ensure_ascii=False)
+        with self.buffer_lock:
+            self.buffer.append(line)
+            self.recorded += 1
+            if len(self.buffer) < FLUSH_LINES:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            with self.buffer_lock:
+                lines, self.buffer = self.buffer, []
+            if not lines:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                    size = f.tell()
+                if size >= self.max_bytes:
+                    self._rotate()
+            except OSError:
+                LOGGER.exception("Couldn't write recorded updates")
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            older = "{}.{}".format(self.path, index)
+            if os.path.exists(older):
+                os.replace(older, "{}.{}".format(self.path, index + 1))
+        if self.backups:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+
+
+RECORDER = UpdateRecorder()
@@ -1,5 +1,58 @@
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Optional
+
 import regex
 
+# a quantifier with a larger upper bound than this is treated as unbounded
+OPEN_REPEAT = 32
+# product of nested bounded repeat counts, (a{100}){100} expands to 10k
+REPEAT_LIMIT = 1000
+# adjacent unbounded repeats over the same characters, \s*\s*\s* is O(n^3)
+ADJACENT_LIMIT = 3
+UNBOUNDED_LIMIT = 16
+# case pairs folded for ignorecase classes, [\x00-\uffff] alone is ~2.8k
+FOLD_LIMIT = 20000
+
+# parsed patterns are lists of (op, argument)
+_LITERAL = "literal"  # char code
+_ANY = "any"
+_IN = "in"  # _CharClass, escapes like \w included
+_REPEAT = "repeat"  # (low, high or None if unbounded, items)
+_GROUP = "group"  # items, capturing or not
+_BRANCH = "branch"  # [items]
+_AT = "at"  # anchors and other zero width escapes
+_ASSERT = "assert"  # lookaround items
+_GROUPREF = "groupref"
+_GROUPREF_EXISTS = "groupref_exists"  # (yes items, no items)
+
+_ZERO_WIDTH = (_AT, _ASSERT)
+
+_ESCAPES = {"a": 7, "f": 12, "n": 10, "r": 13, "t": 9, "v": 11}
+_CATEGORY_ESCAPES = "dDsSwW"
+_ANCHOR_ESCAPES = "bBAZzGmMK"
+_OCTAL = "01234567"
+# inline flags of re and regex
+_FLAGS = "abefiLmprsuVwx01"
+_BOUNDS = re.compile(r"\{(\d*)(,?)(\d*)\}")
+
+# character sets are bitmasks over the BMP, one extra bit standing in for
+# everything above it
+_BMP = 0x10000
+_ASTRAL = 1 << _BMP
+_ALL = (_ASTRAL << 1) - 1
+
+_CATEGORIES = {
+    "d": (r"\d", True),
+    "D": (r"\D", True),
+    "s": (r"\s", False),
+    "S": (r"\S", True),
+    "w": (r"\w", True),
+    "W": (r"\W", True),
+}
+
 
 def regex_searcher(regex_string, string):
     try:
@@ -11,14 +64,636 @@ def regex_searcher(regex_string, string):
     return search
 
 
-def infinite_loop_check(regex_string):
-    loop_matches = [
-        r'\((.{1,}[\+\*]){1,}\)[\+\*].',
-        r'[\(\[].{1,}\{\d(,)?\}[\)\]]\{\d(,)?\}',
-        r'\(.{1,}\)\{.{1,}(,)?\}\(.*\)(\+|\* |\{.*\})'
-    ]
-    for match in loop_matches:
-        match_1 = regex.search(match, regex_string)
-        if match_1:
+@lru_cache(maxsize=None)
+def _category_mask(category: str) -> int:
+    # unicode properties, posix classes... count as anything
+    pattern, astral = _CATEGORIES.get(category, (None, True))
+    if pattern is None:
+        return _ALL
+    bits = bytearray(_BMP // 8)
+    every_char = "".join(map(chr, range(_BMP)))
+    for match in re.finditer(pattern, every_char):
+        code = ord(match.group())
+        bits[code >> 3] |= 1 << (code & 7)
+    mask = int.from_bytes(bits, "little")
+    return mask | _ASTRAL if astral else mask
+
+
+@lru_cache(maxsize=None)
+def _case_pairs():
+    """:return: the BMP codes that have another case, sorted, and that case"""
+    codes, others = [], []
+    for code in range(_BMP):
+        char = chr(code)
+        for variant in sorted({char.lower(), char.upper()} - {char}):
+            if len(variant) == 1 and ord(variant) < _BMP:
+                codes.append(code)
+                others.append(ord(variant))
+    return codes, others
+
+
+def _char_mask(code: int, ignorecase: bool) -> int:
+    if code >= _BMP:
+        return _ASTRAL
+    if not ignorecase:
+        return 1 << code
+    mask = 0
+    char = chr(code)
+    for variant in (char, char.lower(), char.upper()):
+        if len(variant) == 1:
+            mask |= 1 << ord(variant) if ord(variant) < _BMP else _ASTRAL
+    return mask
+
+
+def _range_mask(low: int, high: int) -> int:
+    mask = _ASTRAL if high >= _BMP else 0
+    high = min(high, _BMP - 1)
+    if low <= high:
+        mask |= ((1 << (high + 1)) - 1) ^ ((1 << low) - 1)
+    return mask
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return tuple((low, high) for low, high in merged)
+
+
+class _CharClass:
+    __slots__ = ("negate", "mask", "ranges")
+
+    def __init__(self, negate: bool = False):
+        self.negate = negate
+        self.mask = 0
+        # literals and ranges, case folded once the whole pattern is read
+        self.ranges = []
+
+    def add_category(self, category: str):
+        self.mask |= _category_mask(category)
+
+    def add_range(self, low: int, high: int):
+        self.mask |= _range_mask(low, high)
+        self.ranges.append((low, high))
+
+
+class _ParseError(Exception):
+    pass
+
+
+class _RegexComplexity(Exception):
+    pass
+
+
+class _Parser:
+    """
+    Reads the parts of re and regex syntax that matter for backtracking.
+    Syntax it doesn't know raises _ParseError.
+    """
+
+    def __init__(self, pattern: str, ignorecase: bool):
+        self.pattern = pattern
+        self.pos = 0
+        self.ignorecase = ignorecase
+        self.verbose = False
+        self.classes = []
+
+    def parse(self):
+        items = self.alternation()
+        if self.pos < len(self.pattern):
+            raise _ParseError("unbalanced parenthesis")
+        self.finish_classes()
+        return items
+
+    def finish_classes(self):
+        folded = {}
+        work = 0
+        for char_class in self.classes:
+            if self.ignorecase and char_class.ranges:
+                ranges = _merge_ranges(char_class.ranges)
+                if ranges not in folded:
+                    mask, cost = self.fold(ranges)
+                    work += cost
+                    if work > FOLD_LIMIT:
+                        raise _RegexComplexity("character classes too large")
+                    folded[ranges] = mask
+                char_class.mask |= folded[ranges]
+            if char_class.negate:
+                char_class.mask = _ALL & ~char_class.mask
+
+    @staticmethod
+    def fold(ranges):
+        """:return: (mask of the other cases in ranges, pairs looked at)"""
+        codes, others = _case_pairs()
+        bits = bytearray(_BMP // 8)
+        cost = 0
+        for low, high in ranges:
+            start, end = bisect_left(codes, low), bisect_right(codes, high)
+            cost += end - start
+            for index in range(start, end):
+                code = others[index]
+                bits[code >> 3] |= 1 << (code & 7)
+        return int.from_bytes(bits, "little"), cost
+
+    def peek(self, offset: int = 0):
+        pos = self.pos + offset
+        return self.pattern[pos] if pos < len(self.pattern) else None
+
+    def take(self) -> str:
+        char = self.peek()
+        if char is None:
+            raise _ParseError("unexpected end of pattern")
+        self.pos += 1
+        return char
+
+    def accept(self, chars: str):
+        char = self.peek()
+        if char is not None and char in chars:
+            self.pos += 1
+            return char
+        return None
+
+    def read_until(self, end: str) -> str:
+        stop = self.pattern.find(end, self.pos)
+        if stop == -1:
+            raise _ParseError("missing " + end)
+        text = self.pattern[self.pos:stop]
+        self.pos = stop + len(end)
+        return text
+
+    def skip_verbose(self):
+        while self.verbose and self.pos < len(self.pattern):
+            char = self.pattern[self.pos]
+            if char.isspace():
+                self.pos += 1
+            elif char == "#":
+                end = self.pattern.find("\n", self.pos)
+                self.pos = len(self.pattern) if end == -1 else end + 1
+            else:
+                break
+
+    def alternation(self):
+        branches = [self.sequence()]
+        while self.accept("|"):
+            branches.append(self.sequence())
+        if len(branches) == 1:
+            return branches[0]
+        return [(_BRANCH, branches)]
+
+    def sequence(self):
+        items = []
+        while True:
+            self.skip_verbose()
+            char = self.peek()
+            if char is None or char in "|)":
+                return items
+            item = self.atom()
+            if item is None:
+                continue
+            while True:
+                self.skip_verbose()
+                bounds = self.quantifier()
+                if bounds is None:
+                    break
+                # lazy and possessive repeats backtrack no less here
+                self.accept("?+")
+                item = (_REPEAT, (bounds[0], bounds[1], [item]))
+            items.append(item)
+
+    def quantifier(self):
+        char = self.accept("*+?{")
+        if char == "*":
+            return 0, None
+        if char == "+":
+            return 1, None
+        if char == "?":
+            return 0, 1
+        if char == "{":
+            self.pos -= 1
+            match = _BOUNDS.match(self.pattern, self.pos)
+            if not match or not (match.group(1) or match.group(2)):
+                # a plain {
+                return None
+            self.pos = match.end()
+            low = int(match.group(1) or 0)
+            if not match.group(2):
+                return low, low
+            high = int(match.group(3)) if match.group(3) else None
+            if high is not None and high < low:
+                raise _ParseError("min repeat greater than max repeat")
+            return low, high
+        return None
+
+    def atom(self):
+        char = self.take()
+        if char == "(":
+            return self.group()
+        if char == "[":
+            return self.char_class()
+        if char == ".":
+            return _ANY, None
+        if char in "^$":
+            return _AT, char
+        if char == "\\":
+            return self.escape()
+        if char in "*+?":
+            raise _ParseError("nothing to repeat")
+        return _LITERAL, ord(char)
+
+    def group(self):
+        if not self.accept("?"):
+            return _GROUP, self.group_body()
+        char = self.take()
+        if char in ":>|":
+            # non capturing, atomic, branch reset
+            return _GROUP, self.group_body()
+        if char in "=!":
+            return _ASSERT, self.group_body()
+        if char == "#":
+            self.read_until(")")
+            return None
+        if char == "<" and self.accept("=!"):
+            return _ASSERT, self.group_body()
+        if char == "P" and self.accept("="):
+            return _GROUPREF, self.read_until(")")
+        if char == "<" or char == "P" and self.accept("<"):
+            self.read_until(">")
+            return _GROUP, self.group_body()
+        if char == "(":
+            self.read_until(")")
+            yes = self.sequence()
+            no = self.sequence() if self.accept("|") else []
+            if self.take() != ")":
+                raise _ParseError("conditional group with more than two "
+                                  "branches")
+            return _GROUPREF_EXISTS, (yes, no)
+
+        self.pos -= 1
+        start = self.pos
+        while self.accept(_FLAGS + "-"):
+            continue
+        flags_on, _, flags_off = self.pattern[start:self.pos].partition("-")
+        if start == self.pos:
+            raise _ParseError("unknown extension ?" + char)
+        # a scoped ignorecase counts for the whole pattern, folding only
+        # makes the check stricter
+        if "i" in flags_on:
+            self.ignorecase = True
+        end = self.take()
+        if end == ")":
+            if "x" in flags_on:
+                self.verbose = True
+            return None
+        if end != ":":
+            raise _ParseError("unknown flag")
+        verbose = self.verbose
+        if "x" in flags_on or "x" in flags_off:
+            self.verbose = "x" in flags_on
+        body = self.group_body()
+        self.verbose = verbose
+        return _GROUP, body
+
+    def group_body(self):
+        items = self.alternation()
+        if self.take() != ")":
+            raise _ParseError("missing )")
+        return items
+
+    def new_class(self, category: str = None, negate: bool = False):
+        char_class = _CharClass(negate)
+        if category:
+            char_class.add_category(category)
+        self.classes.append(char_class)
+        return char_class
+
+    def property(self):
+        # \p{Letter} or \pL, regex only
+        if self.accept("{"):
+            self.read_until("}")
+        else:
+            self.take()
+
+    def escape(self):
+        char = self.take()
+        if char in _CATEGORY_ESCAPES:
+            return _IN, self.new_class(char)
+        if char in _ANCHOR_ESCAPES:
+            return _AT, "\\" + char
+        if char == "X":
+            return _ANY, None
+        if char in "pP":
+            self.property()
+            return _IN, self.new_class("any")
+        if char == "g":
+            if not self.accept("<"):
+                raise _ParseError("bad escape \\g")
+            return _GROUPREF, self.read_until(">")
+        if char.isdigit() and char != "0":
+            digits = char
+            if self.peek() is not None and self.peek().isdigit():
+                digits += self.take()
+                if (self.peek() is not None and self.peek() in _OCTAL and
+                        all(digit in _OCTAL for digit in digits)):
+                    return _LITERAL, int(digits + self.take(), 8)
+            return _GROUPREF, int(digits)
+        return _LITERAL, self.escaped_code(char)
+
+    def escaped_code(self, char: str) -> int:
+        if char in _ESCAPES:
+            return _ESCAPES[char]
+        if char in _OCTAL:
+            digits = char
+            while len(digits) < 3 and self.peek() is not None and (
+                    self.peek() in _OCTAL):
+                digits += self.take()
+            return int(digits, 8)
+        if char in "xuU":
+            if char == "x" and self.accept("{"):
+                digits = self.read_until("}")
+            else:
+                length = {"x": 2, "u": 4, "U": 8}[char]
+                digits = self.pattern[self.pos:self.pos + length]
+                self.pos += length
+            try:
+                code = int(digits, 16)
+            except ValueError:
+                raise _ParseError("bad escape \\" + char)
+            if code > 0x10FFFF:
+                raise _ParseError("bad escape \\" + char)
+            return code
+        if char == "N":
+            if not self.accept("{"):
+                raise _ParseError("missing {")
+            try:
+                return ord(unicodedata.lookup(self.read_until("}")))
+            except KeyError:
+                raise _ParseError("undefined character name")
+        if char.isascii() and char.isalnum():
+            raise _ParseError("bad escape \\" + char)
+        return ord(char)
+
+    def class_code(self, char_class: _CharClass):
+        """:return: the code of a single character in a class, None if the
+            item was a category"""
+        char = self.take()
+        if char != "\\":
+            return ord(char)
+        char = self.take()
+        if char in _CATEGORY_ESCAPES:
+            char_class.add_category(char)
+            return None
+        if char in "pP":
+            self.property()
+            char_class.add_category("any")
+            return None
+        if char == "b":
+            return 8
+        return self.escaped_code(char)
+
+    def char_class(self):
+        char_class = self.new_class(negate=bool(self.accept("^")))
+        first = True
+        while True:
+            if self.peek() == "]" and not first:
+                self.pos += 1
+                return _IN, char_class
+            first = False
+            if self.peek() == "[" and self.peek(1) == ":":
+                # posix classes, regex only
+                self.read_until(":]")
+                char_class.add_category("any")
+                continue
+            low = self.class_code(char_class)
+            if low is None:
+                continue
+            if self.peek() == "-" and self.peek(1) not in (None, "]"):
+                self.pos += 1
+                high = self.class_code(char_class)
+                if high is None or high < low:
+                    raise _ParseError("bad character range")
+                char_class.add_range(low, high)
+            else:
+                char_class.add_range(low, low)
+
+
+def _item_mask(op, av, ignorecase: bool):
+    """:return: the characters a single character item matches, None if
+        it isn't one"""
+    if op == _LITERAL:
+        return _char_mask(av, ignorecase)
+    if op == _IN:
+        return av.mask
+    if op == _ANY:
+        return _ALL
+    return None
+
+
+def _first_chars(items, ignorecase):
+    """
+    Characters a subpattern can start with.
+
+    :return: (mask of char codes, whether the subpattern can match the empty
+        string)
+    """
+    first = 0
+    for op, av in items:
+        mask = _item_mask(op, av, ignorecase)
+        if mask is not None:
+            return first | mask, False
+        elif op == _REPEAT:
+            low, _, sub = av
+            sub_first, nullable = _first_chars(sub, ignorecase)
+            first |= sub_first
+            if low and not nullable:
+                return first, False
+        elif op == _GROUP:
+            sub_first, nullable = _first_chars(av, ignorecase)
+            first |= sub_first
+            if not nullable:
+                return first, False
+        elif op == _BRANCH:
+            any_nullable = False
+            for branch in av:
+                sub_first, nullable = _first_chars(branch, ignorecase)
+                first |= sub_first
+                any_nullable = any_nullable or nullable
+            if not any_nullable:
+                return first, False
+        elif op in _ZERO_WIDTH:
+            continue
+        else:
+            # backreferences, conditionals
+            return _ALL, False
+    return first, True
+
+
+def _all_chars(items, ignorecase) -> int:
+    """Every character a subpattern can consume."""
+    chars = 0
+    for op, av in items:
+        mask = _item_mask(op, av, ignorecase)
+        if mask is not None:
+            chars |= mask
+        elif op == _REPEAT:
+            chars |= _all_chars(av[2], ignorecase)
+        elif op == _GROUP:
+            chars |= _all_chars(av, ignorecase)
+        elif op == _BRANCH:
+            for branch in av:
+                chars |= _all_chars(branch, ignorecase)
+        elif op not in _ZERO_WIDTH:
+            return _ALL
+    return chars
+
+
+def _branches_overlap(branches, ignorecase):
+    seen = 0
+    for branch in branches:
+        first, nullable = _first_chars(branch, ignorecase)
+        if nullable or seen & first:
             return True
+        seen |= first
     return False
+
+
+def _top_level(items):
+    # a plain group doesn't change what follows what
+    for op, av in items:
+        if op == _GROUP:
+            yield from _top_level(av)
+        else:
+            yield op, av
+
+
+def _is_open(high) -> bool:
+    return high is None or high > OPEN_REPEAT
+
+
+class _Analysis:
+
+    def __init__(self, ignorecase):
+        self.ignorecase = ignorecase
+        self.unbounded = 0
+
+    def delimited_repeats(self, body):
+        """
+        Open repeats directly in the body of another one, with a mandatory
+        item in that body they can't match, like the space in ([a-z]+ )+.
+        Each iteration then splits the input one way only.
+
+        :return: ids of those repeats' arguments
+        """
+        items = list(_top_level(body))
+        mandatory = [(index, _all_chars([item], self.ignorecase))
+                     for index, item in enumerate(items)
+                     if not _first_chars([item], self.ignorecase)[1]]
+        allowed = set()
+        for index, (op, av) in enumerate(items):
+            if op != _REPEAT or not _is_open(av[1]):
+                continue
+            chars = _all_chars(av[2], self.ignorecase)
+            if any(other != index and not chars & other_chars
+                   for other, other_chars in mandatory):
+                allowed.add(id(av))
+        return allowed
+
+    def walk(self, items, outer=None, multiplier=1, run=0, last=0):
+        """
+        :param outer: inside an open repeat, the ids of the nested open
+            repeats allowed there, None outside of one
+        :param run: open repeats over overlapping characters so far, with
+            nothing mandatory between them
+        :param last: the characters of the last of them
+        :return: (run, last) after items
+        """
+        for op, av in items:
+            if op == _REPEAT:
+                low, high, sub = av
+                if _is_open(high):
+                    self.unbounded += 1
+                    if self.unbounded > UNBOUNDED_LIMIT:
+                        raise _RegexComplexity("too many quantifiers")
+                    if outer is not None and id(av) not in outer:
+                        raise _RegexComplexity("nested quantifiers")
+                    top = sub[0] if len(sub) == 1 else None
+                    if top and top[0] == _GROUP:
+                        top = top[1][0] if len(top[1]) == 1 else None
+                    if (top and top[0] == _BRANCH and
+                            _branches_overlap(top[1], self.ignorecase)):
+                        raise _RegexComplexity(
+                            "repeated alternation with overlapping branches")
+
+                    chars = _all_chars(sub, self.ignorecase)
+                    run = run + 1 if run and last & chars else 1
+                    last = chars
+                    if run >= ADJACENT_LIMIT:
+                        raise _RegexComplexity(
+                            "adjacent quantifiers over the same characters")
+                    self.walk(sub, self.delimited_repeats(sub), multiplier)
+                else:
+                    multiplier *= max(high, 1)
+                    if multiplier > REPEAT_LIMIT:
+                        raise _RegexComplexity("repeat counts too large")
+                    inner = self.walk(sub, outer, multiplier, run, last)
+                    multiplier //= max(high, 1)
+                    if low and not _first_chars(sub, self.ignorecase)[1]:
+                        run, last = 0, 0
+                    else:
+                        # optional, so either side of it may follow
+                        run, last = max(run, inner[0]), last | inner[1]
+                continue
+
+            if op == _GROUP:
+                run, last = self.walk(av, outer, multiplier, run, last)
+            elif op == _BRANCH:
+                run, last = self.walk_branches(av, outer, multiplier, run,
+                                               last)
+            elif op == _ASSERT:
+                self.walk(av, outer, multiplier)
+            elif op == _GROUPREF_EXISTS:
+                run, last = self.walk_branches(av, outer, multiplier, run,
+                                               last)
+            elif op in _ZERO_WIDTH:
+                continue
+            else:
+                if op == _GROUPREF and outer is not None:
+                    raise _RegexComplexity("backreference inside a quantifier")
+                # a mandatory item between two repeats ends the run
+                run, last = 0, 0
+        return run, last
+
+    def walk_branches(self, branches, outer, multiplier, run, last):
+        end_run, end_last = 0, 0
+        for branch in branches:
+            branch_run, branch_last = self.walk(branch, outer, multiplier,
+                                                run, last)
+            end_run = max(end_run, branch_run)
+            end_last |= branch_last
+        return end_run, end_last
+
+
+def check_regex_complexity(regex_string: str,
+                           ignorecase: bool = False) -> Optional[str]:
+    """
+    Look for patterns that backtrack catastrophically, before running them.
+
+    :param regex_string: the pattern, in re or regex syntax
+    :param ignorecase: whether it will run with the ignore case flag
+    :return: why the pattern was rejected, or None if it looks safe. Syntax
+        the parser doesn't know, or invalid patterns, are let through for
+        the regex module to deal with.
+    """
+    parser = _Parser(regex_string, ignorecase)
+    try:
+        parsed = parser.parse()
+        _Analysis(parser.ignorecase).walk(parsed)
+    except _ParseError:
+        return None
+    except _RegexComplexity as excp:
+        return str(excp)
+    except RecursionError:
+        return "pattern nested too deeply"
+    return None
@@ -0,0 +1,276 @@
+"""
+On disk snapshot of the sql module caches, so a restart skips the full table
+loads of modules that haven't changed since.
+
+File layout, all offsets relative to the end of the header:
+
+    MAGIC | FORMAT_VERSION, header length (HEADER_STRUCT) | pickled header
+    | sections
+
+The header maps every module to its cache version, change marker and the
+(name, kind, offset, length) of each cache. Sets of ints are kept as raw
+int64 arrays and read straight from the mapped file, the rest is pickled.
+"""
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from SaitamaRobot import CACHE_SNAPSHOT, LOGGER
+from SaitamaRobot.modules.helper_funcs.memory import CACHES
+from SaitamaRobot.modules.sql import cache_markers_sql as markers
+
+MAGIC = b"SAITSNAP"
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<II")
+# older files are ignored, writes that skip the session don't bump a marker
+MAX_AGE = 60 * 60 * 24
+# how long a write waits for a module's locks before skipping it this round
+LOCK_TIMEOUT = 5
+
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+
+class Registration:
+    __slots__ = ("names", "locks", "version")
+
+    def __init__(self, names, locks, version):
+        self.names = names
+        self.locks = locks
+        self.version = version
+
+
+# {module name: Registration}
+REGISTRY = {}
+# modules still loading, their caches aren't worth a snapshot yet
+PENDING = set()
+WRITE_LOCK = threading.Lock()
+# (mmap, header) while booting, False if there's no usable file
+_LOADED = None
+_LOADED_LOCK = threading.Lock()
+RESTORED = []
+LOADED_FROM_DB = []
+
+
+def register(module_name: str, *locks, names=None, version: int = 1):
+    """
+    Snapshot a sql module's caches.
+
+    :param locks: the locks its writers hold while changing the caches
+    :param names: cache globals, defaults to the ones given to register_cache
+    :param version: bump when the shape of the caches changes
+    """
+    # markers cost every write to these tables an update, skip them when
+    # there's no snapshot to check them against
+    if CACHE_SNAPSHOT:
+        module = sys.modules[module_name]
+        tables = {
+            obj.__tablename__
+            for obj in vars(module).values()
+            if isinstance(obj, type) and obj.__module__ == module_name and
+            hasattr(obj, "__tablename__")
+        }
+        markers.track(module_name, tables)
+    REGISTRY[module_name] = Registration(
+        tuple(names or CACHES.get(module_name, ())), locks, version)
+
+
+def _is_int64_set(value) -> bool:
+    return (isinstance(value, (set, frozenset)) and value and
+            all(type(item) is int and INT64_MIN <= item <= INT64_MAX
+                for item in value))
+
+
+def _encode(value):
+    if _is_int64_set(value):
+        return "int64", array("q", sorted(value)).tobytes()
+    return "pickle", pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(view, kind: str):
+    if kind == "int64":
+        with view.cast("q") as ints:
+            return set(ints)
+    return pickle.loads(view)
+
+
+def _open(path: str):
+    """:return: (mmap, header), None if the file is missing or unusable"""
+    try:
+        with open(path, "rb") as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime > MAX_AGE:
+                LOGGER.info("Cache snapshot %s is too old, ignoring it", path)
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a cache snapshot")
+        version, header_length = HEADER_STRUCT.unpack_from(mapped, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError("format version {}".format(version))
+        start = len(MAGIC) + HEADER_STRUCT.size
+        header = pickle.loads(mapped[start:start + header_length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("written on a {} endian machine".format(
+                header["byteorder"]))
+        header["data"] = start + header_length
+    except Exception as excp:
+        LOGGER.warning("Ignoring cache snapshot %s: %s", path, excp)
+        mapped.close()
+        return None
+    return mapped, header
+
+
+def restore(module_name: str) -> bool:
+    """
+    Load a registered module's caches from the snapshot, if its marker and
+    cache version still match. Call it holding the module's locks, so no
+    write slips in between the marker check and the restore.
+
+    :return: False when the caller has to load from the db instead
+    """
+    global _LOADED
+    if not CACHE_SNAPSHOT:
+        return False
+    with _LOADED_LOCK:
+        if _LOADED is None:
+            _LOADED = _open(CACHE_SNAPSHOT) or False
+        opened = _LOADED
+    registration = REGISTRY.get(module_name)
+    entry = opened and opened[1]["modules"].get(module_name)
+    if (not entry or not registration or
+            entry["version"] != registration.version or
+            entry["marker"] != markers.get_marker(module_name)):
+        LOADED_FROM_DB.append(module_name)
+        return False
+
+    mapped, header = opened
+    module = sys.modules[module_name]
+    values = {}
+    try:
+        with memoryview(mapped) as view:
+            for name, kind, offset, length in entry["sections"]:
+                start = header["data"] + offset
+                with view[start:start + length] as section:
+                    values[name] = _decode(section, kind)
+    except Exception:
+        LOGGER.exception("Couldn't restore %s from the cache snapshot",
+                         module_name)
+        LOADED_FROM_DB.append(module_name)
+        return False
+    for name, value in values.items():
+        setattr(module, name, value)
+    RESTORED.append(module_name)
+    return True
+
+
+def finish_restore():
+    """Unmap the snapshot once every module has loaded."""
+    global _LOADED
+    with _LOADED_LOCK:
+        if _LOADED:
+            _LOADED[0].close()
+        _LOADED = None
+    if CACHE_SNAPSHOT:
+        LOGGER.info(
+            "Caches restored from the snapshot: %s. Loaded from the db: %s.",
+            ", ".join(RESTORED) or "none", ", ".join(LOADED_FROM_DB) or
+            "none")
+
+
+def acquire_all(locks, timeout: float = LOCK_TIMEOUT) -> bool:
+    """
+    Take every lock or none, so two callers taking them in different orders
+    back off instead of deadlocking.
+    """
+    taken = []
+    for lock in locks:
+        if not lock.acquire(timeout=timeout):
+            for held in reversed(taken):
+                held.release()
+            return False
+        taken.append(lock)
+    return True
+
+
+def _encode_module(module_name: str, registration: Registration):
+    """:return: (marker, [(name, kind, blob)]), None if the locks were busy"""
+    module = sys.modules.get(module_name)
+    if module is None or not acquire_all(registration.locks):
+        return None
+    # under the writers' locks, so the marker and the caches agree
+    try:
+        marker = markers.get_marker(module_name)
+        blobs = [(name, *_encode(getattr(module, name)))
+                 for name in registration.names]
+    finally:
+        for lock in reversed(registration.locks):
+            lock.release()
+    return marker, blobs
+
+
+def write(path: str = None):
+    path = path or CACHE_SNAPSHOT
+    if not path:
+        return
+    started = time.perf_counter()
+    with WRITE_LOCK:
+        modules = {}
+        sections = []
+        offset = 0
+        for module_name, registration in list(REGISTRY.items()):
+            if module_name in PENDING:
+                continue
+            try:
+                encoded = _encode_module(module_name, registration)
+            except Exception:
+                LOGGER.exception("Couldn't snapshot %s", module_name)
+                continue
+            if encoded is None:
+                LOGGER.warning("Skipped %s in the cache snapshot, it was busy",
+                               module_name)
+                continue
+            marker, blobs = encoded
+            entry = {
+                "version": registration.version,
+                "marker": marker,
+                "sections": []
+            }
+            for name, kind, blob in blobs:
+                entry["sections"].append((name, kind, offset, len(blob)))
+                sections.append(blob)
+                offset += len(blob)
+            modules[module_name] = entry
+
+        header = pickle.dumps({
+            "byteorder": sys.byteorder,
+            "written": time.time(),
+            "modules": modules
+        }, pickle.HIGHEST_PROTOCOL)
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(HEADER_STRUCT.pack(FORMAT_VERSION, len(header)))
+                f.write(header)
+                for blob in sections:
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except OSError:
+            LOGGER.exception("Couldn't write the cache snapshot")
+            return
+    LOGGER.info("Wrote the cache snapshot, %s modules and %.1fMB in %.2fs",
+                len(modules), (offset + len(header)) / 1024 / 1024,
+                time.perf_counter() - started)
+
+
+def write_job(context):
+    write()
@@ -0,0 +1,159 @@
+import threading
+from collections import Counter
+from time import perf_counter
+
+from SaitamaRobot import LOGGER
+from SaitamaRobot.modules.helper_funcs import metrics
+from SaitamaRobot.modules.sql import BASE
+from sqlalchemy import event
+
+# more statements than this in one handler call gets it flagged
+QUERY_BUDGET = 20
+# one statement run more often than this in a handler call looks like N+1
+REPEAT_LIMIT = 3
+REPORT_INTERVAL = 60 * 10
+REPORT_TOP = 10
+
+# thread local scope of the handler call running on each thread
+_LOCAL = threading.local()
+STATS_LOCK = threading.Lock()
+# {handler: [calls, statements, seconds, over budget, repeating]} since the
+# last report
+HANDLER_STATS = {}
+# {(handler, statement): handler calls that repeated it}
+REPEATED = Counter()
+# statements run outside handlers, by jobs and background threads
+OUTSIDE = Counter()
+
+
+class Scope:
+    __slots__ = ("statements", "count", "seconds")
+
+    def __init__(self):
+        self.statements = Counter()
+        self.count = 0
+        self.seconds = 0.0
+
+
+def _handler_name(labels) -> str:
+    return "{}.{}".format(labels[0][1], labels[1][1])
+
+
+def _short(statement: str, length: int = 160) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    scope = getattr(_LOCAL, "scope", None)
+    if scope is None:
+        with STATS_LOCK:
+            OUTSIDE[threading.current_thread().name.rstrip(
+                "0123456789-_")] += 1
+        return
+    scope.count += 1
+    scope.statements[statement] += 1
+    # on the execution context, a statement that raises never reaches
+    # after_cursor_execute and takes its start time with it
+    if context is not None:
+        context._audit_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    scope = getattr(_LOCAL, "scope", None)
+    started = getattr(context, "_audit_started", None)
+    if scope is not None and started is not None:
+        scope.seconds += perf_counter() - started
+
+
+def begin_handler(labels, update):
+    _LOCAL.scope = Scope()
+
+
+def end_handler(labels, update):
+    scope = getattr(_LOCAL, "scope", None)
+    _LOCAL.scope = None
+    if scope is None:
+        return
+
+    handler = _handler_name(labels)
+    repeated = [(statement, count)
+                for statement, count in scope.statements.items()
+                if count > REPEAT_LIMIT]
+    over_budget = scope.count > QUERY_BUDGET
+    with STATS_LOCK:
+        stats = HANDLER_STATS.setdefault(handler, [0, 0, 0.0, 0, 0])
+        first_flag = not (stats[3] or stats[4])
+        stats[0] += 1
+        stats[1] += scope.count
+        stats[2] += scope.seconds
+        stats[3] += over_budget
+        stats[4] += bool(repeated)
+        for statement, _ in repeated:
+            REPEATED[(handler, statement)] += 1
+
+    if scope.count:
+        metrics.inc("saitama_sql_statements_total", labels, scope.count)
+    if over_budget:
+        metrics.inc("saitama_sql_over_budget_total", labels)
+    if repeated:
+        metrics.inc("saitama_sql_repeated_total", labels)
+
+    # one warning per handler and report period, the report has the rest
+    if (over_budget or repeated) and first_flag:
+        update_id = update.update_id if update else None
+        if over_budget:
+            LOGGER.warning("Update %s: %s ran %s queries, the budget is %s",
+                           update_id, handler, scope.count, QUERY_BUDGET)
+        for statement, count in repeated:
+            LOGGER.warning("Update %s: %s ran this %s times: %s", update_id,
+                           handler, count, _short(statement))
+
+
+def report(context=None):
+    global HANDLER_STATS, REPEATED, OUTSIDE
+    with STATS_LOCK:
+        stats, HANDLER_STATS = HANDLER_STATS, {}
+        repeated, REPEATED = REPEATED, Counter()
+        outside, OUTSIDE = OUTSIDE, Counter()
+    if not stats and not outside:
+        return
+
+    lines = ["SQL audit, heaviest handlers by queries per call:"]
+    heaviest = sorted(
+        stats.items(), key=lambda item: item[1][1] / item[1][0], reverse=True)
+    for handler, stat in heaviest[:REPORT_TOP]:
+        calls, count, seconds, over, repeating = stat
+        lines.append(
+            "  {}: {:.1f} queries/call over {} calls, {:.1f}ms/call in the db, "
+            "{} over budget, {} repeating".format(handler, count / calls,
+                                                  calls,
+                                                  seconds / calls * 1000, over,
+                                                  repeating))
+    if repeated:
+        lines.append("Statements repeated within one call:")
+        for (handler, statement), calls in repeated.most_common(REPORT_TOP):
+            lines.append("  {} ({} calls): {}".format(handler, calls,
+                                                      _short(statement)))
+    if outside:
+        lines.append("Outside handlers: " + ", ".join(
+            "{} {}".format(thread, count)
+            for thread, count in outside.most_common(REPORT_TOP)))
+    LOGGER.info("\n".join(lines))
+
+
+def start(dispatcher, budget: int = QUERY_BUDGET):
+    """
+    Count the statements of every handler call and flag calls over budget
+    or repeating a statement. Run report as a job for the summary.
+    """
+    global QUERY_BUDGET
+    QUERY_BUDGET = budget
+    engine = BASE.metadata.bind
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    metrics.BEFORE_HANDLER.append(begin_handler)
+    metrics.AFTER_HANDLER.append(end_handler)
+    metrics.instrument(dispatcher)
@@ -0,0 +1,83 @@
+import importlib
+import importlib.util
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+from SaitamaRobot import LOGGER
+
+PHASES = ("import", "tables", "warmup")
+# {module: {phase: seconds}}
+TIMES = {}
+TIMES_LOCK = threading.Lock()
+
+
+class LazyModule:
+    """
+    Stands in for a module and imports it on first attribute access, so heavy
+    dependencies only load when a command needs them.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                started = perf_counter()
+                self._module = importlib.import_module(self._name)
+                LOGGER.info("Imported %s on first use in %.0fms", self._name,
+                            (perf_counter() - started) * 1000)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module else "not loaded"
+        return "<lazy module {!r} ({})>".format(self._name, state)
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Like import name, but the import runs on first use. Missing packages
+    still fail here, at boot.
+    """
+    # only the top level package, finding a submodule runs its parents
+    package = name.partition(".")[0]
+    if importlib.util.find_spec(package) is None:
+        raise ModuleNotFoundError("No module named {!r}".format(package),
+                                  name=package)
+    return LazyModule(name)
+
+
+@contextmanager
+def timed(module_name: str, phase: str):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - started
+        short = module_name.rsplit(".", 1)[-1]
+        with TIMES_LOCK:
+            phases = TIMES.setdefault(short, {})
+            phases[phase] = phases.get(phase, 0.0) + elapsed
+
+
+def report(total: float = None):
+    """Log the boot time of every module by phase, slowest first."""
+    with TIMES_LOCK:
+        times = {module: dict(phases) for module, phases in TIMES.items()}
+    rows = sorted(times.items(), key=lambda item: -sum(item[1].values()))
+    lines = ["Startup times in ms (import includes the sql modules it pulls in):",
+             "{:<24} {:>8} {:>8} {:>8}".format("module", *PHASES)]
+    for module, phases in rows:
+        lines.append("{:<24} {:>8} {:>8} {:>8}".format(
+            module[:24], *("{:.0f}".format(phases[phase] * 1000)
+                           if phase in phases else "-" for phase in PHASES)))
+    if total is not None:
+        lines.append("Ready in {:.2f}s".format(total))
+    LOGGER.info("\n".join(lines))
@@ -1,6 +1,7 @@
 import re
 import time
-from typing import Dict, List
+from bisect import bisect_right
+from typing import Callable, Dict, List
 
 import bleach
 import markdown2
@@ -34,14 +35,9 @@ def _selective_escape(to_parse: str) -> str:
     :param to_parse: text to escape
     :return: valid markdown string
     """
-    offset = 0  # offset to be used as adding a \ character causes the string to shift
-    for match in MATCH_MD.finditer(to_parse):
-        if match.group('esc'):
-            ent_start = match.start()
-            to_parse = to_parse[:ent_start +
-                                offset] + '\\' + to_parse[ent_start + offset:]
-            offset += 1
-    return to_parse
+    return MATCH_MD.sub(
+        lambda match: '\\' + match.group(0)
+        if match.group('esc') else match.group(0), to_parse)
 
 
 # This is a fun one.
@@ -55,6 +51,35 @@ def _calc_emoji_offset(to_calc) -> int:
     return sum(len(e.group(0).encode('utf-16-le')) // 2 - 1 for e in emoticons)
 
 
+def _emoji_offset_index(txt: str) -> Callable[[int], int]:
+    """
+    Scan the text for emoji once, and return a lookup equivalent to
+    `_calc_emoji_offset(txt[:pos])` that does not rescan the prefix.
+
+    :param txt: text to index
+    :return: function mapping a position to its emoji offset
+    """
+    starts = []
+    ends = []
+    totals = [0]  # totals[i] = offset caused by the first i emoji
+    for e in emoji.get_emoji_regexp().finditer(txt):
+        starts.append(e.start())
+        ends.append(e.end())
+        totals.append(totals[-1] + len(e.group(0).encode('utf-16-le')) // 2 -
+                      1)
+
+    def offset_at(pos: int) -> int:
+        # every emoji ending before pos matches the same way in txt[:pos]
+        idx = bisect_right(ends, pos)
+        count = totals[idx]
+        # an emoji cut by pos may still match partially in the prefix
+        if idx < len(starts) and starts[idx] < pos:
+            count += _calc_emoji_offset(txt[starts[idx]:pos])
+        return count
+
+    return offset_at
+
+
 def markdown_parser(txt: str,
                     entities: Dict[MessageEntity, str] = None,
                     offset: int = 0) -> str:
@@ -74,8 +99,10 @@ def markdown_parser(txt: str,
     if not txt:
         return ""
 
+    emoji_offset = None  # built on first use, most texts have no entities
+    link_spans = None
     prev = 0
-    res = ""
+    res = []
     # Loop over all message entities, and:
     # reinsert code
     # escape free-standing urls
@@ -89,30 +116,38 @@ def markdown_parser(txt: str,
         # we only care about code, url, text links
         if ent.type in ("code", "url", "text_link"):
             # count emoji to switch counter
-            count = _calc_emoji_offset(txt[:start])
+            if emoji_offset is None:
+                emoji_offset = _emoji_offset_index(txt)
+            count = emoji_offset(start)
             start -= count
             end -= count
 
             # URL handling -> do not escape if in [](), escape otherwise.
             if ent.type == "url":
-                if any(
-                        match.start(1) <= start and end <= match.end(1)
-                        for match in LINK_REGEX.finditer(txt)):
+                if link_spans is None:
+                    link_spans = [
+                        match.span(1) for match in LINK_REGEX.finditer(txt)
+                    ]
+                if any(link_start <= start and end <= link_end
+                       for link_start, link_end in link_spans):
                     continue
                 # else, check the escapes between the prev and last and forcefully escape the url to avoid mangling
                 else:
                     # TODO: investigate possible offset bug when lots of emoji are present
-                    res += _selective_escape(txt[prev:start] or
-                                             "") + escape_markdown(ent_text)
+                    res.append(
+                        _selective_escape(txt[prev:start] or "") +
+                        escape_markdown(ent_text))
 
             # code handling
             elif ent.type == "code":
-                res += _selective_escape(txt[prev:start]) + '`' + ent_text + '`'
+                res.append(
+                    _selective_escape(txt[prev:start]) + '`' + ent_text + '`')
 
             # handle markdown/html links
             elif ent.type == "text_link":
-                res += _selective_escape(txt[prev:start]) + "[{}]({})".format(
-                    ent_text, ent.url)
+                res.append(
+                    _selective_escape(txt[prev:start]) +
+                    "[{}]({})".format(ent_text, ent.url))
 
             end += 1
 
@@ -122,8 +157,8 @@ def markdown_parser(txt: str,
 
         prev = end
 
-    res += _selective_escape(txt[prev:])  # add the rest of the text
-    return res
+    res.append(_selective_escape(txt[prev:]))  # add the rest of the text
+    return "".join(res)
 
 
 def button_markdown_parser(txt: str,
@@ -1,62 +1,81 @@
+from threading import RLock
+from time import perf_counter
+
+from cachetools import TTLCache
+from SaitamaRobot.modules.helper_funcs import metrics
 from SaitamaRobot.modules.helper_funcs.telethn import IMMUNE_USERS, telethn
 from SaitamaRobot import DRAGONS
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from telethon.errors import UserNotParticipantError
 from telethon.tl.types import ChannelParticipantsAdmins
 
+# admin id sets per chat, kept for 10 min like the bot api ADMIN_CACHE.
+ADMIN_IDS_CACHE = TTLCache(maxsize=512, ttl=60 * 10, timer=perf_counter)
+register_cache(__name__, "ADMIN_IDS_CACHE")
+# also touched from dispatcher threads through invalidate_admin_ids
+ADMIN_IDS_LOCK = RLock()
+SAITAMA_ID = None
+
+
+async def get_admin_ids(chat_id: int):
+    with ADMIN_IDS_LOCK:
+        admin_ids = ADMIN_IDS_CACHE.get(chat_id)
+    if admin_ids is not None:
+        metrics.cache_hit("admin_ids")
+        return admin_ids
+
+    metrics.cache_miss("admin_ids")
+    admin_ids = frozenset([
+        user.id async for user in telethn.iter_participants(
+            chat_id, filter=ChannelParticipantsAdmins)
+    ])
+    with ADMIN_IDS_LOCK:
+        ADMIN_IDS_CACHE[chat_id] = admin_ids
+    return admin_ids
+
+
+def invalidate_admin_ids(chat_id: int):
+    with ADMIN_IDS_LOCK:
+        ADMIN_IDS_CACHE.pop(chat_id, None)
+
+
+async def get_saitama_id() -> int:
+    global SAITAMA_ID
+    if SAITAMA_ID is None:
+        SAITAMA_ID = (await telethn.get_me(input_peer=True)).user_id
+    return SAITAMA_ID
+
 
 async def user_is_ban_protected(user_id: int, message):
-    status = False
     if message.is_private or user_id in (IMMUNE_USERS):
         return True
 
-    async for user in telethn.iter_participants(
-            message.chat_id, filter=ChannelParticipantsAdmins):
-        if user_id == user.id:
-            status = True
-            break
-    return status
+    return user_id in await get_admin_ids(message.chat_id)
 
 
 async def user_is_admin(user_id: int, message):
-    status = False
     if message.is_private:
         return True
 
-    async for user in telethn.iter_participants(
-            message.chat_id, filter=ChannelParticipantsAdmins):
-        if user_id == user.id or user_id in DRAGONS:
-            status = True
-            break
-    return status
+    return user_id in DRAGONS or user_id in await get_admin_ids(
+        message.chat_id)
 
 
 async def is_user_admin(user_id: int, chat_id):
-    status = False
-    async for user in telethn.iter_participants(
-            chat_id, filter=ChannelParticipantsAdmins):
-        if user_id == user.id or user_id in DRAGONS:
-            status = True
-            break
-    return status
+    return user_id in DRAGONS or user_id in await get_admin_ids(chat_id)
 
 
 async def saitama_is_admin(chat_id: int):
-    status = False
-    saitama = await telethn.get_me()
-    async for user in telethn.iter_participants(
-            chat_id, filter=ChannelParticipantsAdmins):
-        if saitama.id == user.id:
-            status = True
-            break
-    return status
+    return await get_saitama_id() in await get_admin_ids(chat_id)
 
 
 async def is_user_in_chat(chat_id: int, user_id: int):
-    status = False
-    async for user in telethn.iter_participants(chat_id):
-        if user_id == user.id:
-            status = True
-            break
-    return status
+    # one getParticipant(s) call instead of paging through every member
+    try:
+        permissions = await telethn.get_permissions(chat_id, user_id)
+    except UserNotParticipantError:
+        return False
+    return not (permissions.is_banned or permissions.has_left)
 
 
 async def can_change_info(message):
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+from SaitamaRobot import LOGGER, dispatcher, telethn
+from telegram.error import TelegramError
+from telethon.errors import FloodWaitError, RPCError
+
+# telegram caps a delete_messages call at 100 ids
+DELETE_BATCH = 100
+# queued deletes of one chat are merged for this many seconds
+DELETE_WINDOW = 0.5
+# a FloodWait on deletes holds back every later delete call, not only the
+# one that hit it.
+FLOOD_WAIT_UNTIL = 0.0
+
+
+async def wait_for_flood():
+    delay = FLOOD_WAIT_UNTIL - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def delete_batch(client, chat_id, message_ids) -> int:
+    """
+    Delete up to DELETE_BATCH messages in one call, waiting out FloodWaits.
+
+    :return: how many ids were sent, 0 if telegram refused the batch
+    """
+    global FLOOD_WAIT_UNTIL
+    while True:
+        await wait_for_flood()
+        try:
+            await client.delete_messages(chat_id, message_ids)
+            return len(message_ids)
+        except FloodWaitError as excp:
+            LOGGER.warning("FloodWait of %ss deleting messages in %s",
+                           excp.seconds, chat_id)
+            FLOOD_WAIT_UNTIL = max(FLOOD_WAIT_UNTIL,
+                                   time.monotonic() + excp.seconds)
+        except RPCError as excp:
+            LOGGER.warning("Couldn't delete messages in %s: %s", chat_id,
+                           excp)
+            return 0
+
+
+# {chat_id: [message ids]} waiting for their window to close, only touched
+# from the telethon loop
+PENDING_DELETES = {}
+# {chat_id: asyncio.TimerHandle}
+FLUSH_TIMERS = {}
+STATS_LOCK = threading.Lock()
+DELETE_STATS = {"queued": 0, "calls": 0, "fallbacks": 0}
+
+
+def _bot_api_delete(chat_id, message_ids):
+    for message_id in message_ids:
+        try:
+            dispatcher.bot.delete_message(chat_id, message_id)
+        except TelegramError:
+            pass
+
+
+async def _flush_deletes(chat_id, message_ids):
+    with STATS_LOCK:
+        DELETE_STATS["calls"] += 1
+    try:
+        deleted = await delete_batch(telethn, chat_id, message_ids)
+    except ValueError:
+        # telethon can't resolve a chat it hasn't seen yet
+        deleted = 0
+    if not deleted:
+        with STATS_LOCK:
+            DELETE_STATS["fallbacks"] += 1
+            DELETE_STATS["calls"] += len(message_ids)
+        await asyncio.get_event_loop().run_in_executor(
+            None, _bot_api_delete, chat_id, message_ids)
+
+
+def _flush(chat_id):
+    timer = FLUSH_TIMERS.pop(chat_id, None)
+    if timer:
+        timer.cancel()
+    message_ids = PENDING_DELETES.pop(chat_id, None)
+    if message_ids:
+        asyncio.ensure_future(_flush_deletes(chat_id, message_ids))
+
+
+def _enqueue(chat_id, message_id):
+    message_ids = PENDING_DELETES.setdefault(chat_id, [])
+    message_ids.append(message_id)
+    if len(message_ids) >= DELETE_BATCH:
+        _flush(chat_id)
+    elif chat_id not in FLUSH_TIMERS:
+        FLUSH_TIMERS[chat_id] = telethn.loop.call_later(
+            DELETE_WINDOW, _flush, chat_id)
+
+
+def queue_delete(chat_id: int, message_id: int):
+    """
+    Delete a message soon, batched with other deletes in the same chat.
+
+    Safe to call from dispatcher threads. During a raid this turns one
+    bot api call per message into one delete_messages call per window.
+    """
+    with STATS_LOCK:
+        DELETE_STATS["queued"] += 1
+    telethn.loop.call_soon_threadsafe(_enqueue, chat_id, message_id)
+
+
+def delete_later(message):
+    queue_delete(message.chat_id, message.message_id)
+
+
+def deletion_stats() -> dict:
+    with STATS_LOCK:
+        stats = dict(DELETE_STATS)
+    stats["saved"] = stats["queued"] - stats["calls"]
+    return stats
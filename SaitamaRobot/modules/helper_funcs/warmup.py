@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from SaitamaRobot import LOGGER, StartTime
+from SaitamaRobot.modules.helper_funcs import snapshot, startup
+from SaitamaRobot.modules.sql import SESSION
+
+# loaders running at once, each on its own thread and so its own connection
+WORKERS = 4
+# the longest a getter without a db fallback waits for its cache
+WAIT_TIMEOUT = 60
+
+# {module name: (loaders, locks)}
+LOADERS = {}
+# set once a module's warm-up finished, loaded or not
+DONE = {}
+# modules whose caches are complete
+READY = set()
+# a failed load is only retried this often, in seconds
+RETRY_INTERVAL = 30
+# {module name: perf_counter of the last failed retry}
+LAST_FAILURE = {}
+RETRY_LOCK = threading.Lock()
+
+
+class CachesUnavailable(Exception):
+    """A module's caches couldn't be loaded, its getters can't answer."""
+
+
+def register(module_name: str, *loaders, locks=()):
+    """
+    Load a sql module's caches during the warm-up instead of at import, and
+    snapshot them.
+
+    :param locks: the locks its writers hold while changing the caches, held
+        during the load so no write gets lost
+    """
+    snapshot.register(module_name, *locks)
+    snapshot.PENDING.add(module_name)
+    LOADERS[module_name] = (loaders, locks)
+    DONE[module_name] = threading.Event()
+
+
+def is_ready(module_name: str) -> bool:
+    """Getters check this and query the db until it's True."""
+    return module_name in READY or module_name not in DONE
+
+
+def wait(module_name: str, timeout: float = WAIT_TIMEOUT):
+    """
+    For getters without a db fallback, blocks while that module loads, not
+    until the whole warm-up is done. If its warm-up failed or is taking too
+    long, loads it in this thread instead.
+
+    :raises CachesUnavailable: when that load fails too, rather than letting
+        the getter read a partial cache
+    """
+    if module_name in READY:
+        return
+    done = DONE.get(module_name)
+    if done is None:
+        return
+    if not done.wait(timeout):
+        LOGGER.warning("Gave up waiting for the %s caches", module_name)
+    if module_name not in READY:
+        _retry(module_name)
+
+
+def wait_all(timeout: float = None) -> bool:
+    deadline = None if timeout is None else perf_counter() + timeout
+    for done in list(DONE.values()):
+        remaining = None if deadline is None else max(
+            deadline - perf_counter(), 0)
+        if not done.wait(remaining):
+            return False
+    return True
+
+
+def _load(module_name: str, from_snapshot: bool):
+    loaders, locks = LOADERS[module_name]
+    while not snapshot.acquire_all(locks):
+        continue
+    try:
+        # a retry may have waited on the warm-up holding these
+        if module_name in READY:
+            return
+        with startup.timed(module_name, "warmup"):
+            if not from_snapshot or not snapshot.restore(module_name):
+                for loader in loaders:
+                    loader()
+        READY.add(module_name)
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+    snapshot.PENDING.discard(module_name)
+
+
+def _warm(module_name: str):
+    try:
+        _load(module_name, True)
+    except Exception:
+        # getters with a db fallback keep using it, the rest retry the load
+        LOGGER.exception("Couldn't load the %s caches", module_name)
+    finally:
+        SESSION.remove()
+        DONE[module_name].set()
+
+
+def _retry(module_name: str):
+    with RETRY_LOCK:
+        failed = LAST_FAILURE.get(module_name)
+    if failed is not None and perf_counter() - failed < RETRY_INTERVAL:
+        raise CachesUnavailable(module_name)
+    try:
+        _load(module_name, False)
+    except Exception as excp:
+        with RETRY_LOCK:
+            LAST_FAILURE[module_name] = perf_counter()
+        LOGGER.exception("Couldn't load the %s caches", module_name)
+        raise CachesUnavailable(module_name) from excp
+    LOGGER.info("Loaded the %s caches on first use", module_name)
+
+
+def start(workers: int = WORKERS):
+    """
+    Load every registered module's caches in the background. The bot can
+    take updates meanwhile, see is_ready and wait.
+    """
+    started = perf_counter()
+    pool = ThreadPoolExecutor(max_workers=workers,
+                              thread_name_prefix="warmup")
+    futures = [pool.submit(_warm, module_name) for module_name in LOADERS]
+
+    def finish():
+        for future in futures:
+            future.result()
+        pool.shutdown()
+        snapshot.finish_restore()
+        LOGGER.info("Warmed up %s of %s sql caches in %.2fs", len(READY),
+                    len(LOADERS), perf_counter() - started)
+        startup.report(time.time() - StartTime)
+
+    threading.Thread(target=finish, name="warmup_done", daemon=True).start()
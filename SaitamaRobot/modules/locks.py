@@ -2,7 +2,6 @@ import html
 
 from telegram import Message, Chat, ParseMode, MessageEntity
 from telegram import TelegramError, ChatPermissions
-from telegram.error import BadRequest
 from telegram.ext import CommandHandler, MessageHandler, Filters
 from telegram.ext.dispatcher import run_async
 from telegram.utils.helpers import mention_html
@@ -10,7 +9,7 @@ from telegram.utils.helpers import mention_html
 from alphabet_detector import AlphabetDetector
 
 import SaitamaRobot.modules.sql.locks_sql as sql
-from SaitamaRobot import dispatcher, DRAGONS, LOGGER
+from SaitamaRobot import dispatcher, DRAGONS
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
 from SaitamaRobot.modules.helper_funcs.chat_status import (
     can_delete,
@@ -23,6 +22,7 @@ from SaitamaRobot.modules.log_channel import loggable
 from SaitamaRobot.modules.connection import connected
 
 from SaitamaRobot.modules.helper_funcs.alternate import send_message, typing_action
+from SaitamaRobot.modules.helper_funcs.telethn.deletion import delete_later
 
 ad = AlphabetDetector()
 
@@ -430,50 +430,26 @@ def del_lockables(update, context):
                 if message.caption:
                     check = ad.detect_alphabet(u"{}".format(message.caption))
                     if "ARABIC" in check:
-                        try:
-                            message.delete()
-                        except BadRequest as excp:
-                            if excp.message == "Message to delete not found":
-                                pass
-                            else:
-                                LOGGER.exception("ERROR in lockables")
+                        delete_later(message)
                         break
                 if message.text:
                     check = ad.detect_alphabet(u"{}".format(message.text))
                     if "ARABIC" in check:
-                        try:
-                            message.delete()
-                        except BadRequest as excp:
-                            if excp.message == "Message to delete not found":
-                                pass
-                            else:
-                                LOGGER.exception("ERROR in lockables")
+                        delete_later(message)
                         break
             continue
         if lockable == "button":
             if sql.is_locked(chat.id, lockable) and can_delete(
                     chat, context.bot.id):
                 if message.reply_markup and message.reply_markup.inline_keyboard:
-                    try:
-                        message.delete()
-                    except BadRequest as excp:
-                        if excp.message == "Message to delete not found":
-                            pass
-                        else:
-                            LOGGER.exception("ERROR in lockables")
+                    delete_later(message)
                     break
             continue
         if lockable == "inline":
             if sql.is_locked(chat.id, lockable) and can_delete(
                     chat, context.bot.id):
                 if message and message.via_bot:
-                    try:
-                        message.delete()
-                    except BadRequest as excp:
-                        if excp.message == "Message to delete not found":
-                            pass
-                        else:
-                            LOGGER.exception("ERROR in lockables")
+                    delete_later(message)
                     break
             continue
         if (filter(update) and sql.is_locked(chat.id, lockable) and
@@ -497,13 +473,7 @@ def del_lockables(update, context):
                         )
                         break
             else:
-                try:
-                    message.delete()
-                except BadRequest as excp:
-                    if excp.message == "Message to delete not found":
-                        pass
-                    else:
-                        LOGGER.exception("ERROR in lockables")
+                delete_later(message)
 
                 break
 
@@ -1,5 +1,8 @@
+import threading
+from collections import deque
 from datetime import datetime
 from functools import wraps
+from time import monotonic, sleep
 
 from telegram.ext import CallbackContext
 
@@ -8,8 +11,9 @@ from SaitamaRobot.modules.helper_funcs.misc import is_module_loaded
 FILENAME = __name__.rsplit(".", 1)[-1]
 
 if is_module_loaded(FILENAME):
-    from telegram import ParseMode, Update
-    from telegram.error import BadRequest, Unauthorized
+    from telegram import MAX_MESSAGE_LENGTH, ParseMode, Update
+    from telegram.error import (BadRequest, RetryAfter, TelegramError,
+                                Unauthorized)
     from telegram.ext import CommandHandler, JobQueue, run_async
     from telegram.utils.helpers import escape_markdown
 
@@ -71,30 +75,160 @@ if is_module_loaded(FILENAME):
 
         return glog_action
 
+    # seconds a burst of log events may pile up before it is sent
+    LOG_WINDOW = 1
+    # per log channel, the oldest events are dropped beyond this
+    LOG_QUEUE_LIMIT = 500
+    LOG_SEPARATOR = "\n\n"
+    FORMATTING_NOTICE = (
+        "\n\nFormatting has been disabled due to an unexpected error.")
+
+    # {log_chat_id: deque of (orig_chat_id, result)}
+    LOG_QUEUES = {}
+    # {log_chat_id: monotonic time its flood wait ends}
+    LOG_BLOCKED = {}
+    LOG_CONDITION = threading.Condition()
+    LOG_STATS = {"queued": 0, "dropped": 0, "messages": 0}
+
     def send_log(context: CallbackContext, log_chat_id: str, orig_chat_id: str,
                  result: str):
-        bot = context.bot
+        # handlers only queue the event, the log sink thread sends it
+        with LOG_CONDITION:
+            queue = LOG_QUEUES.get(str(log_chat_id))
+            if queue is None:
+                queue = LOG_QUEUES[str(log_chat_id)] = deque(
+                    maxlen=LOG_QUEUE_LIMIT)
+            if len(queue) == LOG_QUEUE_LIMIT:
+                LOG_STATS["dropped"] += 1
+            queue.append((orig_chat_id, result))
+            LOG_STATS["queued"] += 1
+            LOG_CONDITION.notify()
+
+    def build_digests(entries):
+        """Group queued events into as few messages as fit the length limit."""
+        digests, current, length = [], [], 0
+        for entry in entries:
+            if len(entry[1]) > MAX_MESSAGE_LENGTH:
+                entry = (entry[0], entry[1][:MAX_MESSAGE_LENGTH - 1] + "…")
+            added = len(entry[1]) + (len(LOG_SEPARATOR) if current else 0)
+            if current and length + added > MAX_MESSAGE_LENGTH:
+                digests.append(current)
+                current, length = [], 0
+                added = len(entry[1])
+            current.append(entry)
+            length += added
+        if current:
+            digests.append(current)
+        return digests
+
+    def unset_missing_log_channel(bot, log_chat_id: str, entries):
+        for orig_chat_id in {orig_chat_id for orig_chat_id, _ in entries}:
+            # the rest of a burst hits the same error, unset only once
+            if str(sql.get_chat_log_channel(orig_chat_id)) != log_chat_id:
+                continue
+            sql.stop_chat_logging(orig_chat_id)
+            try:
+                bot.send_message(
+                    orig_chat_id,
+                    "This log channel has been deleted - unsetting.")
+            except TelegramError:
+                pass
+
+    def deliver_logs(bot, log_chat_id: str, entries):
+        text = LOG_SEPARATOR.join(result for _, result in entries)
         try:
             bot.send_message(
                 log_chat_id,
-                result,
+                text,
                 parse_mode=ParseMode.HTML,
                 disable_web_page_preview=True)
         except BadRequest as excp:
             if excp.message == "Chat not found":
-                bot.send_message(
-                    orig_chat_id,
-                    "This log channel has been deleted - unsetting.")
-                sql.stop_chat_logging(orig_chat_id)
-            else:
-                LOGGER.warning(excp.message)
-                LOGGER.warning(result)
-                LOGGER.exception("Could not parse")
-
-                bot.send_message(
-                    log_chat_id, result +
-                    "\n\nFormatting has been disabled due to an unexpected error."
-                )
+                LOGGER.warning("Log channel %s not found", log_chat_id)
+                unset_missing_log_channel(bot, log_chat_id, entries)
+                return
+            LOGGER.warning(excp.message)
+            LOGGER.warning(text)
+            LOGGER.exception("Could not parse")
+
+            # the notice can push a full digest over the limit
+            plain = text + FORMATTING_NOTICE
+            for start in range(0, len(plain), MAX_MESSAGE_LENGTH):
+                bot.send_message(log_chat_id,
+                                 plain[start:start + MAX_MESSAGE_LENGTH])
+        with LOG_CONDITION:
+            LOG_STATS["messages"] += 1
+
+    def requeue_logs(log_chat_id: str, entries, retry_after: float):
+        # back in front of whatever was queued since, oldest still dropped
+        # first
+        with LOG_CONDITION:
+            LOG_BLOCKED[log_chat_id] = monotonic() + retry_after
+            queue = LOG_QUEUES.get(log_chat_id, ())
+            merged = deque(entries + list(queue), maxlen=LOG_QUEUE_LIMIT)
+            LOG_STATS["dropped"] += len(entries) + len(queue) - len(merged)
+            LOG_QUEUES[log_chat_id] = merged
+
+    def next_unblock(now: float):
+        """:return: seconds until a flood waited channel with logs is
+            free again, 0 if one with logs is free now, None if no logs"""
+        waits = [
+            max(LOG_BLOCKED.get(log_chat_id, 0) - now, 0)
+            for log_chat_id, queue in LOG_QUEUES.items()
+            if queue
+        ]
+        return min(waits) if waits else None
+
+    def log_sink():
+        bot = dispatcher.bot
+        while True:
+            with LOG_CONDITION:
+                wait = next_unblock(monotonic())
+                while wait != 0:
+                    LOG_CONDITION.wait(wait)
+                    wait = next_unblock(monotonic())
+            # a raid logs hundreds of actions, let them merge into digests
+            sleep(LOG_WINDOW)
+            with LOG_CONDITION:
+                now = monotonic()
+                batches = {}
+                for log_chat_id, queue in LOG_QUEUES.items():
+                    if queue and LOG_BLOCKED.get(log_chat_id, 0) <= now:
+                        batches[log_chat_id] = list(queue)
+                        queue.clear()
+                        LOG_BLOCKED.pop(log_chat_id, None)
+
+            for log_chat_id, entries in batches.items():
+                # anything escaping here would end this thread, and with it
+                # every log channel
+                try:
+                    digests = build_digests(entries)
+                    for index, digest in enumerate(digests):
+                        try:
+                            deliver_logs(bot, log_chat_id, digest)
+                        except RetryAfter as excp:
+                            # the other channels go on meanwhile
+                            requeue_logs(
+                                log_chat_id,
+                                [entry for rest in digests[index:]
+                                 for entry in rest], excp.retry_after)
+                            break
+                        except Exception:
+                            LOGGER.exception("Couldn't send logs to %s",
+                                             log_chat_id)
+                except Exception:
+                    LOGGER.exception("Couldn't build the logs for %s",
+                                     log_chat_id)
+
+    def log_queue_depth() -> dict:
+        with LOG_CONDITION:
+            return {
+                log_chat_id: len(queue)
+                for log_chat_id, queue in LOG_QUEUES.items()
+                if queue
+            }
+
+    threading.Thread(target=log_sink, name="log_sink", daemon=True).start()
 
     @run_async
     @user_admin
@@ -173,7 +307,9 @@ if is_module_loaded(FILENAME):
             message.reply_text("No log channel has been set yet!")
 
     def __stats__():
-        return f"• {sql.num_logchannels()} log channels set."
+        queued = sum(log_queue_depth().values())
+        return (f"• {sql.num_logchannels()} log channels set, "
+                f"{queued} log events queued.")
 
     def __migrate__(old_chat_id, new_chat_id):
         sql.migrate_chat(old_chat_id, new_chat_id)
@@ -1,6 +1,6 @@
-import requests
 from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext, run_async
 
@@ -20,7 +20,7 @@ def paste(update: Update, context: CallbackContext):
         message.reply_text("What am I supposed to do with this?")
         return
 
-    key = requests.post(
+    key = http_client.post(
         'https://nekobin.com/api/documents', json={
             "content": data
         }).json().get('result').get('key')
@@ -1,16 +1,75 @@
+import asyncio
 import time
 from telethon import events
+from telethon.errors import RPCError
 
-from SaitamaRobot import telethn
+from SaitamaRobot import LOGGER, telethn
 from SaitamaRobot.modules.helper_funcs.telethn.chatstatus import (
     can_delete_messages, user_is_admin)
+from SaitamaRobot.modules.helper_funcs.telethn.deletion import (
+    DELETE_BATCH, delete_batch, deletion_stats)
 
+# delete calls in flight per purge
+PURGE_IN_FLIGHT = 4
+# bigger purges run in the background and report progress as they go
+PURGE_BACKGROUND = 1000
+PROGRESS_INTERVAL = 3
+# {chat_id: asyncio.Lock}, purges in one chat run one after another
+PURGE_LOCKS = {}
 
-async def purge_messages(event):
+
+async def run_purge(event, message_ids, status=None):
     start = time.perf_counter()
+    total = len(message_ids)
+    purged = 0
+    last_edit = start
+    in_flight = asyncio.Semaphore(PURGE_IN_FLIGHT)
+
+    async def purge_batch(batch):
+        nonlocal purged, last_edit
+        async with in_flight:
+            await delete_batch(event.client, event.chat_id, batch)
+        purged += len(batch)
+        if status and time.perf_counter() - last_edit >= PROGRESS_INTERVAL:
+            last_edit = time.perf_counter()
+            try:
+                await status.edit(f"Purging... {purged}/{total} messages")
+            except RPCError:
+                pass
+
+    lock = PURGE_LOCKS.setdefault(event.chat_id, asyncio.Lock())
+    async with lock:
+        await asyncio.gather(*(
+            purge_batch(message_ids[index:index + DELETE_BATCH])
+            for index in range(0, total, DELETE_BATCH)))
+
+    time_ = time.perf_counter() - start
+    text = f"Purged Successfully in {time_:0.2f} Second(s)"
+    if status:
+        try:
+            await status.edit(text)
+            return
+        except RPCError:
+            pass
+    await event.respond(text, parse_mode='markdown')
+
+
+async def run_background_purge(event, message_ids, status):
+    try:
+        await run_purge(event, message_ids, status)
+    except Exception:
+        LOGGER.exception("Background purge in %s failed", event.chat_id)
+
+
+async def purge_messages(event):
     if event.from_id is None:
         return
 
+    # can_delete_messages is local, check it before the admin lookup
+    if not await can_delete_messages(message=event):
+        await event.reply("Can't seem to purge the message")
+        return
+
     if not await user_is_admin(
             user_id=event.sender_id, message=event) and event.from_id not in [
                 1087968824
@@ -18,33 +77,21 @@ async def purge_messages(event):
         await event.reply("Only Admins are allowed to use this command")
         return
 
-    if not await can_delete_messages(message=event):
-        await event.reply("Can't seem to purge the message")
-        return
-
     reply_msg = await event.get_reply_message()
     if not reply_msg:
         await event.reply(
             "Reply to a message to select where to start purging from.")
         return
-    messages = []
-    message_id = reply_msg.id
-    delete_to = event.message.id
+    message_ids = list(range(reply_msg.id, event.message.id + 1))
 
-    messages.append(event.reply_to_msg_id)
-    for msg_id in range(message_id, delete_to + 1):
-        messages.append(msg_id)
-        if len(messages) == 100:
-            await event.client.delete_messages(event.chat_id, messages)
-            messages = []
+    if len(message_ids) > PURGE_BACKGROUND:
+        status = await event.respond(
+            f"Purging {len(message_ids)} messages in the background.")
+        asyncio.ensure_future(
+            run_background_purge(event, message_ids, status))
+        return
 
-    try:
-        await event.client.delete_messages(event.chat_id, messages)
-    except:
-        pass
-    time_ = time.perf_counter() - start
-    text = f"Purged Successfully in {time_:0.2f} Second(s)"
-    await event.respond(text, parse_mode='markdown')
+    await run_purge(event, message_ids)
 
 
 async def delete_messages(event):
@@ -71,6 +118,12 @@ async def delete_messages(event):
     await event.client.delete_messages(chat, del_message)
 
 
+def __stats__():
+    stats = deletion_stats()
+    return (f"• {stats['queued']} queued deletions, "
+            f"{stats['saved']} api calls saved by batching")
+
+
 __help__ = """
 *Admin only:*
  - /del: deletes the message you replied to
@@ -1,7 +1,8 @@
 import html
 
 from SaitamaRobot import (LOGGER, DRAGONS, TIGERS, WOLVES, dispatcher)
-from SaitamaRobot.modules.helper_funcs.chat_status import (user_admin,
+from SaitamaRobot.modules.helper_funcs.chat_status import (get_admin_roster,
+                                                           user_admin,
                                                            user_not_admin)
 from SaitamaRobot.modules.log_channel import loggable
 from SaitamaRobot.modules.sql import reporting_sql as sql
@@ -72,7 +73,7 @@ def report(update: Update, context: CallbackContext) -> str:
     if chat and message.reply_to_message and sql.chat_should_report(chat.id):
         reported_user = message.reply_to_message.from_user
         chat_name = chat.title or chat.first or chat.username
-        admin_list = chat.get_administrators()
+        admin_list = get_admin_roster(chat.id)
         message = update.effective_message
 
         if not args:
@@ -135,11 +136,13 @@ def report(update: Update, context: CallbackContext) -> str:
             link = ""
             should_forward = True
 
-        for admin in admin_list:
-            if admin.user.is_bot:  # can't message bots
-                continue
+        # can't message bots
+        admin_list = [admin for admin in admin_list if not admin.user.is_bot]
+        should_report = sql.users_should_report(
+            [admin.user.id for admin in admin_list])
 
-            if sql.user_should_report(admin.user.id):
+        for admin in admin_list:
+            if admin.user.id in should_report:
                 try:
                     if not chat.type == Chat.SUPERGROUP:
                         bot.send_message(
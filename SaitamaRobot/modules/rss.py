@@ -1,13 +1,34 @@
 import html
 import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
-from feedparser import parse
-from SaitamaRobot import dispatcher, updater
+from SaitamaRobot import LOGGER, dispatcher, updater
 from SaitamaRobot.modules.helper_funcs.chat_status import user_admin
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
 from SaitamaRobot.modules.sql import rss_sql as sql
 from telegram import ParseMode, Update, constants
 from telegram.ext import CallbackContext, CommandHandler
 
+feedparser = lazy_import("feedparser")
+
+# feeds are polled once per unique url, FETCH_WORKERS at a time and at most
+# PER_HOST_LIMIT at a time against the same host.
+FETCH_WORKERS = 8
+PER_HOST_LIMIT = 2
+FETCH_POOL = ThreadPoolExecutor(
+    max_workers=FETCH_WORKERS, thread_name_prefix="rss_fetch")
+HOST_LOCKS = defaultdict(lambda: threading.BoundedSemaphore(PER_HOST_LIMIT))
+HOST_LOCKS_LOCK = threading.Lock()
+
+# {feed_link: (etag, modified)} from the last successful fetch
+FEED_VALIDATORS = {}
+# {feed_link: {"fetches": int, "errors": int, "latency": float}}
+FEED_STATS = defaultdict(lambda: {"fetches": 0, "errors": 0, "latency": 0.0})
+
 
 def show_url(update: Update, context: CallbackContext):
     tg_chat_id = str(update.effective_chat.id)
@@ -15,7 +36,7 @@ def show_url(update: Update, context: CallbackContext):
     args = context.args
     if len(args) >= 1:
         tg_feed_link = args[0]
-        link_processed = parse(tg_feed_link)
+        link_processed = feedparser.parse(tg_feed_link)
 
         if link_processed.bozo == 0:
             feed_title = link_processed.feed.get("title", default="Unknown")
@@ -100,7 +121,7 @@ def add_url(update: Update, context: CallbackContext):
 
         tg_feed_link = args[0]
 
-        link_processed = parse(tg_feed_link)
+        link_processed = feedparser.parse(tg_feed_link)
 
         # check if link is a valid RSS Feed link
         if link_processed.bozo == 0:
@@ -136,7 +157,7 @@ def remove_url(update: Update, context: CallbackContext):
 
         tg_feed_link = args[0]
 
-        link_processed = parse(tg_feed_link)
+        link_processed = feedparser.parse(tg_feed_link)
 
         if link_processed.bozo == 0:
             user_data = sql.check_url_availability(tg_chat_id, tg_feed_link)
@@ -156,37 +177,92 @@ def remove_url(update: Update, context: CallbackContext):
         update.effective_message.reply_text("URL missing")
 
 
-def rss_update(context: CallbackContext):
-    user_data = sql.get_all()
-    job = context.job
-    bot = context.bot
-    # this loop checks for every row in the DB
+def fetch_feed(feed_link):
+    with HOST_LOCKS_LOCK:
+        host_lock = HOST_LOCKS[urlparse(feed_link).netloc]
+
+    etag, modified = FEED_VALIDATORS.get(feed_link, (None, None))
+    stats = FEED_STATS[feed_link]
+    start = time.perf_counter()
+    try:
+        with host_lock:
+            # conditional GET, an unchanged feed answers 304 with no entries
+            feed_processed = feedparser.parse(
+                feed_link, etag=etag, modified=modified)
+    except Exception:
+        LOGGER.exception("Error while fetching rss feed %s", feed_link)
+        feed_processed = None
+    finally:
+        stats["fetches"] += 1
+        stats["latency"] = time.perf_counter() - start
+
+    if feed_processed is None or feed_processed.get("status", 200) >= 400 or (
+            feed_processed.bozo and not feed_processed.entries):
+        stats["errors"] += 1
+        return None
+
+    if feed_processed.get("status") != 304:
+        FEED_VALIDATORS[feed_link] = (feed_processed.get("etag"),
+                                      feed_processed.get("modified"))
+    return feed_processed
+
+
+def fetch_all_feeds(user_data):
+    # group subscriptions so every feed is downloaded and parsed only once
+    subscriptions = defaultdict(list)
     for row in user_data:
-        row_id = row.id
-        tg_chat_id = row.chat_id
-        tg_feed_link = row.feed_link
+        subscriptions[row.feed_link].append(row)
+
+    feeds = dict(
+        zip(subscriptions, FETCH_POOL.map(fetch_feed, list(subscriptions))))
+
+    for feed_link in subscriptions:
+        stats = FEED_STATS[feed_link]
+        LOGGER.debug("rss feed %s: %.2fs, %d errors in %d fetches", feed_link,
+                     stats["latency"], stats["errors"], stats["fetches"])
+    failed = [link for link, feed in feeds.items() if feed is None]
+    if failed:
+        LOGGER.warning("%d of %d rss feeds failed to fetch: %s", len(failed),
+                       len(feeds), ", ".join(failed))
+
+    return [(row, feeds[feed_link])
+            for feed_link, rows in subscriptions.items()
+            for row in rows
+            if feeds[feed_link] is not None]
+
+
+def get_new_entries(row, feed_processed):
+    tg_old_entry_link = row.old_entry_link
+
+    new_entry_links = []
+    new_entry_titles = []
+
+    # this loop checks for every entry from the RSS Feed link from the DB row
+    for entry in feed_processed.entries:
+        # check if there are any new updates to the RSS Feed from the old entry
+        if entry.link != tg_old_entry_link:
+            new_entry_links.append(entry.link)
+            new_entry_titles.append(entry.title)
+        else:
+            break
 
-        feed_processed = parse(tg_feed_link)
+    # check if there's any new entries queued from the last check
+    if new_entry_links:
+        sql.update_url(row.id, new_entry_links)
 
-        tg_old_entry_link = row.old_entry_link
+    return new_entry_links, new_entry_titles
 
-        new_entry_links = []
-        new_entry_titles = []
 
-        # this loop checks for every entry from the RSS Feed link from the DB row
-        for entry in feed_processed.entries:
-            # check if there are any new updates to the RSS Feed from the old entry
-            if entry.link != tg_old_entry_link:
-                new_entry_links.append(entry.link)
-                new_entry_titles.append(entry.title)
-            else:
-                break
+def rss_update(context: CallbackContext):
+    user_data = sql.get_all()
+    job = context.job
+    bot = context.bot
+    # this loop checks for every row in the DB, against the feed fetched for it
+    for row, feed_processed in fetch_all_feeds(user_data):
+        tg_chat_id = row.chat_id
 
-        # check if there's any new entries queued from the last check
-        if new_entry_links:
-            sql.update_url(row_id, new_entry_links)
-        else:
-            pass
+        new_entry_links, new_entry_titles = get_new_entries(
+            row, feed_processed)
 
         if len(new_entry_links) < 5:
             # this loop sends every new update to each user from each group based on the DB entries
@@ -234,30 +310,14 @@ def rss_set(context: CallbackContext):
     user_data = sql.get_all()
     bot, job = context.bot, context.job
     # this loop checks for every row in the DB
-    for row in user_data:
-        row_id = row.id
-        tg_feed_link = row.feed_link
-        tg_old_entry_link = row.old_entry_link
-
-        feed_processed = parse(tg_feed_link)
+    for row, feed_processed in fetch_all_feeds(user_data):
+        get_new_entries(row, feed_processed)
 
-        new_entry_links = []
-        new_entry_titles = []
 
-        # this loop checks for every entry from the RSS Feed link from the DB row
-        for entry in feed_processed.entries:
-            # check if there are any new updates to the RSS Feed from the old entry
-            if entry.link != tg_old_entry_link:
-                new_entry_links.append(entry.link)
-                new_entry_titles.append(entry.title)
-            else:
-                break
-
-        # check if there's any new entries queued from the last check
-        if new_entry_links:
-            sql.update_url(row_id, new_entry_links)
-        else:
-            pass
+def __stats__():
+    fetches = sum(stats["fetches"] for stats in FEED_STATS.values())
+    errors = sum(stats["errors"] for stats in FEED_STATS.values())
+    return f"• {len(FEED_STATS)} rss feeds polled, {errors} of {fetches} fetches failed"
 
 
 __help__ = """
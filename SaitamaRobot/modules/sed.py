@@ -1,15 +1,153 @@
+import math
+import multiprocessing
 import sre_constants
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 
 import regex
 import telegram
 from SaitamaRobot import LOGGER, dispatcher
 from SaitamaRobot.modules.disable import DisableAbleMessageHandler
-from SaitamaRobot.modules.helper_funcs.regex_helper import (infinite_loop_check)
+from SaitamaRobot.modules.helper_funcs.regex_helper import (
+    check_regex_complexity)
 from telegram import Update
 from telegram.ext import CallbackContext, Filters, run_async
 
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
 DELIMITERS = ("/", ":", "|", "_")
 
+# user patterns run in their own processes, so a pathological one costs a
+# sed worker instead of a dispatcher thread.
+SED_WORKERS = 2
+# regex's own timeouts fire first, the cpu limit kills a worker that is
+# stuck anyway and the result timeout stops the handler from waiting on it.
+MATCH_TIMEOUT = 2
+SUB_TIMEOUT = 3
+SED_CPU_LIMIT = 5
+SED_TIMEOUT = SED_CPU_LIMIT + 2
+SED_PER_CHAT = 2
+SED_PER_USER = 1
+
+POOL_LOCK = threading.Lock()
+RUNNING_LOCK = threading.Lock()
+RUNNING_CHATS = Counter()
+RUNNING_USERS = Counter()
+
+
+# only where workers fork, so they don't boot the bot again, and the cpu
+# limit exists. Elsewhere patterns run in the handler thread, on regex's
+# timeouts alone.
+SED_IN_PROCESS = (resource is not None and
+                  multiprocessing.get_start_method() == "fork")
+
+
+def new_sed_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=SED_WORKERS)
+
+
+SED_POOL = new_sed_pool() if SED_IN_PROCESS else None
+
+
+def replace_broken_pool(broken: ProcessPoolExecutor):
+    global SED_POOL
+    with POOL_LOCK:
+        if SED_POOL is broken:
+            SED_POOL = new_sed_pool()
+    broken.shutdown(wait=False)
+
+
+def acquire_sed_slot(chat_id: int, user_id: int) -> bool:
+    with RUNNING_LOCK:
+        if (RUNNING_CHATS[chat_id] >= SED_PER_CHAT or
+                RUNNING_USERS[user_id] >= SED_PER_USER):
+            return False
+        RUNNING_CHATS[chat_id] += 1
+        RUNNING_USERS[user_id] += 1
+        return True
+
+
+def release_sed_slot(chat_id: int, user_id: int):
+    with RUNNING_LOCK:
+        RUNNING_CHATS[chat_id] -= 1
+        if RUNNING_CHATS[chat_id] <= 0:
+            del RUNNING_CHATS[chat_id]
+        RUNNING_USERS[user_id] -= 1
+        if RUNNING_USERS[user_id] <= 0:
+            del RUNNING_USERS[user_id]
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str, flags: int = 0):
+    # cached per worker process
+    return regex.compile(pattern, flags)
+
+
+def limit_cpu(seconds: int):
+    # RLIMIT_CPU counts the whole process, so move the soft limit past what
+    # this worker already used. Hitting it sends SIGXCPU, which kills it.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime) + seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_sed(repl: str, repl_with: str, flags: str, to_fix: str):
+    """
+    :return: (status, text), status being one of ok, rejected, spoof,
+        match_timeout, timeout or error
+    """
+    # checked here, behind the sed slots and, in a worker, its cpu limit
+    if check_regex_complexity(repl, 'i' in flags):
+        return "rejected", None
+    try:
+        try:
+            check = compile_pattern(repl, regex.IGNORECASE).match(
+                to_fix, timeout=MATCH_TIMEOUT)
+        except TimeoutError:
+            return "match_timeout", None
+        if check and check.group(0).lower() == to_fix.lower():
+            return "spoof", None
+
+        pattern = compile_pattern(repl, regex.I if 'i' in flags else 0)
+        count = 0 if 'g' in flags else 1
+        text = pattern.sub(
+            repl_with, to_fix, count=count, timeout=SUB_TIMEOUT).strip()
+    except TimeoutError:
+        return "timeout", None
+    except (regex.error, sre_constants.error) as excp:
+        return "error", str(excp)
+    return "ok", text
+
+
+def run_sed_worker(*args):
+    # in a sed worker, never the bot's own process
+    limit_cpu(SED_CPU_LIMIT)
+    return run_sed(*args)
+
+
+def submit_sed(*args):
+    if not SED_IN_PROCESS:
+        return run_sed(*args)
+    pool = SED_POOL
+    try:
+        return pool.submit(run_sed_worker, *args).result(timeout=SED_TIMEOUT)
+    except BrokenProcessPool:
+        # a worker went over its cpu limit
+        replace_broken_pool(pool)
+        return "timeout", None
+    except FutureTimeout:
+        return "timeout", None
+
 
 def separate_sed(sed_string):
     if len(sed_string) >= 3 and sed_string[
@@ -69,40 +207,33 @@ def sed(update: Update, context: CallbackContext):
                 "nothing with something?")
             return
 
+        chat_id = update.effective_chat.id
+        user_id = update.effective_user.id
+        if not acquire_sed_slot(chat_id, user_id):
+            return
         try:
-            try:
-                check = regex.match(
-                    repl, to_fix, flags=regex.IGNORECASE, timeout=5)
-            except TimeoutError:
-                return
-            if check and check.group(0).lower() == to_fix.lower():
-                update.effective_message.reply_to_message.reply_text(
-                    "Hey everyone, {} is trying to make "
-                    "me say stuff I don't wanna "
-                    "say!".format(update.effective_user.first_name))
-                return
-            if infinite_loop_check(repl):
-                update.effective_message.reply_text(
-                    "I'm afraid I can't run that regex.")
-                return
-            if 'i' in flags and 'g' in flags:
-                text = regex.sub(
-                    repl, repl_with, to_fix, flags=regex.I, timeout=3).strip()
-            elif 'i' in flags:
-                text = regex.sub(
-                    repl, repl_with, to_fix, count=1, flags=regex.I,
-                    timeout=3).strip()
-            elif 'g' in flags:
-                text = regex.sub(repl, repl_with, to_fix, timeout=3).strip()
-            else:
-                text = regex.sub(
-                    repl, repl_with, to_fix, count=1, timeout=3).strip()
-        except TimeoutError:
+            status, text = submit_sed(repl, repl_with, flags, to_fix)
+        finally:
+            release_sed_slot(chat_id, user_id)
+
+        if status == "match_timeout":
+            return
+        if status == "rejected":
+            update.effective_message.reply_text(
+                "I'm afraid I can't run that regex.")
+            return
+        if status == "spoof":
+            update.effective_message.reply_to_message.reply_text(
+                "Hey everyone, {} is trying to make "
+                "me say stuff I don't wanna "
+                "say!".format(update.effective_user.first_name))
+            return
+        if status == "timeout":
             update.effective_message.reply_text('Timeout')
             return
-        except sre_constants.error:
+        if status == "error":
             LOGGER.warning(update.effective_message.text)
-            LOGGER.exception("SRE constant error")
+            LOGGER.warning("Sed regex error: %s", text)
             update.effective_message.reply_text(
                 "Do you even sed? Apparently not.")
             return
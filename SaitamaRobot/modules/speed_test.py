@@ -1,11 +1,13 @@
-import speedtest
 from SaitamaRobot import DEV_USERS, dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
 from SaitamaRobot.modules.helper_funcs.chat_status import dev_plus
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
 from telegram import (InlineKeyboardButton, InlineKeyboardMarkup, ParseMode,
                       Update)
 from telegram.ext import CallbackContext, CallbackQueryHandler, run_async
 
+speedtest = lazy_import("speedtest")
+
 
 def convert(speed):
     return round(int(speed) / 1048576, 2)
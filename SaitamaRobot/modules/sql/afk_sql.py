@@ -1,7 +1,11 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
-from sqlalchemy import Boolean, Column, Integer, UnicodeText
+from SaitamaRobot.modules.sql.users_sql import Users
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
+from sqlalchemy import Boolean, Column, Integer, UnicodeText, func
 
 
 class AFK(BASE):
@@ -20,24 +24,81 @@ class AFK(BASE):
         return "afk_status for {}".format(self.user_id)
 
 
-AFK.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    AFK.__table__.create(checkfirst=True)
 INSERTION_LOCK = threading.RLock()
 
+# {user_id: {"reason": str, "username": str, "first_name": str}}
 AFK_USERS = {}
+# {lowercase username: user_id}, only ever holds users who are afk
+AFK_USERNAMES = {}
+register_cache(__name__, "AFK_USERS", "AFK_USERNAMES")
+
+
+def __afk_from_db(user_id):
+    # until the cache is warm
+    try:
+        row = SESSION.query(AFK, Users.username).outerjoin(
+            Users, Users.user_id == AFK.user_id).filter(
+                AFK.user_id == user_id, AFK.is_afk).first()
+        if row is None:
+            return None
+        user, username = row
+        return {"reason": user.reason, "username": username, "first_name": None}
+    finally:
+        SESSION.close()
 
 
 def is_afk(user_id):
+    if not warmup.is_ready(__name__):
+        return __afk_from_db(user_id) is not None
     return user_id in AFK_USERS
 
 
 def check_afk_status(user_id):
-    try:
-        return SESSION.query(AFK).get(user_id)
-    finally:
-        SESSION.close()
+    afk_user = get_afk_user(user_id)
+    if afk_user is None:
+        return None
+    return AFK(user_id, afk_user["reason"])
+
+
+def get_afk_user(user_id):
+    if not warmup.is_ready(__name__):
+        return __afk_from_db(user_id)
+    return AFK_USERS.get(user_id)
 
 
-def set_afk(user_id, reason=""):
+def get_afk_user_id(username):
+    if not warmup.is_ready(__name__):
+        try:
+            row = SESSION.query(AFK.user_id).join(
+                Users, Users.user_id == AFK.user_id).filter(
+                    func.lower(Users.username) == username.lower(),
+                    AFK.is_afk).first()
+            return row[0] if row else None
+        finally:
+            SESSION.close()
+    return AFK_USERNAMES.get(username.lower())
+
+
+def __cache_afk_user(user_id, reason, username=None, first_name=None):
+    __uncache_afk_user(user_id)
+    AFK_USERS[user_id] = {
+        "reason": reason,
+        "username": username,
+        "first_name": first_name
+    }
+    if username:
+        AFK_USERNAMES[username.lower()] = user_id
+
+
+def __uncache_afk_user(user_id):
+    afk_user = AFK_USERS.pop(user_id, None)
+    if afk_user and afk_user["username"]:
+        AFK_USERNAMES.pop(afk_user["username"].lower(), None)
+
+
+def set_afk(user_id, reason="", username=None, first_name=None):
     with INSERTION_LOCK:
         curr = SESSION.query(AFK).get(user_id)
         if not curr:
@@ -45,18 +106,31 @@ def set_afk(user_id, reason=""):
         else:
             curr.is_afk = True
 
-        AFK_USERS[user_id] = reason
+        __cache_afk_user(user_id, reason, username, first_name)
 
         SESSION.add(curr)
         SESSION.commit()
 
 
+def update_afk_user(user_id, username=None, first_name=None):
+    # fed by every logged message, so must stay a cheap no-op for non-afk users
+    afk_user = AFK_USERS.get(user_id)
+    if not afk_user:
+        return
+
+    with INSERTION_LOCK:
+        if username != afk_user["username"]:
+            __cache_afk_user(user_id, afk_user["reason"], username,
+                             first_name or afk_user["first_name"])
+        elif first_name:
+            afk_user["first_name"] = first_name
+
+
 def rm_afk(user_id):
     with INSERTION_LOCK:
         curr = SESSION.query(AFK).get(user_id)
         if curr:
-            if user_id in AFK_USERS:  # sanity check
-                del AFK_USERS[user_id]
+            __uncache_afk_user(user_id)  # sanity check
 
             SESSION.delete(curr)
             SESSION.commit()
@@ -80,14 +154,17 @@ def toggle_afk(user_id, reason=""):
 
 
 def __load_afk_users():
-    global AFK_USERS
+    global AFK_USERS, AFK_USERNAMES
     try:
-        all_afk = SESSION.query(AFK).all()
-        AFK_USERS = {
-            user.user_id: user.reason for user in all_afk if user.is_afk
-        }
+        all_afk = SESSION.query(AFK, Users.username).outerjoin(
+            Users, Users.user_id == AFK.user_id).all()
+        AFK_USERS = {}
+        AFK_USERNAMES = {}
+        for user, username in all_afk:
+            if user.is_afk:
+                __cache_afk_user(user.user_id, user.reason, username)
     finally:
         SESSION.close()
 
 
-__load_afk_users()
+warmup.register(__name__, __load_afk_users, locks=(INSERTION_LOCK,))
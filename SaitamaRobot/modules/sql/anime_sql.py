@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+
+from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
+from sqlalchemy import BigInteger, Column, UnicodeText
+
+
+class AniListCache(BASE):
+    __tablename__ = "anilist_cache"
+    query_key = Column(UnicodeText, primary_key=True)
+    data = Column(UnicodeText, nullable=False)
+    expires = Column(BigInteger, nullable=False)
+
+    def __init__(self, query_key, data, expires):
+        self.query_key = query_key
+        self.data = data
+        self.expires = expires
+
+    def __repr__(self):
+        return "<AniList cache for {}>".format(self.query_key)
+
+
+with timed(__name__, "tables"):
+    AniListCache.__table__.create(checkfirst=True)
+
+INSERTION_LOCK = threading.RLock()
+
+
+def get_cached_query(query_key):
+    try:
+        cached = SESSION.query(AniListCache).get(query_key)
+        if cached and cached.expires > time.time():
+            return json.loads(cached.data)
+        return None
+    finally:
+        SESSION.close()
+
+
+def set_cached_query(query_key, data, ttl):
+    with INSERTION_LOCK:
+        cached = SESSION.query(AniListCache).get(query_key)
+        if not cached:
+            cached = AniListCache(query_key, json.dumps(data),
+                                  int(time.time() + ttl))
+        else:
+            cached.data = json.dumps(data)
+            cached.expires = int(time.time() + ttl)
+
+        SESSION.add(cached)
+        SESSION.commit()
+
+
+def prune_expired():
+    with INSERTION_LOCK:
+        SESSION.query(AniListCache).filter(
+            AniListCache.expires <= time.time()).delete(
+                synchronize_session=False)
+        SESSION.commit()
+
+
+with timed(__name__, "warmup"):
+    prune_expired()
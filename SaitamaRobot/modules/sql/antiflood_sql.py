@@ -3,6 +3,9 @@ import threading
 from sqlalchemy import String, Column, Integer, UnicodeText
 
 from SaitamaRobot.modules.sql import SESSION, BASE
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 DEF_COUNT = 1
 DEF_LIMIT = 0
 DEF_OBJ = (None, DEF_COUNT, DEF_LIMIT)
@@ -38,13 +41,15 @@ class FloodSettings(BASE):
             self.chat_id, self.flood_type)
 
 
-FloodControl.__table__.create(checkfirst=True)
-FloodSettings.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    FloodControl.__table__.create(checkfirst=True)
+    FloodSettings.__table__.create(checkfirst=True)
 
 INSERTION_FLOOD_LOCK = threading.RLock()
 INSERTION_FLOOD_SETTINGS_LOCK = threading.RLock()
 
 CHAT_FLOOD = {}
+register_cache(__name__, "CHAT_FLOOD")
 
 
 def set_flood(chat_id, amount):
@@ -63,6 +68,9 @@ def set_flood(chat_id, amount):
 
 
 def update_flood(chat_id: str, user_id) -> bool:
+    # counting needs the cache, nobody gets flood limited until it's warm
+    if not warmup.is_ready(__name__):
+        return False
     if str(chat_id) in CHAT_FLOOD:
         curr_user_id, count, limit = CHAT_FLOOD.get(str(chat_id), DEF_OBJ)
 
@@ -84,6 +92,12 @@ def update_flood(chat_id: str, user_id) -> bool:
 
 
 def get_flood_limit(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            flood = SESSION.query(FloodControl).get(str(chat_id))
+            return flood.limit if flood else DEF_LIMIT
+        finally:
+            SESSION.close()
     return CHAT_FLOOD.get(str(chat_id), DEF_OBJ)[2]
 
 
@@ -142,4 +156,5 @@ def __load_flood_settings():
         SESSION.close()
 
 
-__load_flood_settings()
+warmup.register(__name__, __load_flood_settings,
+                locks=(INSERTION_FLOOD_LOCK, INSERTION_FLOOD_SETTINGS_LOCK))
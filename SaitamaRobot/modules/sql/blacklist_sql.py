@@ -3,6 +3,9 @@ import threading
 from sqlalchemy import func, distinct, Column, String, UnicodeText, Integer
 
 from SaitamaRobot.modules.sql import SESSION, BASE
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 
 
 class BlackListFilters(BASE):
@@ -39,14 +42,17 @@ class BlacklistSettings(BASE):
             self.chat_id, self.blacklist_type)
 
 
-BlackListFilters.__table__.create(checkfirst=True)
-BlacklistSettings.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    BlackListFilters.__table__.create(checkfirst=True)
+    BlacklistSettings.__table__.create(checkfirst=True)
 
 BLACKLIST_FILTER_INSERTION_LOCK = threading.RLock()
 BLACKLIST_SETTINGS_INSERTION_LOCK = threading.RLock()
 
 CHAT_BLACKLISTS = {}
 CHAT_SETTINGS_BLACKLISTS = {}
+register_cache(__name__, "CHAT_BLACKLISTS",
+               "CHAT_SETTINGS_BLACKLISTS")
 
 
 def add_to_blacklist(chat_id, trigger):
@@ -80,6 +86,15 @@ def rm_from_blacklist(chat_id, trigger):
 
 
 def get_chat_blacklist(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            return {
+                trigger for (trigger,) in SESSION.query(
+                    BlackListFilters.trigger).filter(
+                        BlackListFilters.chat_id == str(chat_id))
+            }
+        finally:
+            SESSION.close()
     return CHAT_BLACKLISTS.get(str(chat_id), set())
 
 
@@ -135,6 +150,14 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
 
 
 def get_blacklist_setting(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            setting = SESSION.query(BlacklistSettings).get(str(chat_id))
+            if setting:
+                return setting.blacklist_type, setting.value
+            return 1, "0"
+        finally:
+            SESSION.close()
     try:
         setting = CHAT_SETTINGS_BLACKLISTS.get(str(chat_id))
         if setting:
@@ -187,5 +210,7 @@ def migrate_chat(old_chat_id, new_chat_id):
         SESSION.commit()
 
 
-__load_chat_blacklists()
-__load_chat_settings_blacklists()
+warmup.register(__name__, __load_chat_blacklists,
+                __load_chat_settings_blacklists,
+                locks=(BLACKLIST_FILTER_INSERTION_LOCK,
+                       BLACKLIST_SETTINGS_INSERTION_LOCK))
@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, String, UnicodeText
 
 
@@ -14,10 +17,12 @@ class BlacklistUsers(BASE):
         self.reason = reason
 
 
-BlacklistUsers.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    BlacklistUsers.__table__.create(checkfirst=True)
 
 BLACKLIST_LOCK = threading.RLock()
 BLACKLIST_USERS = set()
+register_cache(__name__, "BLACKLIST_USERS")
 
 
 def blacklist_user(user_id, reason=None):
@@ -54,6 +59,11 @@ def get_reason(user_id):
 
 
 def is_user_blacklisted(user_id):
+    if not warmup.is_ready(__name__):
+        try:
+            return SESSION.query(BlacklistUsers).get(str(user_id)) is not None
+        finally:
+            SESSION.close()
     return user_id in BLACKLIST_USERS
 
 
@@ -67,4 +77,5 @@ def __load_blacklist_userid_list():
         SESSION.close()
 
 
-__load_blacklist_userid_list()
+warmup.register(__name__, __load_blacklist_userid_list,
+                locks=(BLACKLIST_LOCK,))
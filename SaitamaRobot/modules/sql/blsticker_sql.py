@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, Integer, String, UnicodeText, distinct, func
 
 
@@ -38,14 +41,16 @@ class StickerSettings(BASE):
             self.chat_id, self.blacklist_type)
 
 
-StickersFilters.__table__.create(checkfirst=True)
-StickerSettings.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    StickersFilters.__table__.create(checkfirst=True)
+    StickerSettings.__table__.create(checkfirst=True)
 
 STICKERS_FILTER_INSERTION_LOCK = threading.RLock()
 STICKSET_FILTER_INSERTION_LOCK = threading.RLock()
 
 CHAT_STICKERS = {}
 CHAT_BLSTICK_BLACKLISTS = {}
+register_cache(__name__, "CHAT_STICKERS", "CHAT_BLSTICK_BLACKLISTS")
 
 
 def add_to_stickers(chat_id, trigger):
@@ -79,6 +84,15 @@ def rm_from_stickers(chat_id, trigger):
 
 
 def get_chat_stickers(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            return {
+                trigger for (trigger,) in SESSION.query(
+                    StickersFilters.trigger).filter(
+                        StickersFilters.chat_id == str(chat_id))
+            }
+        finally:
+            SESSION.close()
     return CHAT_STICKERS.get(str(chat_id), set())
 
 
@@ -134,6 +148,14 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
 
 
 def get_blacklist_setting(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            setting = SESSION.query(StickerSettings).get(str(chat_id))
+            if setting:
+                return setting.blacklist_type, setting.value
+            return 1, "0"
+        finally:
+            SESSION.close()
     try:
         setting = CHAT_BLSTICK_BLACKLISTS.get(str(chat_id))
         if setting:
@@ -185,5 +207,7 @@ def migrate_chat(old_chat_id, new_chat_id):
         SESSION.commit()
 
 
-__load_CHAT_STICKERS()
-__load_chat_stickerset_blacklists()
+warmup.register(__name__, __load_CHAT_STICKERS,
+                __load_chat_stickerset_blacklists,
+                locks=(STICKERS_FILTER_INSERTION_LOCK,
+                       STICKSET_FILTER_INSERTION_LOCK))
@@ -0,0 +1,103 @@
+import threading
+
+from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
+from sqlalchemy import Boolean, Column, Integer, String, UnicodeText
+
+
+class BroadcastJob(BASE):
+    __tablename__ = "broadcast_jobs"
+    job_id = Column(Integer, primary_key=True)
+    name = Column(UnicodeText, nullable=False)
+    # comma separated recipient sources, sent one after another
+    targets = Column(UnicodeText, nullable=False)
+    fed_id = Column(UnicodeText)
+    text = Column(UnicodeText, nullable=False)
+    parse_mode = Column(UnicodeText)
+    origin_chat = Column(String(14), nullable=False)
+    status_message = Column(Integer)
+    # index into targets and the last recipient id sent to in it
+    phase = Column(Integer, default=0)
+    cursor = Column(UnicodeText)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    pruned = Column(Integer, default=0)
+    finished = Column(Boolean, default=False)
+
+    def __init__(self, name, targets, text, origin_chat, parse_mode=None,
+                 fed_id=None):
+        self.name = name
+        self.targets = ",".join(targets)
+        self.text = text
+        self.origin_chat = str(origin_chat)
+        self.parse_mode = parse_mode
+        self.fed_id = fed_id
+        self.phase = 0
+        self.sent = 0
+        self.failed = 0
+        self.pruned = 0
+        self.finished = False
+
+    def __repr__(self):
+        return "<Broadcast job {} ({}, phase {}, after {})>".format(
+            self.job_id, self.targets, self.phase, self.cursor)
+
+
+with timed(__name__, "tables"):
+    BroadcastJob.__table__.create(checkfirst=True)
+
+INSERTION_LOCK = threading.RLock()
+
+
+def add_job(name, targets, text, origin_chat, parse_mode=None, fed_id=None):
+    with INSERTION_LOCK:
+        job = BroadcastJob(name, targets, text, origin_chat, parse_mode,
+                           fed_id)
+        SESSION.add(job)
+        SESSION.commit()
+        job_id = job.job_id
+        SESSION.close()
+        return job_id
+
+
+def get_job(job_id):
+    try:
+        job = SESSION.query(BroadcastJob).get(job_id)
+        if job:
+            SESSION.expunge(job)
+        return job
+    finally:
+        SESSION.close()
+
+
+def get_unfinished_jobs():
+    try:
+        return [
+            job_id for job_id, in SESSION.query(BroadcastJob.job_id).filter(
+                BroadcastJob.finished == False).order_by(BroadcastJob.job_id)
+        ]
+    finally:
+        SESSION.close()
+
+
+def set_status_message(job_id, message_id):
+    with INSERTION_LOCK:
+        job = SESSION.query(BroadcastJob).get(job_id)
+        if job:
+            job.status_message = message_id
+            SESSION.commit()
+        SESSION.close()
+
+
+def save_progress(job_id, phase, cursor, sent, failed, pruned, finished=False):
+    with INSERTION_LOCK:
+        job = SESSION.query(BroadcastJob).get(job_id)
+        if job:
+            job.phase = phase
+            job.cursor = None if cursor is None else str(cursor)
+            job.sent = sent
+            job.failed = failed
+            job.pruned = pruned
+            job.finished = finished
+            SESSION.commit()
+        SESSION.close()
@@ -0,0 +1,83 @@
+import threading
+from itertools import chain
+
+from SaitamaRobot import CACHE_SNAPSHOT
+from SaitamaRobot.modules.sql import BASE, SESSION
+from sqlalchemy import BigInteger, Column, String, event
+
+
+class CacheMarker(BASE):
+    """
+    One row per snapshotted sql module, bumped in the same transaction as
+    every write to that module's tables.
+    """
+    __tablename__ = "cache_markers"
+    module = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __init__(self, module):
+        self.module = module
+        self.version = 0
+
+
+if CACHE_SNAPSHOT:
+    CacheMarker.__table__.create(checkfirst=True)
+
+INSERTION_LOCK = threading.RLock()
+
+# {table name: module name}, only tables of snapshotted modules
+TRACKED_TABLES = {}
+
+
+def track(module_name: str, tables):
+    with INSERTION_LOCK:
+        for table in tables:
+            TRACKED_TABLES[table] = module_name
+        try:
+            if not SESSION.query(CacheMarker).get(module_name):
+                SESSION.add(CacheMarker(module_name))
+                SESSION.commit()
+        finally:
+            SESSION.close()
+
+
+def get_marker(module_name: str):
+    try:
+        row = SESSION.query(CacheMarker).get(module_name)
+        return row.version if row else None
+    finally:
+        SESSION.close()
+
+
+def __bump(session, modules):
+    if not modules:
+        return
+    marker = CacheMarker.__table__
+    session.execute(marker.update().where(
+        marker.c.module.in_(sorted(modules))).values(version=marker.c.version +
+                                                     1))
+
+
+def __after_flush(session, flush_context):
+    modules = set()
+    # dirty includes objects whose attributes were set to the same values
+    dirty = (obj for obj in session.dirty if session.is_modified(obj))
+    for obj in chain(session.new, dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in TRACKED_TABLES:
+            modules.add(TRACKED_TABLES[table])
+    __bump(session, modules)
+
+
+def __after_bulk(update_context):
+    table = update_context.mapper.local_table.name
+    if table in TRACKED_TABLES:
+        __bump(update_context.session, {TRACKED_TABLES[table]})
+
+
+# every write to a tracked table pays for the bump, only with snapshots on
+if CACHE_SNAPSHOT:
+    event.listen(SESSION, "after_flush", __after_flush)
+    # query().delete() and query().update() skip the flush
+    event.listen(SESSION, "after_bulk_delete", __after_bulk)
+    event.listen(SESSION, "after_bulk_update", __after_bulk)
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import namedtuple
+
+from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.sql.users_sql import Chats
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
+from sqlalchemy import BigInteger, Column, Integer, String, UnicodeText, or_
+
+
+class ChatMetadata(BASE):
+    __tablename__ = "chat_metadata"
+    chat_id = Column(String(14), primary_key=True)
+    title = Column(UnicodeText)
+    chat_type = Column(UnicodeText)
+    username = Column(UnicodeText)
+    member_count = Column(Integer)
+    # the bot's own ChatMember status, None until it was fetched once
+    bot_status = Column(UnicodeText)
+    # when member_count and bot_status were last fetched, 0 if never
+    updated = Column(BigInteger, default=0)
+
+    def __init__(self, chat_id):
+        self.chat_id = str(chat_id)
+        self.updated = 0
+
+    def __repr__(self):
+        return "<Chat metadata {} ({})>".format(self.title, self.chat_id)
+
+
+with timed(__name__, "tables"):
+    ChatMetadata.__table__.create(checkfirst=True)
+
+INSERTION_LOCK = threading.RLock()
+
+# read only snapshot of a row, quacks like telegram.Chat for id and title
+ChatMeta = namedtuple("ChatMeta", [
+    "id", "title", "type", "username", "member_count", "bot_status",
+    "updated"
+])
+
+# {chat_id str: ChatMeta}
+CHAT_META = {}
+register_cache(__name__, "CHAT_META")
+
+
+def __to_meta(row):
+    return ChatMeta(
+        int(row.chat_id), row.title, row.chat_type, row.username,
+        row.member_count, row.bot_status, row.updated or 0)
+
+
+def get_meta(chat_id):
+    if not warmup.is_ready(__name__):
+        return get_metas([chat_id])[str(chat_id)]
+    return CHAT_META.get(str(chat_id))
+
+
+def get_metas(chat_ids):
+    if not warmup.is_ready(__name__):
+        chat_ids = [str(chat_id) for chat_id in chat_ids]
+        try:
+            rows = {
+                row.chat_id: __to_meta(row)
+                for row in SESSION.query(ChatMetadata).filter(
+                    ChatMetadata.chat_id.in_(chat_ids))
+            }
+        finally:
+            SESSION.close()
+        return {chat_id: rows.get(chat_id) for chat_id in chat_ids}
+    return {
+        str(chat_id): CHAT_META.get(str(chat_id)) for chat_id in chat_ids
+    }
+
+
+def set_meta(chat_id, refreshed=False, **fields):
+    """
+    Store chat metadata, skipping the write if nothing changed.
+
+    :param refreshed: the fields come from a full api refresh, bump updated
+    :param fields: any of title, chat_type, username, member_count,
+        bot_status
+    """
+    chat_id = str(chat_id)
+    ready = warmup.is_ready(__name__)
+    # compared against the db while warming up, or every message would write
+    old = CHAT_META.get(chat_id) if ready else get_metas([chat_id])[chat_id]
+    if old and not refreshed:
+        current = {
+            "title": old.title,
+            "chat_type": old.type,
+            "username": old.username,
+            "member_count": old.member_count,
+            "bot_status": old.bot_status,
+        }
+        if all(current[key] == value for key, value in fields.items()):
+            return old
+
+    # the warm-up holds the lock for the whole load, message driven updates
+    # don't queue up behind it, the next message records them
+    if not INSERTION_LOCK.acquire(blocking=ready or refreshed):
+        return old
+    try:
+        row = SESSION.query(ChatMetadata).get(chat_id)
+        if not row:
+            row = ChatMetadata(chat_id)
+            SESSION.add(row)
+        for key, value in fields.items():
+            setattr(row, key, value)
+        if refreshed:
+            row.updated = int(time.time())
+        SESSION.commit()
+        meta = CHAT_META[chat_id] = __to_meta(row)
+        SESSION.close()
+        return meta
+    finally:
+        INSERTION_LOCK.release()
+
+
+def get_stale_chat_ids(max_age, limit=100):
+    # known chats whose counts are missing or older than max_age seconds
+    cutoff = int(time.time() - max_age)
+    try:
+        return [
+            chat_id for chat_id, in SESSION.query(Chats.chat_id).outerjoin(
+                ChatMetadata, ChatMetadata.chat_id == Chats.chat_id).filter(
+                    or_(ChatMetadata.updated == None,
+                        ChatMetadata.updated < cutoff)).limit(limit)
+        ]
+    finally:
+        SESSION.close()
+
+
+def rem_meta(chat_id):
+    with INSERTION_LOCK:
+        CHAT_META.pop(str(chat_id), None)
+        SESSION.query(ChatMetadata).filter(
+            ChatMetadata.chat_id == str(chat_id)).delete(
+                synchronize_session=False)
+        SESSION.commit()
+
+
+def migrate_chat(old_chat_id, new_chat_id):
+    with INSERTION_LOCK:
+        row = SESSION.query(ChatMetadata).get(str(old_chat_id))
+        if row:
+            row.chat_id = str(new_chat_id)
+            CHAT_META.pop(str(old_chat_id), None)
+            SESSION.commit()
+            CHAT_META[str(new_chat_id)] = __to_meta(row)
+        SESSION.close()
+
+
+def __load_chat_meta():
+    global CHAT_META
+    try:
+        CHAT_META = {
+            row.chat_id: __to_meta(row)
+            for row in SESSION.query(ChatMetadata).all()
+        }
+    finally:
+        SESSION.close()
+
+
+warmup.register(__name__, __load_chat_meta, locks=(INSERTION_LOCK,))
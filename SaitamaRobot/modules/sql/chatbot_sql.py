@@ -1,6 +1,7 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, String
 
 
@@ -16,7 +17,8 @@ class ChatbotChats(BASE):
         self.expires = expires
 
 
-ChatbotChats.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    ChatbotChats.__table__.create(checkfirst=True)
 
 INSERTION_LOCK = threading.RLock()
 
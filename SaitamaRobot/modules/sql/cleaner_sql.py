@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Boolean, Column, UnicodeText
 
 
@@ -35,9 +38,10 @@ class CleanerBlueTextGlobal(BASE):
         self.command = command
 
 
-CleanerBlueTextChatSettings.__table__.create(checkfirst=True)
-CleanerBlueTextChat.__table__.create(checkfirst=True)
-CleanerBlueTextGlobal.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    CleanerBlueTextChatSettings.__table__.create(checkfirst=True)
+    CleanerBlueTextChat.__table__.create(checkfirst=True)
+    CleanerBlueTextGlobal.__table__.create(checkfirst=True)
 
 CLEANER_CHAT_SETTINGS = threading.RLock()
 CLEANER_CHAT_LOCK = threading.RLock()
@@ -45,6 +49,7 @@ CLEANER_GLOBAL_LOCK = threading.RLock()
 
 CLEANER_CHATS = {}
 GLOBAL_IGNORE_COMMANDS = set()
+register_cache(__name__, "CLEANER_CHATS", "GLOBAL_IGNORE_COMMANDS")
 
 
 def set_cleanbt(chat_id, is_enable):
@@ -153,6 +158,16 @@ def global_unignore_command(command):
 
 
 def is_command_ignored(chat_id, command):
+    if not warmup.is_ready(__name__):
+        command = command.lower()
+        try:
+            return bool(
+                SESSION.query(CleanerBlueTextGlobal).get(command) or
+                SESSION.query(CleanerBlueTextChat).get((str(chat_id),
+                                                        command)))
+        finally:
+            SESSION.close()
+
     if command.lower() in GLOBAL_IGNORE_COMMANDS:
         return True
 
@@ -164,6 +179,14 @@ def is_command_ignored(chat_id, command):
 
 
 def is_enabled(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            setting = SESSION.query(CleanerBlueTextChatSettings).get(
+                str(chat_id))
+            return setting.is_enable if setting else False
+        finally:
+            SESSION.close()
+
     if str(chat_id) in CLEANER_CHATS:
         settings = CLEANER_CHATS.get(str(chat_id)).get('setting')
         return settings
@@ -172,6 +195,7 @@ def is_enabled(chat_id):
 
 
 def get_all_ignored(chat_id):
+    warmup.wait(__name__)
     if str(chat_id) in CLEANER_CHATS:
         LOCAL_IGNORE_COMMANDS = CLEANER_CHATS.get(str(chat_id)).get("commands")
     else:
@@ -212,4 +236,6 @@ def __load_cleaner_list():
         SESSION.close()
 
 
-__load_cleaner_list()
+warmup.register(__name__, __load_cleaner_list,
+                locks=(CLEANER_CHAT_SETTINGS, CLEANER_CHAT_LOCK,
+                       CLEANER_GLOBAL_LOCK))
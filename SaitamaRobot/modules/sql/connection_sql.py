@@ -5,6 +5,9 @@ from typing import Union
 from sqlalchemy import Column, String, Boolean, UnicodeText, Integer
 
 from SaitamaRobot.modules.sql import SESSION, BASE
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 
 
 class ChatAccessConnectionSettings(BASE):
@@ -49,15 +52,17 @@ class ConnectionHistory(BASE):
                                                         self.chat_id)
 
 
-ChatAccessConnectionSettings.__table__.create(checkfirst=True)
-Connection.__table__.create(checkfirst=True)
-ConnectionHistory.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    ChatAccessConnectionSettings.__table__.create(checkfirst=True)
+    Connection.__table__.create(checkfirst=True)
+    ConnectionHistory.__table__.create(checkfirst=True)
 
 CHAT_ACCESS_LOCK = threading.RLock()
 CONNECTION_INSERTION_LOCK = threading.RLock()
 CONNECTION_HISTORY_LOCK = threading.RLock()
 
 HISTORY_CONNECT = {}
+register_cache(__name__, "HISTORY_CONNECT")
 
 
 def allow_connect_to_chat(chat_id: Union[str, int]) -> bool:
@@ -166,6 +171,7 @@ def add_history_conn(user_id, chat_id, chat_name):
 
 
 def get_history_conn(user_id):
+    warmup.wait(__name__)
     if not HISTORY_CONNECT.get(int(user_id)):
         HISTORY_CONNECT[int(user_id)] = {}
     return HISTORY_CONNECT[int(user_id)]
@@ -202,4 +208,5 @@ def __load_user_history():
         SESSION.close()
 
 
-__load_user_history()
+warmup.register(__name__, __load_user_history,
+                locks=(CONNECTION_HISTORY_LOCK,))
@@ -4,6 +4,9 @@ from sqlalchemy import Column, String, UnicodeText, Boolean, Integer, distinct,
 
 from SaitamaRobot.modules.helper_funcs.msg_types import Types
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 
 
 class CustomFilters(BASE):
@@ -112,12 +115,14 @@ class Buttons(BASE):
         self.same_line = same_line
 
 
-CustomFilters.__table__.create(checkfirst=True)
-Buttons.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    CustomFilters.__table__.create(checkfirst=True)
+    Buttons.__table__.create(checkfirst=True)
 
 CUST_FILT_LOCK = threading.RLock()
 BUTTON_LOCK = threading.RLock()
 CHAT_FILTERS = {}
+register_cache(__name__, "CHAT_FILTERS")
 
 
 def get_all_filters():
@@ -254,6 +259,16 @@ def remove_filter(chat_id, keyword):
 
 
 def get_chat_triggers(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            keywords = {
+                keyword for (keyword,) in SESSION.query(
+                    CustomFilters.keyword).filter(
+                        CustomFilters.chat_id == str(chat_id))
+            }
+        finally:
+            SESSION.close()
+        return sorted(keywords, key=lambda i: (-len(i), i))
     return CHAT_FILTERS.get(str(chat_id), set())
 
 
@@ -382,4 +397,5 @@ def migrate_chat(old_chat_id, new_chat_id):
             SESSION.commit()
 
 
-__load_chat_filters()
+warmup.register(__name__, __load_chat_filters,
+                locks=(CUST_FILT_LOCK, BUTTON_LOCK))
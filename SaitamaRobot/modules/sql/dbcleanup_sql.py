@@ -0,0 +1,86 @@
+import threading
+
+from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
+from sqlalchemy import Boolean, Column, Integer, UnicodeText
+
+
+class CleanupCheckpoint(BASE):
+    __tablename__ = "dbcleanup_checkpoints"
+    kind = Column(UnicodeText, primary_key=True)
+    cursor = Column(UnicodeText)
+    checked = Column(Integer, default=0)
+    finished = Column(Boolean, default=False)
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.checked = 0
+        self.finished = False
+
+    def __repr__(self):
+        return "<DB cleanup of {} after {}>".format(self.kind, self.cursor)
+
+
+class CleanupCandidate(BASE):
+    __tablename__ = "dbcleanup_candidates"
+    kind = Column(UnicodeText, primary_key=True)
+    item_id = Column(UnicodeText, primary_key=True)
+
+    def __init__(self, kind, item_id):
+        self.kind = kind
+        self.item_id = str(item_id)
+
+    def __repr__(self):
+        return "<Invalid {} {}>".format(self.kind, self.item_id)
+
+
+with timed(__name__, "tables"):
+    CleanupCheckpoint.__table__.create(checkfirst=True)
+    CleanupCandidate.__table__.create(checkfirst=True)
+
+INSERTION_LOCK = threading.RLock()
+
+
+def get_checkpoint(kind):
+    """:return: (cursor, checked, finished), or None if no scan was started"""
+    try:
+        checkpoint = SESSION.query(CleanupCheckpoint).get(kind)
+        if not checkpoint:
+            return None
+        return checkpoint.cursor, checkpoint.checked, checkpoint.finished
+    finally:
+        SESSION.close()
+
+
+def save_checkpoint(kind, cursor, checked, invalid_ids=(), finished=False):
+    # the page's invalid ids and the cursor past them commit together
+    with INSERTION_LOCK:
+        checkpoint = SESSION.query(CleanupCheckpoint).get(kind)
+        if not checkpoint:
+            checkpoint = CleanupCheckpoint(kind)
+            SESSION.add(checkpoint)
+        checkpoint.cursor = None if cursor is None else str(cursor)
+        checkpoint.checked = checked
+        checkpoint.finished = finished
+        for item_id in invalid_ids:
+            SESSION.merge(CleanupCandidate(kind, item_id))
+        SESSION.commit()
+
+
+def get_candidates(kind):
+    try:
+        return [
+            item_id for item_id, in SESSION.query(
+                CleanupCandidate.item_id).filter(CleanupCandidate.kind == kind)
+        ]
+    finally:
+        SESSION.close()
+
+
+def reset(kind):
+    with INSERTION_LOCK:
+        SESSION.query(CleanupCandidate).filter(
+            CleanupCandidate.kind == kind).delete(synchronize_session=False)
+        SESSION.query(CleanupCheckpoint).filter(
+            CleanupCheckpoint.kind == kind).delete(synchronize_session=False)
+        SESSION.commit()
@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, String, UnicodeText, distinct, func
 
 
@@ -17,10 +20,12 @@ class Disable(BASE):
         return "Disabled cmd {} in {}".format(self.command, self.chat_id)
 
 
-Disable.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Disable.__table__.create(checkfirst=True)
 DISABLE_INSERTION_LOCK = threading.RLock()
 
 DISABLED = {}
+register_cache(__name__, "DISABLED")
 
 
 def disable_command(chat_id, disable):
@@ -44,7 +49,7 @@ def enable_command(chat_id, enable):
         disabled = SESSION.query(Disable).get((str(chat_id), enable))
 
         if disabled:
-            if enable in DISABLED.get(str(chat_id)):  # sanity check
+            if enable in DISABLED.get(str(chat_id), set()):  # sanity check
                 DISABLED.setdefault(str(chat_id), set()).remove(enable)
 
             SESSION.delete(disabled)
@@ -56,10 +61,24 @@ def enable_command(chat_id, enable):
 
 
 def is_command_disabled(chat_id, cmd):
+    if not warmup.is_ready(__name__):
+        try:
+            return SESSION.query(Disable).get(
+                (str(chat_id), str(cmd).lower())) is not None
+        finally:
+            SESSION.close()
     return str(cmd).lower() in DISABLED.get(str(chat_id), set())
 
 
 def get_all_disabled(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            return {
+                command for (command,) in SESSION.query(Disable.command).filter(
+                    Disable.chat_id == str(chat_id))
+            }
+        finally:
+            SESSION.close()
     return DISABLED.get(str(chat_id), set())
 
 
@@ -102,4 +121,5 @@ def __load_disabled_commands():
         SESSION.close()
 
 
-__load_disabled_commands()
+warmup.register(__name__, __load_disabled_commands,
+                locks=(DISABLE_INSERTION_LOCK,))
@@ -2,6 +2,9 @@ import threading
 
 from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Boolean, Column, Integer, String, UnicodeText
 from telegram.error import BadRequest, Unauthorized
 
@@ -89,11 +92,12 @@ class FedSubs(BASE):
 # BansF.__table__.drop()
 # FedSubs.__table__.drop()
 
-Federations.__table__.create(checkfirst=True)
-ChatF.__table__.create(checkfirst=True)
-BansF.__table__.create(checkfirst=True)
-FedsUserSettings.__table__.create(checkfirst=True)
-FedSubs.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Federations.__table__.create(checkfirst=True)
+    ChatF.__table__.create(checkfirst=True)
+    BansF.__table__.create(checkfirst=True)
+    FedsUserSettings.__table__.create(checkfirst=True)
+    FedSubs.__table__.create(checkfirst=True)
 
 FEDS_LOCK = threading.RLock()
 CHAT_FEDS_LOCK = threading.RLock()
@@ -113,9 +117,14 @@ FEDERATION_BANNED_USERID = {}
 FEDERATION_NOTIFICATION = {}
 FEDS_SUBSCRIBER = {}
 MYFEDS_SUBSCRIBER = {}
+register_cache(__name__, "FEDERATION_BYNAME", "FEDERATION_BYOWNER",
+               "FEDERATION_BYFEDID", "FEDERATION_CHATS", "FEDERATION_CHATS_BYID",
+               "FEDERATION_BANNED_FULL", "FEDERATION_BANNED_USERID",
+               "FEDERATION_NOTIFICATION", "FEDS_SUBSCRIBER", "MYFEDS_SUBSCRIBER")
 
 
 def get_fed_info(fed_id):
+    warmup.wait(__name__)
     get = FEDERATION_BYFEDID.get(str(fed_id))
     if get is None:
         return False
@@ -123,6 +132,12 @@ def get_fed_info(fed_id):
 
 
 def get_fed_id(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            chat = SESSION.query(ChatF).get(str(chat_id))
+            return chat.fed_id if chat else False
+        finally:
+            SESSION.close()
     get = FEDERATION_CHATS.get(str(chat_id))
     if get is None:
         return False
@@ -131,6 +146,7 @@ def get_fed_id(chat_id):
 
 
 def get_fed_name(chat_id):
+    warmup.wait(__name__)
     get = FEDERATION_CHATS.get(str(chat_id))
     if get is None:
         return False
@@ -139,6 +155,7 @@ def get_fed_name(chat_id):
 
 
 def get_user_fban(fed_id, user_id):
+    warmup.wait(__name__)
     if not FEDERATION_BANNED_FULL.get(fed_id):
         return False, False, False
     user_info = FEDERATION_BANNED_FULL[fed_id].get(user_id)
@@ -148,6 +165,7 @@ def get_user_fban(fed_id, user_id):
 
 
 def get_user_admin_fed_name(user_id):
+    warmup.wait(__name__)
     user_feds = []
     for f in FEDERATION_BYFEDID:
         if int(user_id) in eval(
@@ -157,6 +175,7 @@ def get_user_admin_fed_name(user_id):
 
 
 def get_user_owner_fed_name(user_id):
+    warmup.wait(__name__)
     user_feds = []
     for f in FEDERATION_BYFEDID:
         if int(user_id) == int(eval(FEDERATION_BYFEDID[f]['fusers'])['owner']):
@@ -165,6 +184,7 @@ def get_user_owner_fed_name(user_id):
 
 
 def get_user_admin_fed_full(user_id):
+    warmup.wait(__name__)
     user_feds = []
     for f in FEDERATION_BYFEDID:
         if int(user_id) in eval(
@@ -174,6 +194,7 @@ def get_user_admin_fed_full(user_id):
 
 
 def get_user_owner_fed_full(user_id):
+    warmup.wait(__name__)
     user_feds = []
     for f in FEDERATION_BYFEDID:
         if int(user_id) == int(eval(FEDERATION_BYFEDID[f]['fusers'])['owner']):
@@ -182,6 +203,7 @@ def get_user_owner_fed_full(user_id):
 
 
 def get_user_fbanlist(user_id):
+    warmup.wait(__name__)
     banlist = FEDERATION_BANNED_FULL
     user_name = ""
     fedname = []
@@ -327,6 +349,7 @@ def chat_join_fed(fed_id, chat_name, chat_id):
 
 
 def search_fed_by_name(fed_name):
+    warmup.wait(__name__)
     allfed = FEDERATION_BYNAME.get(fed_name)
     if allfed is None:
         return False
@@ -334,6 +357,7 @@ def search_fed_by_name(fed_name):
 
 
 def search_user_in_fed(fed_id, user_id):
+    warmup.wait(__name__)
     getfed = FEDERATION_BYFEDID.get(fed_id)
     if getfed is None:
         return False
@@ -455,6 +479,7 @@ def chat_leave_fed(chat_id):
 
 
 def all_fed_chats(fed_id):
+    warmup.wait(__name__)
     with FEDS_LOCK:
         getfed = FEDERATION_CHATS_BYID.get(fed_id)
         if getfed is None:
@@ -464,6 +489,7 @@ def all_fed_chats(fed_id):
 
 
 def all_fed_users(fed_id):
+    warmup.wait(__name__)
     with FEDS_LOCK:
         getfed = FEDERATION_BYFEDID.get(str(fed_id))
         if getfed is None:
@@ -475,6 +501,7 @@ def all_fed_users(fed_id):
 
 
 def all_fed_members(fed_id):
+    warmup.wait(__name__)
     with FEDS_LOCK:
         getfed = FEDERATION_BYFEDID.get(str(fed_id))
         fed_admins = eval(eval(getfed['fusers'])['members'])
@@ -505,6 +532,7 @@ def set_frules(fed_id, rules):
 
 
 def get_frules(fed_id):
+    warmup.wait(__name__)
     with FEDS_LOCK:
         rules = FEDERATION_BYFEDID[str(fed_id)]['frules']
         return rules
@@ -536,7 +564,7 @@ def fban_user(fed_id, user_id, first_name, last_name, user_name, reason, time):
 
 def multi_fban_user(multi_fed_id, multi_user_id, multi_first_name,
                     multi_last_name, multi_user_name, multi_reason):
-    if True:  # with FEDS_LOCK:
+    with FEDS_LOCK:
         counter = 0
         time = 0
         for x in range(len(multi_fed_id)):
@@ -594,6 +622,14 @@ def un_fban_user(fed_id, user_id):
 
 
 def get_fban_user(fed_id, user_id):
+    if not warmup.is_ready(__name__):
+        try:
+            ban = SESSION.query(BansF).get((fed_id, str(user_id)))
+            if ban:
+                return True, ban.reason, ban.time
+            return False, None, None
+        finally:
+            SESSION.close()
     list_fbanned = FEDERATION_BANNED_USERID.get(fed_id)
     if list_fbanned is None:
         FEDERATION_BANNED_USERID[fed_id] = []
@@ -611,6 +647,7 @@ def get_fban_user(fed_id, user_id):
 
 
 def get_all_fban_users(fed_id):
+    warmup.wait(__name__)
     list_fbanned = FEDERATION_BANNED_USERID.get(fed_id)
     if list_fbanned is None:
         FEDERATION_BANNED_USERID[fed_id] = []
@@ -618,6 +655,7 @@ def get_all_fban_users(fed_id):
 
 
 def get_all_fban_users_target(fed_id, user_id):
+    warmup.wait(__name__)
     list_fbanned = FEDERATION_BANNED_FULL.get(fed_id)
     if list_fbanned is None:
         FEDERATION_BANNED_FULL[fed_id] = []
@@ -627,6 +665,7 @@ def get_all_fban_users_target(fed_id, user_id):
 
 
 def get_all_fban_users_global():
+    warmup.wait(__name__)
     list_fbanned = FEDERATION_BANNED_USERID
     total = []
     for x in list(FEDERATION_BANNED_USERID):
@@ -636,6 +675,7 @@ def get_all_fban_users_global():
 
 
 def get_all_feds_users_global():
+    warmup.wait(__name__)
     list_fed = FEDERATION_BYFEDID
     total = []
     for x in list(FEDERATION_BYFEDID):
@@ -644,6 +684,7 @@ def get_all_feds_users_global():
 
 
 def search_fed_by_id(fed_id):
+    warmup.wait(__name__)
     get = FEDERATION_BYFEDID.get(fed_id)
     if get is None:
         return False
@@ -658,6 +699,7 @@ def search_fed_by_id(fed_id):
 
 
 def user_feds_report(user_id: int) -> bool:
+    warmup.wait(__name__)
     user_setting = FEDERATION_NOTIFICATION.get(str(user_id))
     if user_setting is None:
         user_setting = True
@@ -678,6 +720,7 @@ def set_feds_setting(user_id: int, setting: bool):
 
 
 def get_fed_log(fed_id):
+    warmup.wait(__name__)
     fed_setting = FEDERATION_BYFEDID.get(str(fed_id))
     if fed_setting is None:
         fed_setting = False
@@ -755,10 +798,12 @@ def unsubs_fed(fed_id, my_fed):
 
 
 def get_all_subs(fed_id):
+    warmup.wait(__name__)
     return FEDS_SUBSCRIBER.get(fed_id, set())
 
 
 def get_spec_subs(fed_id, fed_target):
+    warmup.wait(__name__)
     if FEDS_SUBSCRIBER.get(fed_id, set()) == set():
         return {}
     else:
@@ -766,10 +811,12 @@ def get_spec_subs(fed_id, fed_target):
 
 
 def get_mysubs(my_fed):
+    warmup.wait(__name__)
     return list(MYFEDS_SUBSCRIBER.get(my_fed))
 
 
 def get_subscriber(fed_id):
+    warmup.wait(__name__)
     return FEDS_SUBSCRIBER.get(fed_id, set())
 
 
@@ -902,8 +949,8 @@ def __load_feds_subscriber():
         SESSION.close()
 
 
-__load_all_feds()
-__load_all_feds_chats()
-__load_all_feds_banned()
-__load_all_feds_settings()
-__load_feds_subscriber()
+warmup.register(__name__, __load_all_feds, __load_all_feds_chats,
+                __load_all_feds_banned, __load_all_feds_settings,
+                __load_feds_subscriber,
+                locks=(FEDS_LOCK, CHAT_FEDS_LOCK, FEDS_SETTINGS_LOCK,
+                       FEDS_SUBSCRIBER_LOCK))
@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Boolean, Column, Integer, String, UnicodeText
 
 
@@ -39,13 +42,15 @@ class GbanSettings(BASE):
         return "<Gban setting {} ({})>".format(self.chat_id, self.setting)
 
 
-GloballyBannedUsers.__table__.create(checkfirst=True)
-GbanSettings.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    GloballyBannedUsers.__table__.create(checkfirst=True)
+    GbanSettings.__table__.create(checkfirst=True)
 
 GBANNED_USERS_LOCK = threading.RLock()
 GBAN_SETTING_LOCK = threading.RLock()
 GBANNED_LIST = set()
 GBANSTAT_LIST = set()
+register_cache(__name__, "GBANNED_LIST", "GBANSTAT_LIST")
 
 
 def gban_user(user_id, name, reason=None):
@@ -86,7 +91,26 @@ def ungban_user(user_id):
         __load_gbanned_userid_list()
 
 
+def ungban_users(user_ids):
+    # one DELETE for the whole batch
+    user_ids = [int(user_id) for user_id in user_ids]
+    if not user_ids:
+        return 0
+    with GBANNED_USERS_LOCK:
+        removed = SESSION.query(GloballyBannedUsers).filter(
+            GloballyBannedUsers.user_id.in_(user_ids)).delete(
+                synchronize_session=False)
+        SESSION.commit()
+        GBANNED_LIST.difference_update(user_ids)
+        return removed
+
+
 def is_user_gbanned(user_id):
+    if not warmup.is_ready(__name__):
+        try:
+            return SESSION.query(GloballyBannedUsers).get(user_id) is not None
+        finally:
+            SESSION.close()
     return user_id in GBANNED_LIST
 
 
@@ -104,6 +128,19 @@ def get_gban_list():
         SESSION.close()
 
 
+def get_gbanned_ids_page(after=None, limit=500):
+    try:
+        query = SESSION.query(GloballyBannedUsers.user_id)
+        if after is not None:
+            query = query.filter(GloballyBannedUsers.user_id > int(after))
+        return [
+            user_id for user_id, in query.order_by(
+                GloballyBannedUsers.user_id).limit(limit)
+        ]
+    finally:
+        SESSION.close()
+
+
 def enable_gbans(chat_id):
     with GBAN_SETTING_LOCK:
         chat = SESSION.query(GbanSettings).get(str(chat_id))
@@ -130,10 +167,21 @@ def disable_gbans(chat_id):
 
 
 def does_chat_gban(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            chat = SESSION.query(GbanSettings).get(str(chat_id))
+            return chat is None or chat.setting
+        finally:
+            SESSION.close()
     return str(chat_id) not in GBANSTAT_LIST
 
 
 def num_gbanned_users():
+    if not warmup.is_ready(__name__):
+        try:
+            return SESSION.query(GloballyBannedUsers).count()
+        finally:
+            SESSION.close()
     return len(GBANNED_LIST)
 
 
@@ -170,5 +218,5 @@ def migrate_chat(old_chat_id, new_chat_id):
 
 
 # Create in memory userid to avoid disk access
-__load_gbanned_userid_list()
-__load_gban_stat_list()
+warmup.register(__name__, __load_gbanned_userid_list, __load_gban_stat_list,
+                locks=(GBANNED_USERS_LOCK, GBAN_SETTING_LOCK))
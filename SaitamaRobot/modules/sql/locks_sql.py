@@ -4,6 +4,7 @@ import threading
 from sqlalchemy import Column, String, Boolean
 
 from SaitamaRobot.modules.sql import SESSION, BASE
+from SaitamaRobot.modules.helper_funcs.startup import timed
 
 
 class Permissions(BASE):
@@ -75,9 +76,11 @@ class Restrictions(BASE):
 # For those who faced database error, Just uncomment the
 # line below and run bot for 1 time & remove that line!
 
-Permissions.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Permissions.__table__.create(checkfirst=True)
 # Permissions.__table__.drop()
-Restrictions.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Restrictions.__table__.create(checkfirst=True)
 
 PERM_LOCK = threading.RLock()
 RESTR_LOCK = threading.RLock()
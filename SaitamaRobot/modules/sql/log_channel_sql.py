@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, String, distinct, func
 
 
@@ -14,11 +17,13 @@ class GroupLogs(BASE):
         self.log_channel = str(log_channel)
 
 
-GroupLogs.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    GroupLogs.__table__.create(checkfirst=True)
 
 LOGS_INSERTION_LOCK = threading.RLock()
 
 CHANNELS = {}
+register_cache(__name__, "CHANNELS")
 
 
 def set_chat_log_channel(chat_id, log_channel):
@@ -35,6 +40,12 @@ def set_chat_log_channel(chat_id, log_channel):
 
 
 def get_chat_log_channel(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            chat = SESSION.query(GroupLogs).get(str(chat_id))
+            return chat.log_channel if chat else None
+        finally:
+            SESSION.close()
     return CHANNELS.get(str(chat_id))
 
 
@@ -79,4 +90,4 @@ def __load_log_channels():
         SESSION.close()
 
 
-__load_log_channels()
+warmup.register(__name__, __load_log_channels, locks=(LOGS_INSERTION_LOCK,))
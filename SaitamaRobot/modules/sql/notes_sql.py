@@ -3,6 +3,7 @@ import threading
 
 from SaitamaRobot.modules.helper_funcs.msg_types import Types
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import (Boolean, Column, Integer, String, UnicodeText, distinct,
                         func)
 
@@ -45,8 +46,9 @@ class Buttons(BASE):
         self.same_line = same_line
 
 
-Notes.__table__.create(checkfirst=True)
-Buttons.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Notes.__table__.create(checkfirst=True)
+    Buttons.__table__.create(checkfirst=True)
 
 NOTES_INSERTION_LOCK = threading.RLock()
 BUTTONS_INSERTION_LOCK = threading.RLock()
@@ -1,7 +1,8 @@
 import threading
-from typing import Union
+from typing import List, Set, Union
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Boolean, Column, Integer, String
 
 
@@ -29,8 +30,9 @@ class ReportingChatSettings(BASE):
         return "<Chat report settings ({})>".format(self.chat_id)
 
 
-ReportingUserSettings.__table__.create(checkfirst=True)
-ReportingChatSettings.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    ReportingUserSettings.__table__.create(checkfirst=True)
+    ReportingChatSettings.__table__.create(checkfirst=True)
 
 CHAT_LOCK = threading.RLock()
 USER_LOCK = threading.RLock()
@@ -56,6 +58,25 @@ def user_should_report(user_id: int) -> bool:
         SESSION.close()
 
 
+def users_should_report(user_ids: List[int]) -> Set[int]:
+    # batched user_should_report, one query for a whole admin list
+    if not user_ids:
+        return set()
+    try:
+        settings = {
+            user_id: should_report
+            for user_id, should_report in SESSION.query(
+                ReportingUserSettings.user_id,
+                ReportingUserSettings.should_report).filter(
+                    ReportingUserSettings.user_id.in_(user_ids))
+        }
+        return {
+            user_id for user_id in user_ids if settings.get(user_id, True)
+        }
+    finally:
+        SESSION.close()
+
+
 def set_chat_setting(chat_id: Union[int, str], setting: bool):
     with CHAT_LOCK:
         chat_setting = SESSION.query(ReportingChatSettings).get(str(chat_id))
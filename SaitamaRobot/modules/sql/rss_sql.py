@@ -1,6 +1,7 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, Integer, UnicodeText
 
 
@@ -21,7 +22,8 @@ class RSS(BASE):
             self.chat_id, self.feed_link, self.old_entry_link)
 
 
-RSS.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    RSS.__table__.create(checkfirst=True)
 INSERTION_LOCK = threading.RLock()
 
 
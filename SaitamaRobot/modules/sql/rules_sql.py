@@ -1,6 +1,7 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, String, UnicodeText, distinct, func
 
 
@@ -16,7 +17,8 @@ class Rules(BASE):
         return "<Chat {} rules: {}>".format(self.chat_id, self.rules)
 
 
-Rules.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Rules.__table__.create(checkfirst=True)
 
 INSERTION_LOCK = threading.RLock()
 
@@ -1,6 +1,7 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import Column, Integer, UnicodeText
 
 
@@ -30,8 +31,9 @@ class UserBio(BASE):
         return "<User info %d>" % self.user_id
 
 
-UserInfo.__table__.create(checkfirst=True)
-UserBio.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    UserInfo.__table__.create(checkfirst=True)
+    UserBio.__table__.create(checkfirst=True)
 
 INSERTION_LOCK = threading.RLock()
 
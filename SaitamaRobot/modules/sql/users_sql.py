@@ -1,9 +1,13 @@
 import threading
 
+from cachetools import LRUCache
 from SaitamaRobot import dispatcher
+from SaitamaRobot.modules.helper_funcs import metrics
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import (Column, ForeignKey, Integer, String, UnicodeText,
-                        UniqueConstraint, func)
+                        UniqueConstraint, func, text)
 
 
 class Users(BASE):
@@ -57,11 +61,41 @@ class ChatMembers(BASE):
             self.chat.chat_id)
 
 
-Users.__table__.create(checkfirst=True)
-Chats.__table__.create(checkfirst=True)
-ChatMembers.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Users.__table__.create(checkfirst=True)
+    Chats.__table__.create(checkfirst=True)
+    ChatMembers.__table__.create(checkfirst=True)
+
+
+def __migrate_username_index():
+    # username lookups are case insensitive, so index lower(username).
+    # IF NOT EXISTS keeps this safe to run on every boot.
+    SESSION.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_users_username_lower "
+             "ON users (lower(username))"))
+    SESSION.commit()
+
+
+with timed(__name__, "tables"):
+    __migrate_username_index()
 
 INSERTION_LOCK = threading.RLock()
+CACHE_LOCK = threading.RLock()
+
+# {lowercase username: tuple of user ids}, empty tuples cache misses too
+USERNAME_CACHE = LRUCache(maxsize=2048)
+register_cache(__name__, "USERNAME_CACHE")
+# bumped on every invalidation, so a lookup racing a rename is not cached
+USERNAME_CACHE_GEN = 0
+
+
+def __invalidate_username(username):
+    global USERNAME_CACHE_GEN
+    if not username:
+        return
+    with CACHE_LOCK:
+        USERNAME_CACHE.pop(username.lower(), None)
+        USERNAME_CACHE_GEN += 1
 
 
 def ensure_bot_in_db():
@@ -78,11 +112,17 @@ def update_user(user_id, username, chat_id=None, chat_name=None):
             user = Users(user_id, username)
             SESSION.add(user)
             SESSION.flush()
+            stale_names = (username,)
         else:
+            stale_names = ()
+            if user.username != username:
+                stale_names = (user.username, username)
             user.username = username
 
         if not chat_id or not chat_name:
             SESSION.commit()
+            for name in stale_names:
+                __invalidate_username(name)
             return
 
         chat = SESSION.query(Chats).get(str(chat_id))
@@ -102,15 +142,33 @@ def update_user(user_id, username, chat_id=None, chat_name=None):
             SESSION.add(chat_member)
 
         SESSION.commit()
+        # only after commit, so a concurrent lookup can't re-cache old rows
+        for name in stale_names:
+            __invalidate_username(name)
 
 
 def get_userid_by_name(username):
+    username = username.lower()
+    with CACHE_LOCK:
+        user_ids = USERNAME_CACHE.get(username)
+        generation = USERNAME_CACHE_GEN
+    if user_ids is not None:
+        metrics.cache_hit("username")
+        return list(user_ids)
+
+    metrics.cache_miss("username")
     try:
-        return SESSION.query(Users).filter(
-            func.lower(Users.username) == username.lower()).all()
+        user_ids = tuple(
+            user_id for user_id, in SESSION.query(Users.user_id).filter(
+                func.lower(Users.username) == username))
     finally:
         SESSION.close()
 
+    with CACHE_LOCK:
+        if generation == USERNAME_CACHE_GEN:
+            USERNAME_CACHE[username] = user_ids
+    return list(user_ids)
+
 
 def get_name_by_userid(user_id):
     try:
@@ -141,6 +199,33 @@ def get_all_users():
         SESSION.close()
 
 
+def get_chat_ids_page(after=None, limit=500):
+    # keyset pagination, so a long broadcast never holds a big result set
+    try:
+        query = SESSION.query(Chats.chat_id)
+        if after is not None:
+            query = query.filter(Chats.chat_id > str(after))
+        return [
+            chat_id
+            for chat_id, in query.order_by(Chats.chat_id).limit(limit)
+        ]
+    finally:
+        SESSION.close()
+
+
+def get_user_ids_page(after=None, limit=500):
+    try:
+        query = SESSION.query(Users.user_id)
+        if after is not None:
+            query = query.filter(Users.user_id > int(after))
+        return [
+            user_id
+            for user_id, in query.order_by(Users.user_id).limit(limit)
+        ]
+    finally:
+        SESSION.close()
+
+
 def get_user_num_chats(user_id):
     try:
         return SESSION.query(ChatMembers).filter(
@@ -158,6 +243,15 @@ def get_user_com_chats(user_id):
         SESSION.close()
 
 
+def get_user_com_chat_names(user_id):
+    try:
+        return SESSION.query(Chats.chat_id, Chats.chat_name).join(
+            ChatMembers, ChatMembers.chat == Chats.chat_id).filter(
+                ChatMembers.user == int(user_id)).all()
+    finally:
+        SESSION.close()
+
+
 def num_chats():
     try:
         return SESSION.query(Chats).count()
@@ -193,8 +287,10 @@ def del_user(user_id):
     with INSERTION_LOCK:
         curr = SESSION.query(Users).get(user_id)
         if curr:
+            username = curr.username
             SESSION.delete(curr)
             SESSION.commit()
+            __invalidate_username(username)
             return True
 
         ChatMembers.query.filter(ChatMembers.user == user_id).delete()
@@ -211,3 +307,17 @@ def rem_chat(chat_id):
             SESSION.commit()
         else:
             SESSION.close()
+
+
+def rem_chats(chat_ids):
+    # one DELETE per table for the whole batch
+    chat_ids = [str(chat_id) for chat_id in chat_ids]
+    if not chat_ids:
+        return 0
+    with INSERTION_LOCK:
+        SESSION.query(ChatMembers).filter(
+            ChatMembers.chat.in_(chat_ids)).delete(synchronize_session=False)
+        removed = SESSION.query(Chats).filter(
+            Chats.chat_id.in_(chat_ids)).delete(synchronize_session=False)
+        SESSION.commit()
+        return removed
@@ -1,6 +1,9 @@
 import threading
 
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs import warmup
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import (Boolean, Column, Integer, String, UnicodeText, distinct,
                         func)
 from sqlalchemy.dialects import postgresql
@@ -61,15 +64,17 @@ class WarnSettings(BASE):
                                                     self.warn_limit)
 
 
-Warns.__table__.create(checkfirst=True)
-WarnFilters.__table__.create(checkfirst=True)
-WarnSettings.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Warns.__table__.create(checkfirst=True)
+    WarnFilters.__table__.create(checkfirst=True)
+    WarnSettings.__table__.create(checkfirst=True)
 
 WARN_INSERTION_LOCK = threading.RLock()
 WARN_FILTER_INSERTION_LOCK = threading.RLock()
 WARN_SETTINGS_LOCK = threading.RLock()
 
 WARN_FILTERS = {}
+register_cache(__name__, "WARN_FILTERS")
 
 
 def warn_user(user_id, chat_id, reason=None):
@@ -161,6 +166,16 @@ def remove_warn_filter(chat_id, keyword):
 
 
 def get_chat_warn_triggers(chat_id):
+    if not warmup.is_ready(__name__):
+        try:
+            keywords = {
+                keyword for (keyword,) in SESSION.query(
+                    WarnFilters.keyword).filter(
+                        WarnFilters.chat_id == str(chat_id))
+            }
+        finally:
+            SESSION.close()
+        return sorted(keywords, key=lambda i: (-len(i), i))
     return WARN_FILTERS.get(str(chat_id), set())
 
 
@@ -298,4 +313,5 @@ def migrate_chat(old_chat_id, new_chat_id):
         SESSION.commit()
 
 
-__load_chat_warn_filters()
+warmup.register(__name__, __load_chat_warn_filters,
+                locks=(WARN_FILTER_INSERTION_LOCK,))
@@ -4,6 +4,7 @@ from typing import Union
 
 from SaitamaRobot.modules.helper_funcs.msg_types import Types
 from SaitamaRobot.modules.sql import BASE, SESSION
+from SaitamaRobot.modules.helper_funcs.startup import timed
 from sqlalchemy import (BigInteger, Boolean, Column, Integer, String,
                         UnicodeText)
 
@@ -309,12 +310,13 @@ class CleanServiceSetting(BASE):
         return "<Chat used clean service ({})>".format(self.chat_id)
 
 
-Welcome.__table__.create(checkfirst=True)
-WelcomeButtons.__table__.create(checkfirst=True)
-GoodbyeButtons.__table__.create(checkfirst=True)
-WelcomeMute.__table__.create(checkfirst=True)
-WelcomeMuteUsers.__table__.create(checkfirst=True)
-CleanServiceSetting.__table__.create(checkfirst=True)
+with timed(__name__, "tables"):
+    Welcome.__table__.create(checkfirst=True)
+    WelcomeButtons.__table__.create(checkfirst=True)
+    GoodbyeButtons.__table__.create(checkfirst=True)
+    WelcomeMute.__table__.create(checkfirst=True)
+    WelcomeMuteUsers.__table__.create(checkfirst=True)
+    CleanServiceSetting.__table__.create(checkfirst=True)
 
 INSERTION_LOCK = threading.RLock()
 WELC_BTN_LOCK = threading.RLock()
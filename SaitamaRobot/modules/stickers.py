@@ -1,10 +1,13 @@
-import os
 import math
-import requests
-import urllib.request as urllib
-from PIL import Image
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as ConvertTimeout
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
 from html import escape
-from bs4 import BeautifulSoup as bs
+from cachetools import LRUCache
+from requests import RequestException
 
 from telegram import ParseMode, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram import TelegramError, Update
@@ -13,9 +16,117 @@ from telegram.utils.helpers import mention_html
 
 from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client, metrics
+from SaitamaRobot.modules.helper_funcs.memory import register_cache
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
 
 combot_stickers_url = "https://combot.org/telegram/stickers?q="
 
+# PIL only loads in the convert workers, once per worker
+Image = lazy_import("PIL.Image")
+bs4 = lazy_import("bs4")
+
+# image conversion runs in its own processes, so a big image neither holds
+# the GIL nor a shared file on disk while a dispatcher worker waits for it.
+# Only where processes fork, so workers reuse this already imported module
+# instead of booting the bot again, elsewhere (windows) it runs in threads.
+CONVERT_WORKERS = 2
+CONVERT_POOL_LOCK = threading.Lock()
+CONVERT_TIMEOUT = 30
+# {file_unique_id: png bytes}, bounded by the total size of the pngs
+CONVERTED_STICKERS = LRUCache(maxsize=32 * 1024 * 1024, getsizeof=len)
+CONVERTED_LOCK = threading.Lock()
+register_cache(__name__, "CONVERTED_STICKERS")
+
+
+def new_convert_pool():
+    if multiprocessing.get_start_method() != "fork":
+        return ThreadPoolExecutor(max_workers=CONVERT_WORKERS,
+                                  thread_name_prefix="sticker_convert")
+    pool = ProcessPoolExecutor(max_workers=CONVERT_WORKERS)
+    # the executor forks its workers on demand, these fork them all now,
+    # while the process is still only loading modules
+    for _ in range(CONVERT_WORKERS):
+        pool.submit(int)
+    return pool
+
+
+def replace_broken_pool(broken):
+    global CONVERT_POOL
+    with CONVERT_POOL_LOCK:
+        if CONVERT_POOL is broken:
+            CONVERT_POOL = new_convert_pool()
+    broken.shutdown(wait=False)
+
+
+def resize_to_sticker(image_data: bytes) -> bytes:
+    im = Image.open(BytesIO(image_data))
+    maxsize = (512, 512)
+    if (im.width and im.height) < 512:
+        size1 = im.width
+        size2 = im.height
+        if im.width > im.height:
+            scale = 512 / size1
+            size1new = 512
+            size2new = size2 * scale
+        else:
+            scale = 512 / size2
+            size1new = size1 * scale
+            size2new = 512
+        size1new = math.floor(size1new)
+        size2new = math.floor(size2new)
+        sizenew = (size1new, size2new)
+        im = im.resize(sizenew)
+    else:
+        im.thumbnail(maxsize)
+    output = BytesIO()
+    im.save(output, "PNG")
+    return output.getvalue()
+
+
+def convert_image(image_data: bytes, file_unique_id: str = None) -> bytes:
+    if file_unique_id:
+        with CONVERTED_LOCK:
+            png_data = CONVERTED_STICKERS.get(file_unique_id)
+        if png_data is not None:
+            return png_data
+
+    pool = CONVERT_POOL
+    future = pool.submit(resize_to_sticker, image_data)
+    try:
+        png_data = future.result(timeout=CONVERT_TIMEOUT)
+    except BrokenProcessPool:
+        # a worker died, e.g. killed for its memory
+        replace_broken_pool(pool)
+        raise
+    except ConvertTimeout:
+        # drop it if it's still queued, a running one finishes on its own,
+        # PIL refuses decompression bombs so that's bounded
+        future.cancel()
+        raise
+
+    if file_unique_id:
+        with CONVERTED_LOCK:
+            CONVERTED_STICKERS[file_unique_id] = png_data
+    return png_data
+
+
+def get_converted(file_unique_id: str):
+    with CONVERTED_LOCK:
+        data = CONVERTED_STICKERS.get(file_unique_id)
+    if data is None:
+        metrics.cache_miss("converted_stickers")
+    else:
+        metrics.cache_hit("converted_stickers")
+    return data
+
+
+def as_file(data: bytes, name: str = "kangsticker.png") -> BytesIO:
+    # a fresh file per upload, a retry can't reuse a consumed one
+    sticker_file = BytesIO(data)
+    sticker_file.name = name
+    return sticker_file
+
 
 @run_async
 def stickerid(update: Update, context: CallbackContext):
@@ -44,8 +155,8 @@ def cb_sticker(update: Update, context: CallbackContext):
     if len(split) == 1:
         msg.reply_text('Provide some name to search for pack.')
         return
-    text = requests.get(combot_stickers_url + split[1]).text
-    soup = bs(text, 'lxml')
+    text = http_client.get(combot_stickers_url + split[1], ttl=60 * 10).text
+    soup = bs4.BeautifulSoup(text, 'lxml')
     results = soup.find_all("a", {'class': "sticker-pack__btn"})
     titles = soup.find_all("div", "sticker-pack__title")
     if not results:
@@ -65,9 +176,10 @@ def getsticker(update: Update, context: CallbackContext):
     if msg.reply_to_message and msg.reply_to_message.sticker:
         file_id = msg.reply_to_message.sticker.file_id
         new_file = bot.get_file(file_id)
-        new_file.download("sticker.png")
-        bot.send_document(chat_id, document=open("sticker.png", "rb"))
-        os.remove("sticker.png")
+        bot.send_document(
+            chat_id,
+            document=as_file(bytes(new_file.download_as_bytearray()),
+                             "sticker.png"))
     else:
         update.effective_message.reply_text(
             "Please reply to a sticker for me to upload its PNG.")
@@ -94,28 +206,32 @@ def kang(update: Update, context: CallbackContext):
         except TelegramError as e:
             if e.message == "Stickerset_invalid":
                 packname_found = 1
-    kangsticker = "kangsticker.png"
     is_animated = False
     file_id = ""
+    file_unique_id = None
 
     if msg.reply_to_message:
         if msg.reply_to_message.sticker:
             if msg.reply_to_message.sticker.is_animated:
                 is_animated = True
             file_id = msg.reply_to_message.sticker.file_id
+            file_unique_id = msg.reply_to_message.sticker.file_unique_id
 
         elif msg.reply_to_message.photo:
             file_id = msg.reply_to_message.photo[-1].file_id
+            file_unique_id = msg.reply_to_message.photo[-1].file_unique_id
         elif msg.reply_to_message.document:
             file_id = msg.reply_to_message.document.file_id
+            file_unique_id = msg.reply_to_message.document.file_unique_id
         else:
             msg.reply_text("Yea, I can't kang that.")
+            return
 
-        kang_file = context.bot.get_file(file_id)
-        if not is_animated:
-            kang_file.download("kangsticker.png")
-        else:
-            kang_file.download("kangsticker.tgs")
+        # a popular sticker kanged before needs neither download nor conversion
+        kang_data = None if is_animated else get_converted(file_unique_id)
+        if kang_data is None:
+            kang_data = bytes(
+                context.bot.get_file(file_id).download_as_bytearray())
 
         if args:
             sticker_emoji = str(args[0])
@@ -126,31 +242,13 @@ def kang(update: Update, context: CallbackContext):
 
         if not is_animated:
             try:
-                im = Image.open(kangsticker)
-                maxsize = (512, 512)
-                if (im.width and im.height) < 512:
-                    size1 = im.width
-                    size2 = im.height
-                    if im.width > im.height:
-                        scale = 512 / size1
-                        size1new = 512
-                        size2new = size2 * scale
-                    else:
-                        scale = 512 / size2
-                        size1new = size1 * scale
-                        size2new = 512
-                    size1new = math.floor(size1new)
-                    size2new = math.floor(size2new)
-                    sizenew = (size1new, size2new)
-                    im = im.resize(sizenew)
-                else:
-                    im.thumbnail(maxsize)
+                # stickers usually fit already, upload them as they are
                 if not msg.reply_to_message.sticker:
-                    im.save(kangsticker, "PNG")
+                    kang_data = convert_image(kang_data, file_unique_id)
                 context.bot.add_sticker_to_set(
                     user_id=user.id,
                     name=packname,
-                    png_sticker=open("kangsticker.png", "rb"),
+                    png_sticker=as_file(kang_data),
                     emojis=sticker_emoji,
                 )
                 msg.reply_text(
@@ -159,7 +257,7 @@ def kang(update: Update, context: CallbackContext):
                     parse_mode=ParseMode.MARKDOWN,
                 )
 
-            except OSError as e:
+            except (OSError, ConvertTimeout, BrokenProcessPool) as e:
                 msg.reply_text("I can only kang images m8.")
                 print(e)
                 return
@@ -174,14 +272,14 @@ def kang(update: Update, context: CallbackContext):
                         sticker_emoji,
                         packname,
                         packnum,
-                        png_sticker=open("kangsticker.png", "rb"),
+                        png_sticker=as_file(kang_data),
                     )
                 elif e.message == "Sticker_png_dimensions":
-                    im.save(kangsticker, "PNG")
+                    kang_data = convert_image(kang_data, file_unique_id)
                     context.bot.add_sticker_to_set(
                         user_id=user.id,
                         name=packname,
-                        png_sticker=open("kangsticker.png", "rb"),
+                        png_sticker=as_file(kang_data),
                         emojis=sticker_emoji,
                     )
                     msg.reply_text(
@@ -224,7 +322,7 @@ def kang(update: Update, context: CallbackContext):
                 context.bot.add_sticker_to_set(
                     user_id=user.id,
                     name=packname,
-                    tgs_sticker=open("kangsticker.tgs", "rb"),
+                    tgs_sticker=as_file(kang_data, "kangsticker.tgs"),
                     emojis=sticker_emoji,
                 )
                 msg.reply_text(
@@ -242,7 +340,7 @@ def kang(update: Update, context: CallbackContext):
                         sticker_emoji,
                         packname,
                         packnum,
-                        tgs_sticker=open("kangsticker.tgs", "rb"),
+                        tgs_sticker=as_file(kang_data, "kangsticker.tgs"),
                     )
                 elif e.message == "Invalid sticker emojis":
                     msg.reply_text("Invalid emoji(s).")
@@ -263,32 +361,13 @@ def kang(update: Update, context: CallbackContext):
                 sticker_emoji = urlemoji[2]
             except IndexError:
                 sticker_emoji = "🤔"
-            urllib.urlretrieve(png_sticker, kangsticker)
-            im = Image.open(kangsticker)
-            maxsize = (512, 512)
-            if (im.width and im.height) < 512:
-                size1 = im.width
-                size2 = im.height
-                if im.width > im.height:
-                    scale = 512 / size1
-                    size1new = 512
-                    size2new = size2 * scale
-                else:
-                    scale = 512 / size2
-                    size1new = size1 * scale
-                    size2new = 512
-                size1new = math.floor(size1new)
-                size2new = math.floor(size2new)
-                sizenew = (size1new, size2new)
-                im = im.resize(sizenew)
-            else:
-                im.thumbnail(maxsize)
-            im.save(kangsticker, "PNG")
-            msg.reply_photo(photo=open("kangsticker.png", "rb"))
+            kang_data = convert_image(
+                http_client.get(png_sticker).content)
+            msg.reply_photo(photo=as_file(kang_data))
             context.bot.add_sticker_to_set(
                 user_id=user.id,
                 name=packname,
-                png_sticker=open("kangsticker.png", "rb"),
+                png_sticker=as_file(kang_data),
                 emojis=sticker_emoji,
             )
             msg.reply_text(
@@ -296,7 +375,8 @@ def kang(update: Update, context: CallbackContext):
                 + f"\nEmoji is: {sticker_emoji}",
                 parse_mode=ParseMode.MARKDOWN,
             )
-        except OSError as e:
+        except (OSError, ConvertTimeout, BrokenProcessPool,
+                RequestException) as e:
             msg.reply_text("I can only kang images m8.")
             print(e)
             return
@@ -310,14 +390,14 @@ def kang(update: Update, context: CallbackContext):
                     sticker_emoji,
                     packname,
                     packnum,
-                    png_sticker=open("kangsticker.png", "rb"),
+                    png_sticker=as_file(kang_data),
                 )
             elif e.message == "Sticker_png_dimensions":
-                im.save(kangsticker, "PNG")
+                # already converted above, the retry can only fail the same way
                 context.bot.add_sticker_to_set(
                     user_id=user.id,
                     name=packname,
-                    png_sticker=open("kangsticker.png", "rb"),
+                    png_sticker=as_file(kang_data),
                     emojis=sticker_emoji,
                 )
                 msg.reply_text(
@@ -349,10 +429,6 @@ def kang(update: Update, context: CallbackContext):
         else:
             packs += f"[pack](t.me/addstickers/{packname})"
         msg.reply_text(packs, parse_mode=ParseMode.MARKDOWN)
-    if os.path.isfile("kangsticker.png"):
-        os.remove("kangsticker.png")
-    elif os.path.isfile("kangsticker.tgs"):
-        os.remove("kangsticker.tgs")
 
 
 def makepack_internal(
@@ -440,3 +516,6 @@ dispatcher.add_handler(STICKERS_HANDLER)
 dispatcher.add_handler(STICKERID_HANDLER)
 dispatcher.add_handler(GETSTICKER_HANDLER)
 dispatcher.add_handler(KANG_HANDLER)
+
+# last, the workers fork with everything above already defined
+CONVERT_POOL = new_convert_pool()
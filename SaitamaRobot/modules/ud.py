@@ -1,6 +1,6 @@
-import requests
 from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext, run_async
 
@@ -9,8 +9,12 @@ from telegram.ext import CallbackContext, run_async
 def ud(update: Update, context: CallbackContext):
     message = update.effective_message
     text = message.text[len('/ud '):]
-    results = requests.get(
-        f'https://api.urbandictionary.com/v0/define?term={text}').json()
+    results = http_client.get(
+        'https://api.urbandictionary.com/v0/define',
+        params={
+            'term': text
+        },
+        ttl=60 * 60).json()
     try:
         reply_text = f'*{text}*\n\n{results["list"][0]["definition"]}\n\n_{results["list"][0]["example"]}_'
     except:
@@ -1,7 +1,6 @@
 import html
 import re
 import os
-import requests
 import subprocess
 
 from telethon.tl.functions.channels import GetFullChannelRequest
@@ -16,7 +15,7 @@ from telegram.utils.helpers import escape_markdown, mention_html
 
 from SaitamaRobot import (DEV_USERS, OWNER_ID, DRAGONS, DEMONS, TIGERS, WOLVES,
                           INFOPIC, dispatcher, sw)
-from SaitamaRobot.__main__ import STATS, TOKEN, USER_INFO
+from SaitamaRobot.__main__ import STATS, USER_INFO
 import SaitamaRobot.modules.sql.userinfo_sql as sql
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
 from SaitamaRobot.modules.sql.global_bans_sql import is_user_gbanned
@@ -295,14 +294,10 @@ def info(update: Update, context: CallbackContext):
 
     try:
         user_member = chat.get_member(user.id)
-        if user_member.status == 'administrator':
-            result = requests.post(
-                f"https://api.telegram.org/bot{TOKEN}/getChatMember?chat_id={chat.id}&user_id={user.id}"
-            )
-            result = result.json()["result"]
-            if "custom_title" in result.keys():
-                custom_title = result['custom_title']
-                text += f"\n\nTitle:\n<b>{custom_title}</b>"
+        # get_member already carries the title, no need to ask the api again
+        if user_member.status == 'administrator' and user_member.custom_title:
+            custom_title = user_member.custom_title
+            text += f"\n\nTitle:\n<b>{custom_title}</b>"
     except BadRequest:
         pass
 
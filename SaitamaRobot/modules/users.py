@@ -1,15 +1,19 @@
 from io import BytesIO
-from time import sleep
 
-from telegram import TelegramError, Update
+from telegram import Update
 from telegram.error import BadRequest, Unauthorized
 from telegram.ext import (CallbackContext, CommandHandler, Filters,
                           MessageHandler, run_async)
 
+import SaitamaRobot.modules.sql.afk_sql as afk_sql
+import SaitamaRobot.modules.sql.chat_meta_sql as chat_meta_sql
 import SaitamaRobot.modules.sql.users_sql as sql
-from SaitamaRobot import DEV_USERS, LOGGER, OWNER_ID, dispatcher
+from SaitamaRobot import DEV_USERS, LOGGER, OWNER_ID, dispatcher, updater
+from SaitamaRobot.modules.helper_funcs.broadcast import (resume_broadcasts,
+                                                        start_broadcast)
+from SaitamaRobot.modules.helper_funcs.chat_meta import (bot_left, record_chat,
+                                                        refresh_stale_chats)
 from SaitamaRobot.modules.helper_funcs.chat_status import dev_plus, sudo_plus
-from SaitamaRobot.modules.sql.users_sql import get_all_users
 
 USERS_GROUP = 4
 CHAT_GROUP = 5
@@ -30,12 +34,12 @@ def get_user_id(username):
         return None
 
     elif len(users) == 1:
-        return users[0].user_id
+        return users[0]
 
     else:
-        for user_obj in users:
+        for user_id in users:
             try:
-                userdat = dispatcher.bot.get_chat(user_obj.user_id)
+                userdat = dispatcher.bot.get_chat(user_id)
                 if userdat.username == username:
                     return userdat.id
 
@@ -48,49 +52,48 @@ def get_user_id(username):
     return None
 
 
+# {command: recipient sources, in sending order}
+BROADCAST_TARGETS = {
+    "broadcastall": ("chats", "users"),
+    "broadcastgroups": ("chats",),
+    "broadcastusers": ("users",),
+}
+
+
 @run_async
 @dev_plus
 def broadcast(update: Update, context: CallbackContext):
     to_send = update.effective_message.text.split(None, 1)
 
     if len(to_send) >= 2:
-        to_group = False
-        to_user = False
-        if to_send[0] == '/broadcastgroups':
-            to_group = True
-        if to_send[0] == '/broadcastusers':
-            to_user = True
-        else:
-            to_group = to_user = True
-        chats = sql.get_all_chats() or []
-        users = get_all_users()
-        failed = 0
-        failed_user = 0
-        if to_group:
-            for chat in chats:
-                try:
-                    context.bot.sendMessage(
-                        int(chat.chat_id),
-                        to_send[1],
-                        parse_mode="MARKDOWN",
-                        disable_web_page_preview=True)
-                    sleep(0.1)
-                except TelegramError:
-                    failed += 1
-        if to_user:
-            for user in users:
-                try:
-                    context.bot.sendMessage(
-                        int(user.user_id),
-                        to_send[1],
-                        parse_mode="MARKDOWN",
-                        disable_web_page_preview=True)
-                    sleep(0.1)
-                except TelegramError:
-                    failed_user += 1
-        update.effective_message.reply_text(
-            f"Broadcast complete.\nGroups failed: {failed}.\nUsers failed: {failed_user}."
-        )
+        command = to_send[0][1:].split("@")[0].lower()
+        start_broadcast(
+            context.bot,
+            "Broadcast",
+            BROADCAST_TARGETS[command],
+            to_send[1],
+            update.effective_chat.id,
+            parse_mode="MARKDOWN")
+
+
+def log_membership(bot, msg):
+    # keep the stored member count and bot status roughly right between
+    # background refreshes
+    meta = chat_meta_sql.get_meta(msg.chat.id)
+    member_count = meta.member_count if meta else None
+    fields = {}
+    if msg.new_chat_members:
+        if member_count is not None:
+            fields["member_count"] = member_count + len(msg.new_chat_members)
+        if any(member.id == bot.id for member in msg.new_chat_members):
+            fields["bot_status"] = "member"
+    elif msg.left_chat_member:
+        if member_count is not None:
+            fields["member_count"] = max(member_count - 1, 0)
+        if msg.left_chat_member.id == bot.id:
+            fields["bot_status"] = "left"
+    if fields:
+        chat_meta_sql.set_meta(msg.chat.id, **fields)
 
 
 @run_async
@@ -100,14 +103,23 @@ def log_user(update: Update, context: CallbackContext):
 
     sql.update_user(msg.from_user.id, msg.from_user.username, chat.id,
                     chat.title)
+    record_chat(chat)
+    log_membership(context.bot, msg)
+    afk_sql.update_afk_user(msg.from_user.id, msg.from_user.username,
+                            msg.from_user.first_name)
 
     if msg.reply_to_message:
         sql.update_user(msg.reply_to_message.from_user.id,
                         msg.reply_to_message.from_user.username, chat.id,
                         chat.title)
+        afk_sql.update_afk_user(msg.reply_to_message.from_user.id,
+                                msg.reply_to_message.from_user.username,
+                                msg.reply_to_message.from_user.first_name)
 
     if msg.forward_from:
         sql.update_user(msg.forward_from.id, msg.forward_from.username)
+        afk_sql.update_afk_user(msg.forward_from.id, msg.forward_from.username,
+                                msg.forward_from.first_name)
 
 
 @run_async
@@ -116,16 +128,18 @@ def chats(update: Update, context: CallbackContext):
     all_chats = sql.get_all_chats() or []
     chatfile = 'List of chats.\n0. Chat name | Chat ID | Members count\n'
     P = 1
+    # straight from the metadata store, refresh_stale_chats keeps it current
     for chat in all_chats:
-        try:
-            curr_chat = context.bot.getChat(chat.chat_id)
-            bot_member = curr_chat.get_member(context.bot.id)
-            chat_members = curr_chat.get_members_count(context.bot.id)
-            chatfile += "{}. {} | {} | {}\n".format(P, chat.chat_name,
-                                                    chat.chat_id, chat_members)
-            P = P + 1
-        except:
-            pass
+        meta = chat_meta_sql.get_meta(chat.chat_id)
+        if bot_left(meta):
+            continue
+        chat_name = meta.title if meta and meta.title else chat.chat_name
+        chat_members = "?"
+        if meta and meta.member_count is not None:
+            chat_members = meta.member_count
+        chatfile += "{}. {} | {} | {}\n".format(P, chat_name, chat.chat_id,
+                                                chat_members)
+        P = P + 1
 
     with BytesIO(str.encode(chatfile)) as output:
         output.name = "groups_list.txt"
@@ -161,6 +175,7 @@ def __stats__():
 
 def __migrate__(old_chat_id, new_chat_id):
     sql.migrate_chat(old_chat_id, new_chat_id)
+    chat_meta_sql.migrate_chat(old_chat_id, new_chat_id)
 
 
 __help__ = ""  # no help string
@@ -176,6 +191,10 @@ dispatcher.add_handler(BROADCAST_HANDLER)
 dispatcher.add_handler(CHATLIST_HANDLER)
 dispatcher.add_handler(CHAT_CHECKER_HANDLER, CHAT_GROUP)
 
+# broadcasts cut short by a restart carry on from their last page
+updater.job_queue.run_once(resume_broadcasts, 10)
+updater.job_queue.run_repeating(refresh_stale_chats, interval=60 * 10, first=60)
+
 __mod_name__ = "Users"
 __handlers__ = [(USER_HANDLER, USERS_GROUP), BROADCAST_HANDLER,
                 CHATLIST_HANDLER]
@@ -1,8 +1,8 @@
 from random import randint
 
-import requests as r
 from SaitamaRobot import SUPPORT_CHAT, WALL_API, dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client
 from telegram import Update
 from telegram.ext import CallbackContext, run_async
 
@@ -23,9 +23,9 @@ def wall(update: Update, context: CallbackContext):
     else:
         caption = query
         term = query.replace(" ", "%20")
-        json_rep = r.get(
-            f"https://wall.alphacoders.com/api2.0/get.php?auth={WALL_API}&method=search&term={term}"
-        ).json()
+        json_rep = http_client.get(
+            f"https://wall.alphacoders.com/api2.0/get.php?auth={WALL_API}&method=search&term={term}",
+            ttl=60 * 10).json()
         if not json_rep.get("success"):
             msg.reply_text(f"An error occurred! Report this @{SUPPORT_CHAT}")
         else:
@@ -8,6 +8,7 @@ import SaitamaRobot.modules.sql.welcome_sql as sql
 from SaitamaRobot import (DEV_USERS, LOGGER, OWNER_ID, DRAGONS, DEMONS, TIGERS,
                           WOLVES, sw, dispatcher, JOIN_LOGGER)
 from SaitamaRobot.modules.helper_funcs.chat_status import (
+    get_admin_roster,
     is_user_ban_protected,
     user_admin,
 )
@@ -225,8 +226,7 @@ def new_member(update: Update, context: CallbackContext):
             # Welcome yourself
             elif new_mem.id == bot.id:
                 creator = None
-                for x in bot.bot.get_chat_administrators(
-                        update.effective_chat.id):
+                for x in get_admin_roster(update.effective_chat.id):
                     if x.status == 'creator':
                         creator = x.user
                         break
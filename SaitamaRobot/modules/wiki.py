@@ -1,9 +1,11 @@
-import wikipedia
 from SaitamaRobot import dispatcher
 from SaitamaRobot.modules.disable import DisableAbleCommandHandler
+from SaitamaRobot.modules.helper_funcs import http_client
+from SaitamaRobot.modules.helper_funcs.startup import lazy_import
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext, run_async
-from wikipedia.exceptions import DisambiguationError, PageError
+
+wikipedia = lazy_import("wikipedia")
 
 
 @run_async
@@ -15,13 +17,14 @@ def wiki(update: Update, context: CallbackContext):
     else:
         search = msg.text
     try:
-        res = wikipedia.summary(search)
-    except DisambiguationError as e:
+        res = http_client.cached_call(("wikipedia.summary", search),
+                                      60 * 60, wikipedia.summary, search)
+    except wikipedia.exceptions.DisambiguationError as e:
         update.message.reply_text(
             "Disambiguated pages found! Adjust your query accordingly.\n<i>{}</i>"
             .format(e),
             parse_mode=ParseMode.HTML)
-    except PageError as e:
+    except wikipedia.exceptions.PageError as e:
         update.message.reply_text(
             "<code>{}</code>".format(e), parse_mode=ParseMode.HTML)
     if res:
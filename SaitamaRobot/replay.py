@@ -0,0 +1,291 @@
+"""
+Replay recorded updates through every module against a stub bot.
+
+    python3 -m SaitamaRobot.replay updates.jsonl [--limit N] [--concurrent]
+
+Updates from /record go through the real dispatcher and the handlers of
+ALL_MODULES. Bot api calls are answered locally, but the handlers do write to
+the configured database, so point DATABASE_URL (or the config) at a scratch
+copy first.
+
+By default each update's run_async work finishes before the next update goes
+in, so runs are repeatable; --concurrent lets them overlap like production.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import time
+from collections import Counter
+from time import perf_counter
+
+from sqlalchemy import event
+from telegram import Update
+from telegram.error import BadRequest
+
+from SaitamaRobot import LOGGER, TOKEN, dispatcher
+from SaitamaRobot.modules import ALL_MODULES
+from SaitamaRobot.modules.helper_funcs import metrics, sql_audit, warmup
+from SaitamaRobot.modules.sql import BASE
+
+# results for the methods that don't return a Message or True
+STUB_RESULTS = {
+    "getChatMembersCount": 100,
+    # ptb fetches these along with getMe
+    "getMyCommands": [],
+    "getUserProfilePhotos": {
+        "total_count": 0,
+        "photos": []
+    },
+    "exportChatInviteLink": "https://t.me/joinchat/replay",
+    "getWebhookInfo": {
+        "url": "",
+        "has_custom_certificate": False,
+        "pending_update_count": 0
+    },
+}
+# methods failing like they would for something that doesn't exist
+STUB_ERRORS = {
+    "getStickerSet": "Stickerset_invalid",
+}
+
+
+class StubRequest:
+    """Stands in for telegram.utils.request.Request, no network involved."""
+
+    def __init__(self, bot_user: dict):
+        self.bot_user = bot_user
+        self.message_ids = itertools.count(1)
+
+    def _chat(self, chat_id) -> dict:
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            # @username
+            chat_id = -1
+        return {
+            "id": chat_id,
+            "type": "supergroup" if chat_id < 0 else "private",
+            "title": "Replay chat",
+            "first_name": "Replay",
+        }
+
+    def _member(self, user_id) -> dict:
+        if int(user_id) == self.bot_user["id"]:
+            # an admin with every right, so bot permission checks pass
+            return {
+                "user": self.bot_user,
+                "status": "administrator",
+                "can_be_edited": False,
+                "can_change_info": True,
+                "can_delete_messages": True,
+                "can_invite_users": True,
+                "can_restrict_members": True,
+                "can_pin_messages": True,
+                "can_promote_members": True,
+            }
+        return {
+            "user": {
+                "id": int(user_id),
+                "is_bot": False,
+                "first_name": "Replay"
+            },
+            "status": "member",
+        }
+
+    def _message(self, data: dict) -> dict:
+        return {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": self._chat(data.get("chat_id")),
+            "from": self.bot_user,
+            "text": data.get("text") or data.get("caption") or "",
+        }
+
+    def respond(self, method: str, data: dict):
+        if method in STUB_ERRORS:
+            raise BadRequest(STUB_ERRORS[method])
+        if method in STUB_RESULTS:
+            return STUB_RESULTS[method]
+        if method == "getMe":
+            return self.bot_user
+        if method == "getChat":
+            return self._chat(data.get("chat_id"))
+        if method == "getChatMember":
+            return self._member(data["user_id"])
+        if method == "getChatAdministrators":
+            return [self._member(self.bot_user["id"])]
+        if method == "getFile":
+            return {
+                "file_id": data["file_id"],
+                "file_unique_id": "replay",
+                "file_size": 0,
+                "file_path": "replay",
+            }
+        if method == "sendChatAction":
+            return True
+        if method == "sendMediaGroup":
+            return [self._message(data)]
+        if method.startswith(("send", "forward", "edit", "copy")):
+            if "inline_message_id" in data:
+                return True
+            return self._message(data)
+        return True
+
+    def post(self, url, data, timeout=None):
+        return self.respond(url.rsplit("/", 1)[-1], data or {})
+
+    def retrieve(self, url, timeout=None):
+        return b""
+
+    def download(self, url, filename, timeout=None):
+        with open(filename, "wb"):
+            pass
+
+    def stop(self):
+        pass
+
+
+def stub_bot():
+    bot = dispatcher.bot
+    bot_id = int(TOKEN.split(":", 1)[0])
+    bot._request = StubRequest({
+        "id": bot_id,
+        "is_bot": True,
+        "first_name": "Replay",
+        "username": "replay_bot",
+    })
+    return bot
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
+
+
+def load_recording(path: str, limit: int = None):
+    with open(path, encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        for line in itertools.islice(lines, limit):
+            yield json.loads(line)["update"]
+
+
+def replay(path: str, limit: int = None, concurrent: bool = False):
+    # before the modules load, some call getMe at import time
+    bot = stub_bot()
+    for module_name in ALL_MODULES:
+        importlib.import_module("SaitamaRobot.modules." + module_name)
+    # warm caches, or the first updates measure the db fallbacks
+    warmup.start()
+    warmup.wait_all()
+
+    metrics.SAMPLES = {}
+    sql_audit.start(dispatcher)
+
+    statements = Counter()
+
+    @event.listens_for(BASE.metadata.bind, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context,
+                        executemany):
+        statements[statement.split(None, 1)[0].upper()] += 1
+
+    promises = []
+    run_async = dispatcher.run_async
+
+    def tracked_run_async(func, *args, **kwargs):
+        promise = run_async(func, *args, **kwargs)
+        promises.append(promise)
+        return promise
+
+    dispatcher.run_async = tracked_run_async
+
+    updates = 0
+    started = perf_counter()
+    for payload in load_recording(path, limit):
+        dispatcher.process_update(Update.de_json(payload, bot))
+        updates += 1
+        if not concurrent:
+            while promises:
+                promises.pop().done.wait()
+    while promises:
+        promises.pop().done.wait()
+    elapsed = perf_counter() - started
+
+    report(updates, elapsed, statements)
+    # the repeated statement report, N+1 candidates
+    sql_audit.report()
+
+
+def report(updates: int, elapsed: float, statements: Counter):
+    samples = metrics.SAMPLES
+    lines = [
+        "Replayed {} updates in {:.2f}s, {:.1f} updates/s.".format(
+            updates, elapsed, updates / max(elapsed, 1e-9)),
+        "",
+        "{:<40} {:>7} {:>9} {:>9} {:>9}".format("handler", "calls",
+                                               "p50 ms", "p95 ms", "p99 ms"),
+    ]
+    handlers = sorted(
+        ((dict(labels), times)
+         for (name, labels), times in samples.items()
+         if name == "saitama_handler_seconds"),
+        key=lambda item: -sum(item[1]))
+    for labels, times in handlers:
+        lines.append("{:<40} {:>7} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+            "{}.{}".format(labels["module"], labels["callback"])[:40],
+            len(times),
+            percentile(times, 0.5) * 1000,
+            percentile(times, 0.95) * 1000,
+            percentile(times, 0.99) * 1000))
+
+    total = sum(statements.values())
+    lines += [
+        "",
+        "DB statements: {}, {:.2f} per update ({}).".format(
+            total, total / max(updates, 1), ", ".join(
+                "{} {}".format(kind, count)
+                for kind, count in statements.most_common())),
+        "",
+        "Busiest sql functions:",
+    ]
+    queries = sorted(
+        ((dict(labels), times)
+         for (name, labels), times in samples.items()
+         if name == "saitama_sql_seconds"),
+        key=lambda item: -len(item[1]))
+    for labels, times in queries[:15]:
+        lines.append("  {}.{}: {} calls, {:.1f}ms total".format(
+            labels["module"], labels["function"], len(times),
+            sum(times) * 1000))
+
+    with metrics.LOCK:
+        api_calls = {
+            labels: count
+            for (name, labels), count in metrics.COUNTERS.items()
+            if name == "saitama_bot_api_calls_total"
+        }
+    lines += ["", "Bot api calls:"]
+    for labels, count in sorted(api_calls.items(), key=lambda item: -item[1]):
+        labels = dict(labels)
+        lines.append("  {} {}: {}".format(labels["method"], labels["outcome"],
+                                          count))
+    print("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded updates against a stub bot.")
+    parser.add_argument("recording", help="a JSONL file written by /record")
+    parser.add_argument(
+        "--limit", type=int, help="stop after this many updates")
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="don't wait for an update's async handlers before the next one")
+    args = parser.parse_args()
+    LOGGER.info("Replaying %s", args.recording)
+    replay(args.recording, args.limit, args.concurrent)
+
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,13 @@ class Config(object):
     DONATION_LINK = None  # EG, paypal
     CERT_PATH = None
     PORT = 5000
+    BOT_API_URL = None  # Leave None for telegram. For load tests run SaitamaRobot/fake_bot_api.py and use http://localhost:8081/bot
+    SQL_AUDIT = False  # Count the queries of every handler call, flag heavy ones and log a report every 10 min
+    SQL_QUERY_BUDGET = 20  # Queries one handler call may run before SQL_AUDIT flags it
+    TRACEMALLOC_INTERVAL = 0  # Minutes between logged tracemalloc diffs, 0 turns tracing off. Tracing slows the bot down
+    METRICS_PORT = 0  # Serve prometheus metrics on this port, 0 turns them off. Keep it firewalled.
+    CACHE_SNAPSHOT = None  # File to keep a snapshot of the sql caches in for fast restarts, eg cache.snapshot. Needs a disk that survives restarts. Writes made while it is off are not tracked, delete the file when turning it back on
+    CACHE_SNAPSHOT_INTERVAL = 10  # Minutes between cache snapshot writes, one is also written at shutdown
     DEL_CMDS = True  #Delete commands that users dont have access to, like delete /ban if a non admin uses it.
     STRICT_GBAN = True
     WORKERS = 8  # Number of subthreads to use. Set as number of threads your processor uses
@@ -0,0 +1,38 @@
+"""
+markdown_parser against the old per-prefix implementation on a message at
+telegram's length limit. Run it directly:
+
+    python tests/bench_string_handling.py
+"""
+import random
+from timeit import repeat
+
+from telegram import MAX_MESSAGE_LENGTH
+
+from test_string_handling import (make_text, reference_markdown_parser,
+                                  string_handling)
+
+RUNS = 5
+
+
+def bench(name, parse, text, entities):
+    best = min(repeat(lambda: parse(text, entities), number=1, repeat=RUNS))
+    print("{:<10} {:8.1f}ms".format(name, best * 1000))
+    return best
+
+
+def main():
+    text, entities = make_text(random.Random(0),
+                               MAX_MESSAGE_LENGTH,
+                               emoji_share=0.2,
+                               link_share=0.2)
+    urls = sum(entity.type == "url" for entity in entities)
+    print("{} chars, {} entities, {} urls, best of {}".format(
+        len(text), len(entities), urls, RUNS))
+    old = bench("old", reference_markdown_parser, text, entities)
+    new = bench("new", string_handling.markdown_parser, text, entities)
+    print("{:.0f}x faster".format(old / new))
+
+
+if __name__ == "__main__":
+    main()
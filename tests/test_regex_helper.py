@@ -0,0 +1,77 @@
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+
+# loaded by path, importing the package boots the bot
+_PATH = (Path(__file__).resolve().parents[1] / "SaitamaRobot" / "modules" /
+         "helper_funcs" / "regex_helper.py")
+_spec = importlib.util.spec_from_file_location("regex_helper", _PATH)
+regex_helper = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(regex_helper)
+
+
+@pytest.mark.parametrize("pattern", [
+    r"\w+\s+\w+",
+    r"[a-z]+[0-9]+[a-z]+",
+    r"(\w+ )+",
+    r"(\d+\.)+\d+",
+    r"^(\w+\.)*\w+@\w+$",
+    r"(a+b+)+",
+    r"[^ ]+ [^ ]+",
+    r"a*b*c*",
+    r"(.)\1",
+    r"hello",
+    r"(?x) \w+ \s+ \w+  # verbose",
+    r"(?P<word>\w+) (?P=word)",
+    r"[]a-c]+-[^]x]+",
+])
+def test_safe_patterns_pass(pattern):
+    assert regex_helper.check_regex_complexity(pattern) is None
+
+
+@pytest.mark.parametrize("pattern", [
+    r"^\s*(.*?)\s*$",
+    r"\s*\s*\s*",
+    r"\s*(a|\s*)\s*",
+    r".*.*.*",
+    r"\d*\w*\d*",
+    r"(a+)+",
+    r"(?:a*)*",
+    r"(\w+\s?)+",
+    r"(x\w+)+",
+    r"(\s+|\w+)+",
+    r"(a|ab|b)+",
+    r"(.*)+\1",
+    r"(a|a)*",
+    r"(?:\w+|\d+)+",
+    r"a**",
+])
+def test_catastrophic_patterns_rejected(pattern):
+    assert regex_helper.check_regex_complexity(pattern) is not None
+
+
+def test_ignorecase_folds_ranges():
+    pattern = r"[A-Z]+[a-z]+[A-Z]+"
+    assert regex_helper.check_regex_complexity(pattern) is None
+    assert regex_helper.check_regex_complexity(pattern,
+                                               ignorecase=True) is not None
+
+
+def test_ignorecase_folding_is_bounded():
+    ranges = "".join(
+        chr(0x100 + i) + "-" + chr(0xff00 - i) for i in range(30))
+    pattern = "(?i)" + "".join("[{}]".format(ranges[i * 3:i * 3 + 3])
+                               for i in range(30)) + "+"
+    started = time.perf_counter()
+    assert regex_helper.check_regex_complexity(pattern) is not None
+    # one class of overlapping ranges folds once
+    assert regex_helper.check_regex_complexity("[" + ranges + "]+",
+                                               ignorecase=True) is None
+    assert time.perf_counter() - started < 1
+
+
+def test_unknown_syntax_is_let_through():
+    assert regex_helper.check_regex_complexity(r"a\qb") is None
+    assert regex_helper.check_regex_complexity(r"(ab") is None
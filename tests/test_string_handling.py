@@ -0,0 +1,156 @@
+import importlib.util
+import random
+from pathlib import Path
+
+import pytest
+from telegram import MessageEntity
+from telegram.utils.helpers import escape_markdown
+
+# loaded by path, importing the package boots the bot
+_PATH = (Path(__file__).resolve().parents[1] / "SaitamaRobot" / "modules" /
+         "helper_funcs" / "string_handling.py")
+_spec = importlib.util.spec_from_file_location("string_handling", _PATH)
+string_handling = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(string_handling)
+
+EMOJI = ["😀", "👍🏽", "👨‍👩‍👧", "🇩🇪", "❤️", "1️⃣", "🤷‍♂️", "✨"]
+WORDS = ["hello", "*bold*", "_it_", "`code`", "[x]", "\\[", "*", "_", "`",
+         "[", "ü", "日本"]
+URLS = ["https://example.com", "t.me/example", "http://a.b/c_d*e"]
+
+
+def reference_selective_escape(to_parse: str) -> str:
+    # the escape before it became a single re.sub
+    offset = 0
+    for match in string_handling.MATCH_MD.finditer(to_parse):
+        if match.group('esc'):
+            ent_start = match.start()
+            to_parse = to_parse[:ent_start +
+                                offset] + '\\' + to_parse[ent_start + offset:]
+            offset += 1
+    return to_parse
+
+
+def reference_markdown_parser(txt, entities=None, offset=0):
+    # markdown_parser as it was, rescanning every prefix for emoji
+    if not entities:
+        entities = {}
+    if not txt:
+        return ""
+
+    prev = 0
+    res = ""
+    for ent, ent_text in entities.items():
+        if ent.offset < -offset:
+            continue
+
+        start = ent.offset + offset
+        end = ent.offset + offset + ent.length - 1
+
+        if ent.type in ("code", "url", "text_link"):
+            count = string_handling._calc_emoji_offset(txt[:start])
+            start -= count
+            end -= count
+
+            if ent.type == "url":
+                if any(
+                        match.start(1) <= start and end <= match.end(1)
+                        for match in string_handling.LINK_REGEX.finditer(
+                            txt)):
+                    continue
+                else:
+                    res += reference_selective_escape(
+                        txt[prev:start] or "") + escape_markdown(ent_text)
+            elif ent.type == "code":
+                res += reference_selective_escape(
+                    txt[prev:start]) + '`' + ent_text + '`'
+            elif ent.type == "text_link":
+                res += reference_selective_escape(
+                    txt[prev:start]) + "[{}]({})".format(ent_text, ent.url)
+
+            end += 1
+        else:
+            continue
+
+        prev = end
+
+    res += reference_selective_escape(txt[prev:])
+    return res
+
+
+def utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def make_text(rng, length, emoji_share=0.2, link_share=0.1):
+    """:return: (text, entities) with entities at the parts' utf-16 offsets"""
+    parts, entities = [], {}
+    size = 0
+    while size < length:
+        roll = rng.random()
+        if roll < emoji_share:
+            part = rng.choice(EMOJI)
+        elif roll < emoji_share + link_share:
+            url = rng.choice(URLS)
+            if rng.random() < 0.5:
+                part = "[{}]({})".format(rng.choice(WORDS), url)
+                url_offset = utf16_len("".join(parts)) + utf16_len(
+                    part) - utf16_len(url) - 1
+            else:
+                part = url
+                url_offset = utf16_len("".join(parts))
+            entities[MessageEntity("url", url_offset, utf16_len(url))] = url
+        else:
+            part = rng.choice(WORDS)
+            if rng.random() < 0.15:
+                entity_type = rng.choice(("code", "text_link", "bold"))
+                entities[MessageEntity(
+                    entity_type,
+                    utf16_len("".join(parts)),
+                    utf16_len(part),
+                    url="https://example.com/x")] = part
+        parts.append(part + rng.choice(("", " ", "\n")))
+        size += len(parts[-1])
+    return "".join(parts)[:length], entities
+
+
+def corpus(name, seed, count, length, **shares):
+    rng = random.Random(seed)
+    return [
+        pytest.param(*make_text(rng, length, **shares),
+                     id="{}-{}".format(name, index))
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("text, entities", [
+    *corpus("emoji", 1, 200, 120, emoji_share=0.6),
+    *corpus("links", 2, 200, 200, link_share=0.5),
+    # the reference is quadratic, a few of these take seconds already
+    *corpus("long", 3, 2, 4096),
+])
+def test_markdown_parser_matches_reference(text, entities):
+    for offset in (0, 3):
+        assert string_handling.markdown_parser(
+            text, entities, offset) == reference_markdown_parser(
+                text, entities, offset)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "plain",
+    "*unclosed _mixed `marks [and]",
+    "\\[escaped](link) [real](https://x.y) *a* _b_ `c`",
+])
+def test_selective_escape_matches_reference(text):
+    assert string_handling._selective_escape(
+        text) == reference_selective_escape(text)
+
+
+def test_emoji_offset_index_matches_prefix_scan():
+    rng = random.Random(4)
+    text, _ = make_text(rng, 600, emoji_share=0.5)
+    offset_at = string_handling._emoji_offset_index(text)
+    for pos in range(len(text) + 1):
+        assert offset_at(pos) == string_handling._calc_emoji_offset(
+            text[:pos])